@@ -0,0 +1,73 @@
+"""Alert evaluation cost per snapshot: sorted indexes vs scanning every rule
+
+Run with: python -m benchmarks.bench_alerts
+"""
+import random
+import time
+from decimal import Decimal
+from services.alerts import AlertEngine
+from services.quote import Quote
+
+INSTRUMENTS = ['coin', 'dollar', 'gold', 'ons', 'tether']
+
+
+def build_rules(engine: AlertEngine, count: int, rng: random.Random):
+    for i in range(count):
+        instrument = rng.choice(INSTRUMENTS)
+        kind = rng.choice(['above', 'below', 'above', 'below', 'move_pct'])
+        value = rng.uniform(0.5, 5) if kind == 'move_pct' else rng.randint(500_000, 700_000)
+        engine.add_rule(i % 5000, instrument, kind, value, save=False)
+
+
+def naive_scan(rules, last, snapshot):
+    """Check every rule of every user against the new snapshot"""
+    fired = []
+    for rule in rules:
+        quote = snapshot.get(rule.instrument)
+        previous = last.get(rule.instrument)
+        if quote is None or previous is None:
+            continue
+        price = Decimal(quote.price)
+        if rule.kind == 'above' and previous < rule.value <= price:
+            fired.append(rule.id)
+        elif rule.kind == 'below' and price <= rule.value < previous:
+            fired.append(rule.id)
+        elif rule.kind == 'move_pct' and previous and abs(price - previous) * 100 / previous >= rule.value:
+            fired.append(rule.id)
+    for instrument, quote in snapshot.items():
+        last[instrument] = Decimal(quote.price)
+    return fired
+
+
+def snapshots(count: int, rng: random.Random):
+    prices = {key: 600_000 for key in INSTRUMENTS}
+    for _ in range(count):
+        for key in prices:
+            prices[key] = max(1, int(prices[key] * (1 + rng.gauss(0, 0.002))))
+        yield {key: Quote(key, key, price) for key, price in prices.items()}
+
+
+def main(rules: int = 100_000, ticks: int = 200):
+    rng = random.Random(11)
+    engine = AlertEngine()
+    build_rules(engine, rules, rng)
+    ticks_data = list(snapshots(ticks, rng))
+
+    started = time.perf_counter()
+    indexed = [len(engine.evaluate(snapshot, i * 45)) for i, snapshot in enumerate(ticks_data)]
+    indexed_seconds = time.perf_counter() - started
+
+    rule_list = list(engine.rules.values())
+    last = {}
+    started = time.perf_counter()
+    naive = [len(naive_scan(rule_list, last, snapshot)) for snapshot in ticks_data]
+    naive_seconds = time.perf_counter() - started
+
+    assert indexed == naive, "indexed and naive evaluation disagree"
+    print(f"{rules:,} rules, {ticks} snapshots, {sum(indexed):,} alerts fired")
+    print(f"indexed: {indexed_seconds / ticks * 1000:8.3f} ms/snapshot")
+    print(f"naive:   {naive_seconds / ticks * 1000:8.3f} ms/snapshot")
+
+
+if __name__ == "__main__":
+    main()
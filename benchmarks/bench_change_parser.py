@@ -0,0 +1,57 @@
+"""Throughput of the change-text parser
+
+Run with: python -m benchmarks.bench_change_parser
+"""
+import random
+import re
+import timeit
+from services.change_parser import parse_changes, split_change
+
+
+def legacy_extract_change_values(change_text):
+    """The four-regex implementation PriceFormatter used before the single-pass parser"""
+    if change_text is None:
+        return "0%", "0"
+    change_text = change_text.strip()
+    patterns = [
+        r'\(([+-]?[\d.]+)%\)\s*([+-]?[\d,.]+)',
+        r'([+-]?[\d,.]+)\s*\(([+-]?[\d.]+)%\)',
+        r'([+-]?[\d.]+)%',
+        r'([+-]?[\d,.]+)'
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, change_text)
+        if match:
+            groups = match.groups()
+            if len(groups) == 2:
+                return f"{groups[0]}%", groups[1].replace(',', '')
+            return f"{groups[0]}%", "0" if '%' in groups[0] else groups[0].replace(',', '')
+    return "0%", "0"
+
+
+def sample_texts(count: int, seed: int = 3):
+    rng = random.Random(seed)
+    layouts = ['({p}%) {a}', '{a} ({p}%)', '{p}%', '{a}']
+    return [
+        rng.choice(layouts).format(p=f"{rng.random() * 5:.2f}", a=f"{rng.randint(0, 50_000_000):,}")
+        for _ in range(count)
+    ]
+
+
+def main(count: int = 50_000):
+    texts = sample_texts(count)
+
+    candidates = {
+        'legacy (4 regexes)': lambda: [legacy_extract_change_values(t) for t in texts],
+        'single pass (uncached)': lambda: [split_change(t) for t in texts],
+        'parse_changes (warm cache)': lambda: parse_changes(texts[:1000]),
+    }
+    for name, func in candidates.items():
+        size = 1000 if 'warm' in name else count
+        func()
+        elapsed = min(timeit.repeat(func, number=1, repeat=3))
+        print(f"{name:26} {size / elapsed:12,.0f} strings/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Per-snapshot formatting cost: raw tgju strings vs. parsed Quote records
+
+Run with: python -m benchmarks.bench_format
+"""
+import timeit
+from pathlib import Path
+from typing import Dict
+from benchmarks.bench_change_parser import legacy_extract_change_values
+from services.formatter import PriceFormatter
+from services.scraper import TgjuScraper
+
+FIXTURE = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "tgju_home.html"
+ORDER = ['coin', 'dollar', 'tether', 'gold', 'ons']
+
+
+def legacy_convert_to_toman(price_str):
+    """convert_to_toman as it was before quotes were parsed at ingest"""
+    price_num = int(''.join(c for c in price_str if c.isdigit()))
+    return "{:,}".format(price_num // 10)
+
+
+def legacy_render(raw: dict) -> list:
+    lines = []
+    for key in ORDER:
+        item = raw[key]
+        percent, amount = legacy_extract_change_values(item['change'])
+        is_ons = key == 'ons'
+        price = item['price'] if is_ons else legacy_convert_to_toman(item['price'])
+        amount = amount if is_ons else legacy_convert_to_toman(amount) if amount != "0" else "0"
+        lines.append((price, percent, amount))
+    return lines
+
+
+def quote_render(quotes: dict) -> list:
+    return [PriceFormatter.format_quote(quotes[key]) for key in ORDER]
+
+
+def run(html: str, number: int = 20_000) -> Dict[str, float]:
+    """{candidate: microseconds per rendered snapshot}"""
+    quotes = TgjuScraper(parser='html.parser')._parse_html(html)
+    raw = {
+        key: {'price': f"{quote.price:,}", 'change': f"({quote.percent}%) {quote.change:,}"}
+        for key, quote in quotes.items()
+    }
+
+    results = {}
+    for name, func, data in (('strings (before)', legacy_render, raw), ('quotes (after)', quote_render, quotes)):
+        per_call = min(timeit.repeat(lambda: func(data), number=number, repeat=3)) / number
+        results[name] = round(per_call * 1e6, 3)
+    return results
+
+
+def main(number: int = 20_000):
+    for name, us_per_snapshot in run(FIXTURE.read_text(encoding='utf-8'), number).items():
+        print(f"{name:20} {us_per_snapshot:8.2f} µs/snapshot")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Ingest and query speed of PriceHistory over a year of synthetic 1-minute data
+
+Run with: python -m benchmarks.bench_history
+"""
+import random
+import tempfile
+import time
+from pathlib import Path
+from services.history import PriceHistory
+
+MINUTES_PER_YEAR = 365 * 24 * 60
+START = 1_700_000_000 - 1_700_000_000 % 86400
+
+
+def synthetic_rows(instrument: str, minutes: int, seed: int = 1):
+    rng = random.Random(seed)
+    price = 600_000.0
+    for minute in range(minutes):
+        price = max(1.0, price * (1 + rng.gauss(0, 0.0005)))
+        yield instrument, START + minute * 60, round(price), None, None, 'neutral'
+
+
+def timed(label: str, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    size = len(result) if isinstance(result, list) else result
+    print(f"{label:40} {elapsed * 1000:9.1f} ms   ({size} rows)")
+    return result, elapsed
+
+
+def main(minutes: int = MINUTES_PER_YEAR, batch: int = 10_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        history = PriceHistory(Path(tmp) / 'history.sqlite3')
+
+        started = time.perf_counter()
+        rows = synthetic_rows('dollar', minutes)
+        while True:
+            chunk = [row for _, row in zip(range(batch), rows)]
+            if not chunk:
+                break
+            history.append_rows(chunk)
+            history.flush()
+        elapsed = time.perf_counter() - started
+        print(f"{'ingest':40} {elapsed * 1000:9.1f} ms   ({minutes / elapsed:,.0f} rows/s)")
+
+        end = START + minutes * 60
+        timed('range query, last 24h', history.query, 'dollar', end - 86400, end)
+        timed('range query, last 30d', history.query, 'dollar', end - 30 * 86400, end)
+        timed('OHLC 1m, last 24h', history.ohlc, 'dollar', end - 86400, end, '1m')
+        timed('OHLC 1h, last 7d', history.ohlc, 'dollar', end - 7 * 86400, end, '1h')
+        timed('OHLC 1d, full year', history.ohlc, 'dollar', START, end, '1d')
+        timed('latest point', lambda: [history.latest('dollar')])
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
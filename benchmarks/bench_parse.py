@@ -0,0 +1,59 @@
+"""Micro-benchmark for the offline HTML parse path
+
+Run with: python -m benchmarks.bench_parse
+"""
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict
+from bs4 import BeautifulSoup
+from services.instruments import load_catalog
+from services.scraper import TgjuScraper, HTMLParser, BS4_PARSER
+
+FIXTURE = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "tgju_home.html"
+
+
+def parse_full_tree(html: str):
+    """The original approach: a complete html.parser tree, then five lookups"""
+    soup = BeautifulSoup(html, "html.parser")
+    return [soup.find('li', {'id': f'l-{instrument.element_id}'}) for instrument in load_catalog().values()]
+
+
+def measure(func, html: str, rounds: int):
+    func(html)  # warm-up
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func(html)
+    per_call = (time.perf_counter() - started) / rounds
+
+    tracemalloc.start()
+    func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_call, peak
+
+
+def run(html: str, rounds: int = 20) -> Dict[str, Dict[str, float]]:
+    """{candidate: {'ms_per_parse', 'peak_kib'}} for every available parser"""
+    candidates = {'full tree (html.parser)': parse_full_tree}
+    parsers = ['html.parser'] + (['lxml'] if BS4_PARSER == 'lxml' else []) + (['selectolax'] if HTMLParser else [])
+    for parser in parsers:
+        candidates[f'_parse_html ({parser})'] = TgjuScraper(parser=parser)._parse_html
+
+    results = {}
+    for name, func in candidates.items():
+        per_call, peak = measure(func, html, rounds)
+        results[name] = {'ms_per_parse': round(per_call * 1000, 3), 'peak_kib': round(peak / 1024, 1)}
+    return results
+
+
+def main(rounds: int = 20):
+    html = FIXTURE.read_text(encoding='utf-8')
+    print(f"fixture: {FIXTURE.name} ({len(html) / 1024:.0f} KiB), {rounds} rounds")
+    for name, result in run(html, rounds).items():
+        print(f"{name:32} {result['ms_per_parse']:8.2f} ms/parse   peak alloc {result['peak_kib']:8.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Startup cost: import time of main.py and time from process start to the first channel post
+
+Run with: python -m benchmarks.bench_startup
+
+Both are measured in fresh interpreters, since import costs only show up once.
+For the first post the bot runs unmodified in a child process, pointed at the
+local tgju fixture server and the stub Bot API through environment variables;
+the clock stops when the stub receives the first sendMessage.
+"""
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+from tests.fake_bot_api import FakeBotApi
+from tests.fixture_server import FixtureServer
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ('playwright', 'bs4', 'tenacity', 'matplotlib')
+
+_IMPORT_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import main
+print(json.dumps({{
+    'seconds': time.perf_counter() - started,
+    'heavy': [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+# Runs the real entry point with the scraper aimed at the fixture server
+_BOT_CHILD = """
+import os
+from services.scraper import TgjuScraper
+TgjuScraper.URL = os.environ['BENCH_TGJU_URL']
+import main
+main.main()
+"""
+
+
+def measure_import(rounds: int) -> Dict:
+    samples, heavy = [], []
+    for _ in range(rounds):
+        output = subprocess.run([sys.executable, '-c', _IMPORT_PROBE], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result['seconds'])
+        heavy = result['heavy']
+    return {
+        'n': rounds,
+        'p50_ms': round(statistics.median(samples) * 1000, 1),
+        'min_ms': round(min(samples) * 1000, 1),
+        'heavy_modules_loaded': heavy,
+    }
+
+
+async def _first_post(api: FakeBotApi, tgju_url: str, data_dir: str, timeout: float) -> float:
+    env = {
+        **os.environ,
+        'TELEGRAM_TOKEN': '123:BENCH',
+        'TELEGRAM_API_URL': api.base_url,
+        'CHANNEL_IDS': '-1001',
+        'SCRAPER_MODE': 'http',
+        'PRICE_SOURCES': 'tgju',
+        'METRICS_PORT': '0',
+        'BENCH_TGJU_URL': tgju_url,
+        **{name: str(Path(data_dir) / file) for name, file in (
+            ('SNAPSHOT_FILE', 'snapshot.json'), ('SUBSCRIBERS_FILE', 'subscribers.json'),
+            ('HISTORY_DB', 'history.sqlite3'), ('TICKER_FILE', 'ticker.json'), ('ALERTS_FILE', 'alerts.json'),
+        )},
+    }
+    started = time.perf_counter()
+    child = await asyncio.create_subprocess_exec(sys.executable, '-c', _BOT_CHILD, cwd=ROOT, env=env,
+                                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while not api.sent:
+            if child.returncode is not None or time.perf_counter() - started > timeout:
+                raise RuntimeError("the bot exited or timed out before posting")
+            await asyncio.sleep(0.005)
+        return time.perf_counter() - started
+    finally:
+        if child.returncode is None:
+            child.kill()
+        await child.wait()
+
+
+async def measure_first_post(rounds: int, timeout: float = 60) -> Dict:
+    samples: List[float] = []
+    async with FixtureServer() as server:
+        for _ in range(rounds):
+            # A fresh data directory each time: no snapshot on disk to seed the cache from
+            with tempfile.TemporaryDirectory() as data_dir:
+                async with FakeBotApi() as api:
+                    samples.append(await _first_post(api, server.base_url, data_dir, timeout))
+    return {
+        'n': rounds,
+        'p50_ms': round(statistics.median(samples) * 1000, 1),
+        'max_ms': round(max(samples) * 1000, 1),
+    }
+
+
+async def run(rounds: int = 5) -> Dict[str, Dict]:
+    return {
+        'import_main': await asyncio.get_running_loop().run_in_executor(None, measure_import, rounds),
+        'first_post': await measure_first_post(max(1, rounds // 2)),
+    }
+
+
+def main(rounds: int = 5):
+    results = asyncio.run(run(rounds))
+    imported = results['import_main']
+    print(f"import main       p50 {imported['p50_ms']:8.1f} ms   min {imported['min_ms']:8.1f} ms   "
+          f"heavy modules loaded: {', '.join(imported['heavy_modules_loaded']) or 'none'}")
+    first = results['first_post']
+    print(f"first post        p50 {first['p50_ms']:8.1f} ms   max {first['max_ms']:8.1f} ms   "
+          f"(process start to first sendMessage, {first['n']} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Cost of rendering the price message: the old f-string loop vs compiled templates vs memoized fan-out
+
+Run with: python -m benchmarks.bench_templates
+"""
+import timeit
+from pathlib import Path
+from typing import Dict
+from services.formatter import PriceFormatter
+from services.instruments import load_catalog
+from services.scraper import TgjuScraper
+from services.templates import MessageTemplates
+from utils.date_utils import get_jalali_date
+
+FIXTURE = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "tgju_home.html"
+CHANNELS = 100
+
+
+def legacy_render(instruments, formatter, data: dict) -> str:
+    """TelegramPriceBot._prepare_message before templates (Markdown v1, no escaping)"""
+    message_lines = [
+        "📊 *قیمت‌های لحظه‌ای بازار*",
+        f"🕒 {get_jalali_date()}",
+        "\n━━━━━━━━✨*وضعیت بازار*✨━━━━━━━━\n"
+    ]
+    for key, instrument in instruments.items():
+        quote = data.get(key)
+        if not quote:
+            continue
+        emoji = '🔴' if quote.trend == 'low' else '🟢' if quote.trend == 'high' else '⚪️'
+        price, percent, amount, currency = formatter.format_quote(quote, instrument.toman)
+        message_lines.append(
+            f"{emoji} *{quote.name}*: {price} {currency}\nتغییر: {percent} ({amount} {currency})\n"
+        )
+    return "\n".join(message_lines)
+
+
+def run(html: str, number: int = 2_000) -> Dict[str, float]:
+    """{candidate: microseconds to produce the messages of one tick for CHANNELS chats}"""
+    quotes = TgjuScraper(parser='html.parser')._parse_html(html)
+    instruments, formatter = load_catalog(), PriceFormatter()
+    templates = MessageTemplates(instruments, formatter=formatter)
+    template = templates.default
+    assert legacy_render(instruments, formatter, quotes) == templates.render(quotes)
+
+    def legacy_tick():
+        for _ in range(CHANNELS):
+            legacy_render(instruments, formatter, quotes)
+
+    def template_tick():
+        for _ in range(CHANNELS):
+            template.render(instruments, quotes, formatter, template.date())
+
+    def memoized_tick():
+        for _ in range(CHANNELS):
+            templates.render(quotes)
+
+    results = {}
+    for name, func in (('f-string (before)', legacy_tick), ('template', template_tick),
+                       ('template + memo', memoized_tick)):
+        per_call = min(timeit.repeat(func, number=number, repeat=3)) / number
+        results[name] = round(per_call * 1e6, 3)
+    return results
+
+
+def main(number: int = 2_000):
+    print(f"one tick fanned out to {CHANNELS} chats, fa:markdown")
+    for name, us_per_tick in run(FIXTURE.read_text(encoding='utf-8'), number).items():
+        print(f"{name:20} {us_per_tick:10.2f} µs/tick")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""/price latency while scrapes are in flight: in-process scraper vs ScraperPool
+
+Run with: python -m benchmarks.bench_worker_pool
+
+A probe wakes every few milliseconds and renders the /price reply from a cached
+snapshot, the way the handler does; its latency is the loop delay plus the
+render. Scrapes use html.parser on the full catalog to make parsing CPU-bound.
+"""
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+from services.instruments import CATALOG, load_catalog
+from services.templates import MessageTemplates
+from services.worker_pool import ScraperPool
+from tests.fixture_server import FixtureServer
+
+PROBE_INTERVAL = 0.005
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        'n': len(samples),
+        'p50_ms': round(statistics.median(samples) * 1000, 3),
+        'p99_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 3),
+        'max_ms': round(samples[-1] * 1000, 3),
+    }
+
+
+async def _probe(render, snapshot, stop: asyncio.Event) -> List[float]:
+    samples = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        render(snapshot)
+        samples.append(time.perf_counter() - started - PROBE_INTERVAL)
+    return samples
+
+
+async def _measure(scraper, render, snapshot, rounds: int, concurrency: int) -> Dict:
+    """Probe latency while `concurrency` scrapes run back to back, `rounds` times each"""
+    stop = asyncio.Event()
+    probe = asyncio.ensure_future(_probe(render, snapshot, stop))
+
+    async def scrape_loop():
+        for _ in range(rounds):
+            assert await scraper.get_tgju_data(), "scrape produced no data"
+
+    started = time.perf_counter()
+    if scraper is None:
+        await asyncio.sleep(1)
+    else:
+        await asyncio.gather(*(scrape_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return {**_summary(await probe), 'scrape_seconds': round(elapsed, 2)}
+
+
+async def run(rounds: int = 5, workers: int = 2) -> Dict[str, Dict]:
+    from services.scraper import TgjuScraper
+
+    instruments = dict(CATALOG)
+    options = {'mode': 'http', 'parser': 'html.parser', 'timeout': 30}
+    templates = MessageTemplates(load_catalog())
+
+    def render(data):
+        # The memo would turn every probe after the first into a lookup
+        return templates.default.render(templates.instruments, data, templates.formatter, templates.default.date())
+
+    results = {}
+    async with FixtureServer() as server:
+        in_process = TgjuScraper(instruments=instruments, **options)
+        in_process.URL = server.base_url
+        try:
+            snapshot = await in_process.get_tgju_data()
+            results['idle'] = await _measure(None, render, snapshot, rounds, workers)
+            results['in_process'] = await _measure(in_process, render, snapshot, rounds, workers)
+        finally:
+            await in_process.close()
+
+        pool = ScraperPool({**options, 'url': server.base_url}, instruments, workers=workers)
+        try:
+            await asyncio.gather(*(pool.get_tgju_data() for _ in range(workers)))  # spawn and warm up
+            results['worker_pool'] = await _measure(pool, render, snapshot, rounds, workers)
+        finally:
+            await pool.close()
+    return results
+
+
+def main(rounds: int = 5, workers: int = 2):
+    print(f"{len(CATALOG)} instruments, {workers} concurrent scrapes x {rounds} rounds, html.parser")
+    for name, result in asyncio.run(run(rounds, workers)).items():
+        print(f"{name:12} /price p50 {result['p50_ms']:7.2f} ms   p99 {result['p99_ms']:7.2f} ms   "
+              f"max {result['max_ms']:7.2f} ms   ({result['n']} probes, scrapes took {result['scrape_seconds']} s)")
+
+
+if __name__ == "__main__":
+    main()
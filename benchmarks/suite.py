@@ -0,0 +1,229 @@
+"""Offline benchmark suite: synthetic tgju pages behind a local server, a stub Bot API, JSON results
+
+Run with: python -m benchmarks.suite [--output results.json] [--baseline previous.json] [--quick]
+
+Nothing here touches the network. The pages in tests/fixtures are hand-written
+stand-ins for tgju (see tests/fixtures/README.md), so parse and scrape numbers
+compare versions of this code; they are not measurements of the real site. Compare two versions by running the suite
+on each and passing the older result file as --baseline.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+from telegram import Bot
+from benchmarks import bench_format, bench_parse, bench_startup, bench_templates, bench_worker_pool
+from services.cache import SnapshotCache
+from services.fanout import FanoutSender
+from services.instruments import load_catalog
+from services.pipeline import PricePipeline
+from services.scraper import TgjuScraper
+from services.templates import MessageTemplates
+from tests.fake_bot_api import FakeBotApi
+from tests.fixture_server import LAYOUTS, FixtureServer
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+TOKEN = '123:BENCH'
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    samples = sorted(samples)
+    return {
+        'n': len(samples),
+        'p50_ms': round(statistics.median(samples) * 1000, 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+        'max_ms': round(samples[-1] * 1000, 3),
+    }
+
+
+def bench_parse_and_format(rounds: int, number: int) -> Dict:
+    results = {}
+    for layout, path in LAYOUTS.items():
+        html = path.read_text(encoding='utf-8')
+        results[layout] = {
+            'parse': bench_parse.run(html, rounds),
+            'format_us_per_snapshot': bench_format.run(html, number),
+            'render_us_per_message': bench_templates.run(html, number // 10),
+        }
+    return results
+
+
+async def bench_scrape(rounds: int) -> Dict:
+    """Latency of get_tgju_data per layout and scraper mode against the local server"""
+    results = {}
+    for layout in LAYOUTS:
+        results[layout] = {}
+        for mode in ('http', 'browser'):
+            async with FixtureServer(layout) as server:
+                scraper = TgjuScraper(mode=mode)
+                scraper.URL = server.base_url
+                samples = []
+                try:
+                    for _ in range(rounds):
+                        started = time.perf_counter()
+                        data = await scraper.get_tgju_data()
+                        if not data:
+                            break
+                        samples.append(time.perf_counter() - started)
+                finally:
+                    await scraper.close()
+            # The browser path needs an installed Chromium; record why a mode was skipped
+            results[layout][mode] = summarize(samples) if samples else {'skipped': 'no data (is Chromium installed?)'}
+    return results
+
+
+_TEMPLATES = MessageTemplates(load_catalog())
+
+
+def _render(data: Dict) -> str:
+    """The bot's real message renderer, without constructing the whole bot"""
+    return _TEMPLATES.render(data)
+
+
+async def bench_tick(rounds: int, recipients: int) -> Dict:
+    """Scrape -> render -> queue -> fan-out for one tick, end to end"""
+    async with FixtureServer('current') as server, FakeBotApi() as api:
+        async with Bot(TOKEN, base_url=api.base_url) as bot:
+            scraper = TgjuScraper(mode='http')
+            scraper.URL = server.base_url
+            sender = FanoutSender(
+                lambda chat_id, text: bot.send_message(chat_id=chat_id, text=text),
+                global_rate=1_000_000, per_chat_rate=1_000_000, concurrency=8
+            )
+            chats = list(range(1, recipients + 1))
+            cache = SnapshotCache(scraper.get_tgju_data, ttl=0)
+            pipeline = PricePipeline(
+                cache, render=_render, deliver=lambda message: sender.broadcast(chats, message),
+                poll_interval=3600, scrape_timeout=30, send_timeout=None
+            )
+            # Only the sender loop runs; ticks are driven explicitly below
+            sender_task = asyncio.ensure_future(pipeline._send_loop())
+            samples = []
+            tracemalloc.start()
+            try:
+                for _ in range(rounds):
+                    started = time.perf_counter()
+                    assert await pipeline.publish(), "tick produced no snapshot"
+                    await pipeline.queue.join()
+                    samples.append(time.perf_counter() - started)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+                sender_task.cancel()
+                await asyncio.gather(sender_task, return_exceptions=True)
+                await scraper.close()
+
+    stages = {}
+    for name, stage in pipeline.stats.items():
+        summary = stage.summary()
+        if summary['count']:
+            stages[name] = {'p50_ms': round(summary['p50'] * 1000, 3), 'max_ms': round(summary['max'] * 1000, 3)}
+
+    return {
+        'recipients': recipients,
+        'latency': summarize(samples),
+        'stages': stages,
+        'peak_traced_kib': round(peak / 1024, 1),
+        'messages_delivered': len(api.sent),
+    }
+
+
+async def bench_fanout(recipients: int) -> Dict:
+    """Unthrottled fan-out throughput through the stub Bot API"""
+    async with FakeBotApi() as api:
+        async with Bot(TOKEN, base_url=api.base_url) as bot:
+            sender = FanoutSender(
+                lambda chat_id, text: bot.send_message(chat_id=chat_id, text=text),
+                global_rate=1_000_000, per_chat_rate=1_000_000, concurrency=8
+            )
+            report = await sender.broadcast(range(1, recipients + 1), 'benchmark')
+    return {
+        'recipients': recipients,
+        'sent': report['sent'],
+        'seconds': round(report['seconds'], 3),
+        'messages_per_second': round(report['rate'], 1),
+    }
+
+
+def metadata() -> Dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+
+
+def flatten(data: Dict, prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(results: Dict, baseline: Dict):
+    """Print every numeric result next to the baseline value"""
+    current, previous = flatten(results['results']), flatten(baseline['results'])
+    print(f"\nvs baseline {baseline['meta'].get('git_commit')} ({baseline['meta'].get('timestamp')}):")
+    for name in sorted(current.keys() & previous.keys()):
+        old, new = previous[name], current[name]
+        change = f"{(new - old) / old * 100:+7.1f}%" if old else "    n/a"
+        print(f"  {name:60} {old:>12.6g} -> {new:>12.6g}  {change}")
+
+
+async def run(quick: bool) -> Dict:
+    rounds = 5 if quick else 20
+    results = {
+        'parse_format': bench_parse_and_format(rounds, 2_000 if quick else 20_000),
+        'scrape': await bench_scrape(rounds),
+        'tick': await bench_tick(rounds, recipients=20 if quick else 100),
+        'fanout': await bench_fanout(200 if quick else 1000),
+        # /price latency while scrapes run in-process vs in ScraperPool workers
+        'price_under_load': await bench_worker_pool.run(rounds=2 if quick else 5),
+        # import time of main.py and process start to first channel post, in fresh interpreters
+        'startup': await bench_startup.run(rounds=2 if quick else 5),
+    }
+    results['max_rss_kib'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {'meta': metadata(), 'results': results}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', type=Path, help="result file (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument('--baseline', type=Path, help="earlier result file to compare against")
+    parser.add_argument('--quick', action='store_true', help="fewer rounds, for a smoke run")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args.quick))
+    output = args.output or RESULTS_DIR / f"{results['meta']['git_commit'] or 'unknown'}-{int(time.time())}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    json.dump(results['results'], sys.stdout, indent=2, ensure_ascii=False)
+    print(f"\nresults written to {output}")
+    if args.baseline:
+        compare(results, json.loads(args.baseline.read_text(encoding='utf-8')))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,34 @@
+import asyncio
+import functools
 import logging
+import os
+import signal
+import socket
+import time
+from urllib.parse import urlsplit
 import httpx
 from telegram.ext import Application, ContextTypes, ApplicationBuilder
 from telegram import Update
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from services.scraper import TgjuScraper
+from telegram.error import BadRequest, NetworkError
+from services.alerts import Alert, AlertEngine
+from services.cache import SnapshotCache
+from services.charts import ChartRenderer
+from services.cluster import LeaderElector, SnapshotFollower, create_lock
+from services.fanout import FanoutSender
+from services.pipeline import PricePipeline
+from services.ratelimit import RateLimiter
+from services.snapshot_store import SnapshotStore
+from services.sources import PriceAggregator, create_source
 from services.formatter import PriceFormatter
-from utils.date_utils import get_jalali_date
-from utils.logger import setup_logging
+from services.health import CircuitBreaker
+from services.history import PriceHistory
+from services.instruments import load_catalog
+from services.metrics import REGISTRY, MetricsServer
+from services.subscriptions import SubscriptionStore
+from services.templates import MessageTemplate, MessageTemplates, PriceMessage
+from services.ticker import LiveTicker, text_fingerprint
+from services.webhook import WebhookServer
+from services.worker_pool import ScraperPool
 from config import Config
 
 logger = logging.getLogger(__name__)
@@ -14,127 +36,401 @@ logger = logging.getLogger(__name__)
 
 class TelegramPriceBot:
     def __init__(self):
-        setup_logging()
         self.config = Config()
-        self.scraper = TgjuScraper()
+        self.instruments = load_catalog(self.config.INSTRUMENTS, self.config.INSTRUMENTS_FILE)
+        self.scraper = self._build_scraper()
+        self.aggregator = self._build_aggregator()
+        self.cache = SnapshotCache(self.aggregator.fetch, ttl=self.config.CACHE_TTL)
+        # آخرین داده سالم روی دیسک، تا پس از راه‌اندازی مجدد هم در دسترس باشد
+        self.snapshot_store = SnapshotStore(self.config.SNAPSHOT_FILE)
+        stored = self.snapshot_store.load()
+        if stored is not None:
+            snapshot, saved_at = stored
+            self.cache.seed(snapshot, age=time.time() - saved_at)
+        self.cache.add_listener(self.snapshot_store.save)
+        self.history = PriceHistory(self.config.HISTORY_DB)
+        self.cache.add_listener(self.history.append)
+        self.charts = ChartRenderer(self.history, workers=self.config.CHART_WORKERS)
+        self.alerts = AlertEngine(self.config.ALERTS_FILE)
+        self.cache.add_listener(self._check_alerts)
         self.formatter = PriceFormatter()
+        # قالب‌های پیام (زبان، Markdown/HTML و ارقام) یک‌بار کامپایل می‌شوند؛ هر کانال می‌تواند قالب خود را داشته باشد
+        self.templates = MessageTemplates(
+            self.instruments,
+            default=self.config.MESSAGE_STYLE,
+            channels=self.config.CHANNEL_STYLES,
+            formatter=self.formatter
+        )
+        # /price از کش پاسخ داده می‌شود؛ این محدودیت‌ها جلوی دریافت مکرر داده توسط کاربران را می‌گیرند
+        self.price_limiter = RateLimiter(self.config.PRICE_RATE_LIMIT / 60, burst=self.config.PRICE_BURST)
+        self.refresh_debounce = RateLimiter(1 / self.config.REFRESH_DEBOUNCE)
+        self.http_client = httpx.AsyncClient(http2=True)
+        self.breaker = CircuitBreaker(
+            'telegram',
+            failure_threshold=self.config.BREAKER_THRESHOLD,
+            reset_timeout=self.config.BREAKER_RESET_TIMEOUT,
+            probe=self._probe_telegram
+        )
+        self.subscriptions = SubscriptionStore(self.config.SUBSCRIBERS_FILE)
+        self.fanout = FanoutSender(
+            self._send_telegram_message,
+            global_rate=self.config.SEND_RATE,
+            concurrency=self.config.SEND_CONCURRENCY,
+            max_retries=self.config.RETRY_COUNT,
+            send_timeout=self.config.TIMEOUT,
+            on_forbidden=self.subscriptions.remove
+        )
+        # هشدارها همیشه پیام جداگانه‌اند، حتی در حالت تیکر
+        self.alert_fanout = FanoutSender(
+            functools.partial(self._send_telegram_message, use_ticker=False),
+            global_rate=self.config.SEND_RATE,
+            concurrency=self.config.SEND_CONCURRENCY,
+            max_retries=self.config.RETRY_COUNT,
+            send_timeout=self.config.TIMEOUT
+        )
+        self.pipeline = PricePipeline(
+            self.cache,
+            render=self._prepare_post,
+            deliver=self._deliver,
+            render_stale=self._prepare_stale_post,
+            max_stale=self.config.STALE_MAX_AGE,
+            poll_interval=self.config.POLL_INTERVAL,
+            retry_interval=self.config.RETRY_INTERVAL,
+            scrape_timeout=self.config.SCRAPE_TIMEOUT,
+            send_timeout=None,  # هر ارسال جداگانه در FanoutSender محدود می‌شود
+            send_retries=self.config.RETRY_COUNT,
+            queue_size=self.config.SEND_QUEUE_SIZE,
+            retry_on=(httpx.TransportError, NetworkError, asyncio.TimeoutError),
+            on_give_up=self._handle_http_errors
+        )
+
+        # چند نسخه از ربات: رهبر با قفل مشترک انتخاب می‌شود
+        self.elector = None
+        self.follower = None
+        if self.config.CLUSTER_LOCK:
+            lock = create_lock(
+                self.config.CLUSTER_LOCK,
+                owner=f"{socket.gethostname()}:{os.getpid()}",
+                ttl=self.config.CLUSTER_LEASE
+            )
+            self.elector = LeaderElector(
+                lock, self._on_elected, self._on_demoted, interval=self.config.CLUSTER_LEASE / 3
+            )
+            self.follower = SnapshotFollower(self.snapshot_store, self.cache, interval=self.config.SNAPSHOT_POLL)
+
+        self._startup_task = None
+        # ارسال‌های هشدار در جریان؛ نگه داشتن ارجاع تا پیش از پایان از بین نروند
+        self._alert_tasks = set()
+        self.metrics_server = None
+        if self.config.METRICS_PORT:
+            self.metrics_server = MetricsServer(REGISTRY, self.config.METRICS_HOST, self.config.METRICS_PORT)
+        self._register_gauges()
 
         # تنظیمات پیشرفته HTTP با پارامترهای بهینه شده
         self.app = self._configure_application()
         self.app.bot_data['bot_instance'] = self
 
+        # حالت تیکر زنده: یک پیام سنجاق‌شده در هر گفتگو ویرایش می‌شود
+        self.ticker = None
+        if self.config.DELIVERY_MODE == 'ticker':
+            self.ticker = LiveTicker(
+                self.app.bot,
+                self.config.TICKER_FILE,
+                fingerprint=self._message_fingerprint,
+                timeout=self.config.TIMEOUT
+            )
+
+    def _build_scraper(self):
+        """اسکرپر tgju: داخل همین پردازه یا مجموعه‌ای از پردازه‌های جداگانه (SCRAPER_WORKERS)"""
+        options = dict(
+            mode=self.config.SCRAPER_MODE,
+            timeout=self.config.TIMEOUT,
+            ready_timeout=self.config.READY_TIMEOUT,
+            extract=self.config.BROWSER_EXTRACT,
+            parser=self.config.HTML_PARSER,
+            page_concurrency=self.config.PAGE_CONCURRENCY
+        )
+        if self.config.SCRAPER_WORKERS > 0:
+            # Playwright و Chromium فقط در پردازه‌های کارگر بارگذاری می‌شوند
+            return ScraperPool(
+                {**options, 'browser_pool_size': self.config.BROWSER_POOL_SIZE},
+                self.instruments,
+                workers=self.config.SCRAPER_WORKERS,
+                timeout=self.config.SCRAPER_WORKER_TIMEOUT,
+                max_fetches=self.config.SCRAPER_MAX_FETCHES,
+                memory_limit_mb=self.config.SCRAPER_MEMORY_MB
+            )
+
+        from services.browser import BrowserManager
+        from services.scraper import TgjuScraper
+        return TgjuScraper(
+            BrowserManager(pool_size=self.config.BROWSER_POOL_SIZE),
+            instruments=self.instruments,
+            **options
+        )
+
+    def _build_aggregator(self) -> PriceAggregator:
+        """ساخت منابع قیمت از تنظیمات PRICE_SOURCES"""
+        sources, deadlines = [], {}
+        for entry in self.config.PRICE_SOURCES:
+            name, _, deadline = entry.partition(':')
+            sources.append(create_source(
+                name,
+                scraper=self.scraper,
+                instruments=self.instruments,
+                timeout=self.config.TIMEOUT
+            ))
+            if deadline:
+                deadlines[name] = float(deadline)
+        return PriceAggregator(
+            sources,
+            strategy=self.config.MERGE_STRATEGY,
+            deadline=self.config.SCRAPE_TIMEOUT,
+            deadlines=deadlines,
+            expected=self.instruments
+        )
+
+    def _register_gauges(self):
+        """مقادیر لحظه‌ای که هنگام درخواست /metrics خوانده می‌شوند"""
+        states = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+        REGISTRY.gauge('tgju_bot_snapshot_age_seconds', 'Age of the cached snapshot', lambda: self.cache.age)
+        REGISTRY.gauge('tgju_bot_send_queue_size', 'Messages waiting to be sent', self.pipeline.queue.qsize)
+        REGISTRY.gauge('tgju_bot_stale_served_total', 'Publishes served from a stale snapshot',
+                       lambda: self.pipeline.stale_served)
+        REGISTRY.gauge('tgju_bot_telegram_circuit_state', 'Telegram circuit: 0 closed, 1 half-open, 2 open',
+                       lambda: states[self.breaker.state])
+        REGISTRY.gauge('tgju_bot_subscribers', 'Subscribed chats', lambda: len(self.subscriptions))
+        REGISTRY.gauge('tgju_bot_alert_rules', 'Active alert rules', lambda: len(self.alerts.rules))
+
     def _configure_application(self):
         """تنظیمات پیشرفته برای ارتباط با سرورهای تلگرام"""
+        builder = ApplicationBuilder()
+        http_version = "2"
+        if self.config.TELEGRAM_API_URL:
+            builder = builder.base_url(self.config.TELEGRAM_API_URL)
+            # HTTP/2 بدون TLS پشتیبانی نمی‌شود؛ سرور محلی Bot API با http فقط HTTP/1.1 دارد
+            if not self.config.TELEGRAM_API_URL.startswith('https://'):
+                http_version = "1.1"
         return (
-            ApplicationBuilder()
+            builder
             .token(self.config.TELEGRAM_TOKEN)
             .pool_timeout(self.config.TIMEOUT)
             .connect_timeout(self.config.TIMEOUT)
             .read_timeout(self.config.TIMEOUT)
-            .http_version("2")
-            .get_updates_http_version("2")
+            .http_version(http_version)
+            .get_updates_http_version(http_version)
+            .post_init(self._on_startup)
+            .post_stop(self._on_stop)
+            .post_shutdown(self._on_shutdown)
             .build()
         )
 
-    @retry(
-        stop=stop_after_attempt(Config.RETRY_COUNT),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
-        retry=(
-                retry_if_exception_type(httpx.ConnectTimeout) |
-                retry_if_exception_type(httpx.ReadTimeout) |
-                retry_if_exception_type(httpx.NetworkError)
-        ),
-        reraise=True
-    )
+    @property
+    def is_leader(self) -> bool:
+        """آیا این پردازه داده دریافت و به کانال ارسال می‌کند (بدون خوشه همیشه بله)"""
+        return self.elector is None or self.elector.is_leader
+
     async def send_price_to_channel(self, context: ContextTypes.DEFAULT_TYPE):
-        """ارسال پیام به کانال با مدیریت خطاهای پیشرفته"""
+        """قرار دادن آخرین قیمت‌ها در صف ارسال به کانال"""
+        if not self.is_leader:
+            return
         try:
-            if not await self._check_network_connection():
-                raise httpx.NetworkError("No internet connection available")
-
-            logger.info("در حال دریافت داده‌های بازار...")
-            data = await self.scraper.get_tgju_data()
-
-            if not data:
+            logger.info("در حال آماده‌سازی پیام بازار...")
+            if not await self.pipeline.publish():
                 logger.error("داده‌ای برای ارسال دریافت نشد")
-                await self._send_error(context, "⚠️ خطا در دریافت اطلاعات بازار")
+                await self._send_error("⚠️ خطا در دریافت اطلاعات بازار")
                 return
-
-            message = self._prepare_message(data)
-            await self._send_telegram_message(context, message)
+            logger.info(f"وضعیت صف ارسال: {self.pipeline.metrics()}")
+            logger.info(f"وضعیت اتصال تلگرام: {self.breaker.metrics()}")
+            logger.info(f"وضعیت منابع قیمت: {self.aggregator.metrics()}")
+            logger.info(f"وضعیت قالب‌های پیام: {self.templates.metrics()}")
 
         except Exception as e:
-            logger.error(f"خطای غیرمنتظره در ارسال پیام: {type(e).__name__} - {str(e)}")
-            await self._handle_http_errors(context, e)
+            logger.error(f"خطای غیرمنتظره در آماده‌سازی پیام: {type(e).__name__} - {str(e)}")
             raise
 
-    async def _send_telegram_message(self, context: ContextTypes.DEFAULT_TYPE, message: str):
-        """ارسال پیام به تلگرام با تنظیمات بهینه"""
+    def _recipients(self) -> list:
+        """کانال‌ها و مشترکینی که پیام قیمت را دریافت می‌کنند"""
+        # مشترکین ممکن است توسط پردازه‌های دیگر اضافه شده باشند
+        self.subscriptions.refresh()
+        return self.config.CHANNEL_IDS + self.subscriptions.list()
+
+    async def _deliver(self, message: PriceMessage):
+        """ارسال یک پیام آماده از صف به همه کانال‌ها و مشترکین، هر گروه با قالب خودش"""
+        if not await self.breaker.allow():
+            raise NetworkError(f"Telegram circuit is {self.breaker.state}")
+        groups = self.templates.group(self._recipients())
+        await asyncio.gather(*(
+            self.fanout.broadcast(chat_ids, message.text(style)) for style, chat_ids in groups.items()
+        ))
+
+    def _check_alerts(self, snapshot: dict):
+        """بررسی هشدارهای کاربران با هر اسنپ‌شات جدید (بدون مسدود کردن کش)"""
+        self.alerts.refresh()
+        alerts = self.alerts.evaluate(snapshot)
+        if alerts:
+            logger.info(f"{len(alerts)} هشدار فعال شد")
+            task = asyncio.ensure_future(self._deliver_alerts(alerts))
+            self._alert_tasks.add(task)
+            task.add_done_callback(self._on_alerts_delivered)
+
+    def _on_alerts_delivered(self, task: asyncio.Task):
+        """ثبت خطای پیش‌بینی‌نشده یک ارسال هشدار پس‌زمینه"""
+        self._alert_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            error = task.exception()
+            logger.error(f"خطای غیرمنتظره در ارسال هشدارها: {type(error).__name__} - {str(error)}")
+
+    async def _deliver_alerts(self, alerts: list):
+        """ارسال هشدارها؛ گفتگوهایی که متن یکسان دارند با یک ارسال گروهی پوشش داده می‌شوند"""
+        by_chat = {}
+        for alert in alerts:
+            template = self.templates.template_for(alert.rule.chat_id)
+            by_chat.setdefault(alert.rule.chat_id, []).append(self._format_alert(alert, template))
+
+        by_text = {}
+        for chat_id, lines in by_chat.items():
+            by_text.setdefault("\n\n".join(lines), []).append(chat_id)
+
         try:
-            await context.bot.send_message(
-                chat_id=self.config.CHANNEL_ID,
-                text=message,
-                parse_mode='Markdown',
-                read_timeout=self.config.TIMEOUT,
-                write_timeout=self.config.TIMEOUT,
-                connect_timeout=self.config.TIMEOUT,
-                api_kwargs={
-                    'retry_timeout': self.config.TIMEOUT,
-                    'http_version': '2'
-                }
-            )
-            logger.info("پیام با موفقیت ارسال شد")
+            if not await self.breaker.allow():
+                logger.warning(f"ارسال {len(alerts)} هشدار به دلیل قطع اتصال تلگرام انجام نشد")
+                return
+            await asyncio.gather(*(
+                self.alert_fanout.broadcast(chat_ids, text) for text, chat_ids in by_text.items()
+            ))
         except Exception as e:
-            logger.error(f"خطا در ارسال پیام: {e}")
+            logger.error(f"خطا در ارسال هشدارها: {type(e).__name__} - {str(e)}")
+
+    def _format_alert(self, alert: Alert, template: MessageTemplate) -> str:
+        """متن یک هشدار فعال‌شده، با قالب‌بندی و escape مخصوص قالب پیام گفتگو"""
+        rule, quote = alert.rule, alert.quote
+        instrument = self.instruments.get(quote.key)
+        toman = instrument.toman if instrument is not None else quote.is_rial
+        price, _, _, currency = self.formatter.format_quote(quote, toman)
+
+        def amount(value) -> str:
+            return self.formatter.format_number(self.formatter.to_toman(value) if toman else value)
+
+        values = dict(name=quote.name, price=price, currency=currency)
+        if rule.kind == 'above':
+            return template.fill("🔔📈 <b>{name}</b> از {level} {currency} بالاتر رفت: {price} {currency}",
+                                 level=amount(rule.value), **values)
+        if rule.kind == 'below':
+            return template.fill("🔔📉 <b>{name}</b> به زیر {level} {currency} رسید: {price} {currency}",
+                                 level=amount(rule.value), **values)
+
+        percent = self.formatter.format_number(round(alert.move * 100 / alert.previous, 2))
+        sign = '+' if alert.move > 0 else '-'
+        values['change'] = f"{sign}{amount(abs(alert.move))} {currency} ({percent}%)"
+        if rule.kind == 'spike':
+            return template.fill("🔔⚡️ <b>{name}</b> در {minutes} دقیقه اخیر {change} تغییر کرد: {price} {currency}",
+                                 minutes=rule.window // 60, **values)
+        return template.fill("🔔 <b>{name}</b> {change} تغییر کرد: {price} {currency}", **values)
+
+    async def _send_telegram_message(self, chat_id, message: str, use_ticker: bool = True, parse_mode: str = None):
+        """ارسال پیام به تلگرام با تنظیمات بهینه (parse_mode پیش‌فرض: قالب همان گفتگو)"""
+        parse_mode = parse_mode or self.templates.template_for(chat_id).parse_mode
+        try:
+            if use_ticker and self.ticker is not None:
+                outcome = await self.ticker.update(chat_id, message, parse_mode=parse_mode)
+                logger.info(f"تیکر {chat_id}: {outcome}")
+            else:
+                await self.app.bot.send_message(
+                    chat_id=chat_id,
+                    text=message,
+                    parse_mode=parse_mode,
+                    read_timeout=self.config.TIMEOUT,
+                    write_timeout=self.config.TIMEOUT,
+                    connect_timeout=self.config.TIMEOUT,
+                    api_kwargs={
+                        'retry_timeout': self.config.TIMEOUT,
+                        'http_version': '2'
+                    }
+                )
+                logger.info(f"پیام با موفقیت به {chat_id} ارسال شد")
+        except BadRequest as e:
+            # سرور پاسخ داده است؛ مشکل از خود پیام است نه از اتصال
+            self.breaker.record_success()
+            logger.error(f"خطا در ارسال پیام به {chat_id}: {e}")
             raise
+        except (NetworkError, httpx.TransportError) as e:
+            self.breaker.record_failure()
+            logger.error(f"خطا در ارسال پیام به {chat_id}: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"خطا در ارسال پیام به {chat_id}: {e}")
+            raise
+        else:
+            self.breaker.record_success()
 
-    def _prepare_message(self, data: dict) -> str:
-        """آماده‌سازی متن پیام"""
-        message_lines = [
-            f"📊 *قیمت‌های لحظه‌ای بازار*",
-            f"🕒 {get_jalali_date()}",
-            "\n━━━━━━━━✨*وضعیت بازار*✨━━━━━━━━\n"
-        ]
-
-        for key in ['coin', 'dollar', 'tether', 'gold', 'ons']:
-            item = data.get(key)
-            if not item:
-                continue
-
-            emoji = '🔴' if item['trend'] == 'low' else '🟢' if item['trend'] == 'high' else '⚪️'
-            percent, amount = self.formatter.extract_change_values(item['change'])
-            is_ons = (key == 'ons')
-
-            price = item['price'] if is_ons else self.formatter.convert_to_toman(item['price'])
-            amount = amount if is_ons else self.formatter.convert_to_toman(amount) if amount != "0" else "0"
-            currency = 'دلار' if is_ons else 'تومان'
-
-            message_lines.append(
-                f"{emoji} *{item['name']}*: {price} {currency}\nتغییر: {percent} ({amount} {currency})\n"
-            )
+    @staticmethod
+    def _message_fingerprint(message: str) -> str:
+        """اثر انگشت محتوای پیام بدون خط زمان، تا تغییر ساعت باعث ویرایش نشود"""
+        return text_fingerprint("\n".join(line for line in message.splitlines() if not line.startswith("🕒")))
+
+    async def price_reply(self, key: str = None, refresh: bool = False, chat_id=None):
+        """متن پاسخ /price از آخرین اسنپ‌شات کش؛ None اگر هنوز داده‌ای در دسترس نباشد
+
+        فقط وقتی هیچ داده‌ای نیست، یا کاربر «به‌روزرسانی» زده و کش قدیمی‌تر از
+        CACHE_TTL است، داده دریافت می‌شود و در آن صورت هم درخواست‌های همزمان
+        یک دریافت مشترک دارند. متن با قالب گفتگوی chat_id ساخته می‌شود.
+        """
+        snapshot = self.cache.peek()
+        # پیروها هرگز خودشان داده دریافت نمی‌کنند و فقط اسنپ‌شات رهبر را می‌خوانند
+        if (snapshot is None or refresh) and self.is_leader:
+            try:
+                snapshot = await asyncio.wait_for(self.cache.get(), self.config.SCRAPE_TIMEOUT) or snapshot
+            except asyncio.TimeoutError:
+                logger.warning("دریافت داده برای پاسخ /price زمان‌گذشت")
+                snapshot = self.cache.peek()
+        if snapshot is None:
+            return None
 
-        return "\n".join(message_lines)
+        keys = [key] if key else None
+        style = self.templates.template_for(chat_id).spec
+        age = self.cache.age or 0
+        # اگر خط لوله یک نوبت را از دست داده باشد، زمان واقعی داده نمایش داده می‌شود
+        if age > self.config.POLL_INTERVAL + self.config.SCRAPE_TIMEOUT:
+            return self._prepare_message(snapshot, as_of=time.time() - age, keys=keys, style=style)
+        return self._prepare_message(snapshot, keys=keys, style=style)
 
-    async def _handle_http_errors(self, context: ContextTypes.DEFAULT_TYPE, error: Exception):
-        """مدیریت خطاهای HTTP"""
+    def _prepare_post(self, data: dict, as_of: float = None) -> PriceMessage:
+        """پیام صف ارسال؛ متن قالب پیش‌فرض همین‌جا ساخته می‌شود و بقیه قالب‌ها هنگام ارسال"""
+        message = PriceMessage(self.templates, data, as_of=as_of)
+        message.text()
+        return message
+
+    def _prepare_stale_post(self, data: dict, age: float) -> PriceMessage:
+        """پیام آخرین داده سالم، وقتی دریافت داده تازه ناموفق بوده است"""
+        return self._prepare_post(data, as_of=time.time() - age)
+
+    def _prepare_message(self, data: dict, as_of: float = None, keys: list = None, style: str = None) -> str:
+        """آماده‌سازی متن پیام (keys: فقط این نمادها، style: قالب پیام، پیش‌فرض MESSAGE_STYLE)"""
+        return self.templates.render(data, style, as_of=as_of, keys=keys)
+
+    async def _handle_http_errors(self, message: str, error: Exception):
+        """مدیریت خطاهای HTTP پس از شکست همه تلاش‌های ارسال"""
         error_messages = {
             httpx.ConnectTimeout: "⏳ اتصال به سرور تلگرام زمان‌گذشت",
             httpx.ReadTimeout: "⌛️ سرور تلگرام پاسخ نداد",
             httpx.NetworkError: "🔌 مشکل در اتصال به اینترنت",
-            httpx.HTTPStatusError: f"⚠️ خطای سرور (کد {error.response.status_code})"
         }
+        if isinstance(error, httpx.HTTPStatusError):
+            await self._send_error(f"⚠️ خطای سرور (کد {error.response.status_code})")
+            return
 
-        for error_type, message in error_messages.items():
+        for error_type, error_message in error_messages.items():
             if isinstance(error, error_type):
-                await self._send_error(context, message)
+                await self._send_error(error_message)
                 return
 
-        await self._send_error(context, "⚠️ خطای ناشناخته در ارتباط با تلگرام")
+        await self._send_error("⚠️ خطای ناشناخته در ارتباط با تلگرام")
 
-    async def _send_error(self, context: ContextTypes.DEFAULT_TYPE, message: str):
+    async def _send_error(self, message: str):
         """ارسال پیام خطا"""
         try:
-            await context.bot.send_message(
+            await self.app.bot.send_message(
                 chat_id=self.config.CHANNEL_ID,
                 text=message,
                 read_timeout=self.config.TIMEOUT,
@@ -144,29 +440,168 @@ class TelegramPriceBot:
         except Exception as e:
             logger.error(f"خطا در ارسال پیام خطا: {e}")
 
-    async def _check_network_connection(self) -> bool:
-        """بررسی اتصال به اینترنت"""
+    async def _probe_telegram(self) -> bool:
+        """بررسی اتصال به تلگرام با کلاینت مشترک (فقط در حالت نیمه‌باز)"""
+        await self.http_client.get(self._telegram_origin(), timeout=5)
+        return True
+
+    def _telegram_origin(self) -> str:
+        """ریشه همان سرور Bot API که ربات استفاده می‌کند (TELEGRAM_API_URL یا api.telegram.org)"""
+        if not self.config.TELEGRAM_API_URL:
+            return "https://api.telegram.org"
+        url = urlsplit(self.config.TELEGRAM_API_URL)
+        return f"{url.scheme}://{url.netloc}"
+
+    async def _on_startup(self, application: Application):
+        """راه‌اندازی خط لوله دریافت و ارسال قیمت‌ها"""
+        if self.metrics_server is not None:
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                # پورت اشغال (مثلاً پردازه دیگری روی همین میزبان) نباید ربات را از کار بیندازد
+                logger.error(f"راه‌اندازی نقطه /metrics روی پورت {self.config.METRICS_PORT} ممکن نشد: {e}")
+                self.metrics_server = None
+        self.history.start()
+        # گرم کردن اسکرپر در پس‌زمینه، تا دریافت به‌روزرسانی‌ها بدون انتظار شروع شود
+        self._startup_task = asyncio.ensure_future(self._start_scraping())
+
+    async def _start_scraping(self):
+        """گرم کردن منابع قیمت، شروع دریافت و ارسال اولین پیام به محض آماده شدن داده"""
+        started = time.perf_counter()
+        await self.aggregator.warm_up()
+        logger.info(f"منابع قیمت در {time.perf_counter() - started:.2f} ثانیه آماده شدند")
+        if self.elector is None:
+            self.pipeline.start()
+        else:
+            self.follower.start()
+            await self.elector.start()
+        # اولین پیام منتظر UPDATE_INTERVAL نمی‌ماند و از همان دریافتی که poller شروع کرده استفاده می‌کند
         try:
-            async with httpx.AsyncClient() as client:
-                await client.get("https://api.telegram.org", timeout=5)
-            return True
+            await self.send_price_to_channel(None)
         except Exception:
-            return False
+            pass  # خطا در send_price_to_channel ثبت شده است
+
+    async def _on_elected(self):
+        """این پردازه رهبر شد: دریافت و ارسال قیمت‌ها را شروع می‌کند"""
+        await self.follower.stop()
+        self.pipeline.start()
+        if self.config.RUN_MODE == 'webhook':
+            # فقط رهبر وب‌هوک را ثبت می‌کند؛ بقیه با همان WEBHOOK_SECRET درخواست‌ها را می‌پذیرند
+            try:
+                await self._register_webhook()
+            except Exception as e:
+                logger.error(f"خطا در ثبت وب‌هوک: {type(e).__name__} - {e}")
+
+    async def _on_demoted(self):
+        """رهبری از دست رفت: توقف دریافت و خواندن اسنپ‌شات رهبر جدید"""
+        await self.pipeline.stop()
+        self.follower.start()
+
+    async def _on_stop(self, application: Application):
+        """ارسال پیام‌ها و هشدارهای باقی‌مانده پیش از بسته شدن اتصال به تلگرام"""
+        await self.pipeline.drain(self.config.SHUTDOWN_TIMEOUT)
+        if self._alert_tasks:
+            _, pending = await asyncio.wait(set(self._alert_tasks), timeout=self.config.SHUTDOWN_TIMEOUT)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.warning(f"{len(pending)} ارسال هشدار پیش از خاموش شدن تمام نشد")
+
+    async def _on_shutdown(self, application: Application):
+        """بستن منابع مشترک هنگام خاموش شدن ربات"""
+        if self._startup_task is not None and not self._startup_task.done():
+            self._startup_task.cancel()
+            await asyncio.gather(self._startup_task, return_exceptions=True)
+        if self.elector is not None:
+            # آزاد کردن قفل تا پردازه دیگری بلافاصله رهبر شود
+            await self.elector.stop()
+            await self.follower.stop()
+        await self.pipeline.stop()
+        self.charts.close()
+        await self.history.stop()
+        if self.elector is None:
+            # در خوشه هر تغییر همان لحظه ذخیره شده است و نسخه این پردازه ممکن است قدیمی باشد
+            self.alerts.save()
+        await self.aggregator.close()
+        await self.http_client.aclose()
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
 
     def run(self):
         """راه‌اندازی ربات"""
         from bot.handlers import setup_handlers
         setup_handlers(self)
 
+        # اولین ارسال پس از آماده شدن داده در _start_scraping انجام می‌شود
         self.app.job_queue.run_repeating(
             self.send_price_to_channel,
             interval=self.config.UPDATE_INTERVAL,
-            first=10
+            first=self.config.UPDATE_INTERVAL
         )
 
+        if self.config.RUN_MODE == 'webhook':
+            logger.info("ربات در حالت وب‌هوک راه‌اندازی می‌شود...")
+            asyncio.run(self._run_webhook())
+            return
+
         logger.info("ربات در حال راه‌اندازی...")
         self.app.run_polling(
             close_loop=False,
             stop_signals=None,
             drop_pending_updates=True
-        )
\ No newline at end of file
+        )
+
+    async def _register_webhook(self):
+        """اعلام آدرس و رمز وب‌هوک به تلگرام؛ در خوشه فقط توسط رهبر"""
+        await self.app.bot.set_webhook(
+            url=self.config.WEBHOOK_URL,
+            secret_token=self.config.WEBHOOK_SECRET,
+            allowed_updates=Update.ALL_TYPES,
+            drop_pending_updates=self.config.DROP_PENDING_UPDATES
+        )
+        logger.info(f"وب‌هوک در {self.config.WEBHOOK_URL} ثبت شد")
+
+    async def _run_webhook(self):
+        """دریافت به‌روزرسانی‌ها از طریق وب‌هوک به جای polling
+
+        ترتیب توقف: ابتدا سرور وب‌هوک بسته می‌شود تا درخواست جدیدی نیاید، سپس
+        Application به‌روزرسانی‌ها و jobهای در حال اجرا را تمام می‌کند و در آخر
+        صف پیام‌ها تخلیه و منابع بسته می‌شوند.
+        """
+        if not self.config.WEBHOOK_URL:
+            raise ValueError("برای حالت وب‌هوک مقدار WEBHOOK_URL لازم است")
+        if not self.config.WEBHOOK_SECRET:
+            raise ValueError("برای حالت وب‌هوک مقدار WEBHOOK_SECRET لازم است")
+
+        server = WebhookServer(
+            self.app,
+            secret_token=self.config.WEBHOOK_SECRET,
+            path=self.config.WEBHOOK_PATH,
+            host=self.config.WEBHOOK_LISTEN,
+            port=self.config.WEBHOOK_PORT
+        )
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        await self.app.initialize()
+        # post_init و بقیه callbackها فقط توسط run_polling/run_webhook صدا زده می‌شوند
+        await self._on_startup(self.app)
+        try:
+            await server.start()
+            if self.elector is None:
+                await self._register_webhook()
+            await self.app.start()
+            logger.info("ربات آماده دریافت به‌روزرسانی‌ها از وب‌هوک است")
+            await stop.wait()
+        finally:
+            logger.info("در حال توقف ربات...")
+            await server.stop()
+            if self.app.running:
+                await self.app.stop()
+            await self._on_stop(self.app)
+            await self._on_shutdown(self.app)
+            await self.app.shutdown()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(sig)
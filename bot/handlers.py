@@ -1,35 +1,289 @@
-from telegram import Update
-from telegram.ext import CommandHandler, ContextTypes
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.error import BadRequest
+from telegram.ext import CallbackQueryHandler, CommandHandler, ContextTypes
+from services import charts
+from services.numbers import normalize_digits, parse_number
+from utils.date_utils import get_time_of_day
 import logging
+import math
+import re
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 
+PRICE_CALLBACK = 'price'
+
+
+def _price_keyboard(key: str = '') -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton("🔄 به‌روزرسانی", callback_data=f"{PRICE_CALLBACK}:{key}")
+    ]])
+
+
 async def price_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /price command"""
+    """Handle /price [symbol]: reply to the user from the cached snapshot"""
+    bot = context.bot_data['bot_instance']
+    user_id = update.effective_user.id
+    args = context.args or []
+
+    if not bot.price_limiter.allow(user_id):
+        wait = math.ceil(bot.price_limiter.retry_after(user_id))
+        logger.info(f"Price command from user {user_id} rate limited")
+        await update.message.reply_text(f"⏳ لطفاً {wait} ثانیه دیگر دوباره تلاش کنید.")
+        return
+
+    key = ''
+    if args:
+        instrument = _resolve_symbol(bot.instruments, args[0])
+        if instrument is None:
+            symbols = "، ".join(instrument.key for instrument in bot.instruments.values())
+            await update.message.reply_text(f"❌ نماد ناشناخته است. نمادهای موجود: {symbols}")
+            return
+        key = instrument.key
+
     try:
-        user_id = update.effective_user.id
-        logger.info(f"Price command received from user {user_id}")
+        message = await bot.price_reply(key, chat_id=update.effective_chat.id)
+    except Exception as e:
+        logger.error(f"Error in price_command: {type(e).__name__} - {e}")
+        message = None
+    if message is None:
+        await update.message.reply_text("❌ اطلاعات بازار در حال حاضر در دسترس نیست.")
+        return
+    parse_mode = bot.templates.template_for(update.effective_chat.id).parse_mode
+    await update.message.reply_text(message, parse_mode=parse_mode, reply_markup=_price_keyboard(key))
+
 
-        # دریافت instance ربات از context
-        bot = context.bot_data['bot_instance']
+async def price_refresh_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle the refresh button under a /price reply; debounced per chat"""
+    bot = context.bot_data['bot_instance']
+    query = update.callback_query
+    chat_id = update.effective_chat.id
 
-        processing_message = await update.message.reply_text("در حال دریافت اطلاعات بازار...")
+    if not bot.refresh_debounce.allow(chat_id):
+        await query.answer("قیمت‌ها به‌تازگی به‌روز شده‌اند.")
+        return
 
-        # فراخوانی متد از طریق instance ربات
-        await context.application.job_queue.run_once(
-            lambda ctx: bot.send_price_to_channel(ctx),
-            when=0,
-            chat_id=update.effective_chat.id
-        )
-        await processing_message.edit_text("✅ اطلاعات بازار با موفقیت به کانال ارسال شد.")
+    # Answer right away: Telegram shows a spinner until then and drops answers after a few seconds
+    await query.answer("⏳ در حال به‌روزرسانی...")
 
+    key = query.data.partition(':')[2]
+    if key and key not in bot.instruments:
+        key = ''
+    try:
+        message = await bot.price_reply(key, refresh=True, chat_id=chat_id)
     except Exception as e:
-        logger.error(f"Error in price_command: {e}")
-        await update.message.reply_text(f"❌ خطا در دریافت اطلاعات بازار: {str(e)}")
+        logger.error(f"Error in price_refresh_callback: {type(e).__name__} - {e}")
+        message = None
+    if message is None:
+        await query.message.reply_text("❌ اطلاعات بازار در حال حاضر در دسترس نیست.")
+        return
+
+    try:
+        await query.edit_message_text(message, parse_mode=bot.templates.template_for(chat_id).parse_mode,
+                                      reply_markup=_price_keyboard(key))
+    except BadRequest as e:
+        if 'not modified' not in str(e).lower():
+            raise
+
+
+CHART_USAGE = (
+    "راهنمای نمودار:\n"
+    "/chart dollar — نمودار ۲۴ ساعت اخیر\n"
+    "/chart coin 7d candle — بازه 1h / 6h / 24h / 7d / 30d، نوع line یا candle"
+)
+
+CHART_RANGE_NAMES = {
+    '1h': 'یک ساعت اخیر',
+    '6h': '۶ ساعت اخیر',
+    '24h': '۲۴ ساعت اخیر',
+    '7d': '۷ روز اخیر',
+    '30d': '۳۰ روز اخیر',
+}
+
+
+async def chart_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /chart <symbol> [range] [line|candle]"""
+    bot = context.bot_data['bot_instance']
+    user_id = update.effective_user.id
+    args = context.args or []
+
+    if not charts.AVAILABLE:
+        await update.message.reply_text("❌ رسم نمودار روی این سرور فعال نیست.")
+        return
+    instrument = _resolve_symbol(bot.instruments, args[0]) if args else None
+    try:
+        if instrument is None:
+            raise ValueError("unknown symbol")
+        range_name, style = charts.parse_chart_args(args[1:])
+    except ValueError:
+        await update.message.reply_text(CHART_USAGE)
+        return
+
+    # رسم نمودار پرهزینه است و همان محدودیت /price را دارد
+    if not bot.price_limiter.allow(user_id):
+        wait = math.ceil(bot.price_limiter.retry_after(user_id))
+        await update.message.reply_text(f"⏳ لطفاً {wait} ثانیه دیگر دوباره تلاش کنید.")
+        return
+
+    try:
+        chart = await bot.charts.get(instrument, range_name, style)
+    except Exception as e:
+        logger.error(f"Error rendering chart: {type(e).__name__} - {e}")
+        await update.message.reply_text("❌ خطا در رسم نمودار.")
+        return
+    if chart is None:
+        await update.message.reply_text("ℹ️ هنوز داده کافی برای این بازه ذخیره نشده است.")
+        return
+
+    caption = (
+        f"📈 {instrument.name} — {CHART_RANGE_NAMES[range_name]}\n"
+        f"🕒 آخرین داده: {get_time_of_day(chart.last_ts)}"
+    )
+    message = await update.message.reply_photo(photo=chart.photo, caption=caption)
+    if chart.file_id is None and message.photo:
+        bot.charts.remember_file_id(chart.key, message.photo[-1].file_id)
+
+
+async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /subscribe command"""
+    bot = context.bot_data['bot_instance']
+    chat_id = update.effective_chat.id
+
+    if bot.subscriptions.add(chat_id):
+        logger.info(f"Chat {chat_id} subscribed")
+        await update.message.reply_text("✅ از این پس قیمت‌های بازار برای شما هم ارسال می‌شود.")
+    else:
+        await update.message.reply_text("ℹ️ شما قبلاً عضو شده‌اید.")
+
+
+async def unsubscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /unsubscribe command"""
+    bot = context.bot_data['bot_instance']
+    chat_id = update.effective_chat.id
+
+    if bot.subscriptions.remove(chat_id):
+        logger.info(f"Chat {chat_id} unsubscribed")
+        await update.message.reply_text("✅ اشتراک شما لغو شد.")
+    else:
+        await update.message.reply_text("ℹ️ شما عضو نبودید.")
+
+
+ALERT_USAGE = (
+    "راهنمای هشدار قیمت:\n"
+    "/alert dollar above 65000 — عبور از یک قیمت به بالا (تومان)\n"
+    "/alert dollar below 60000 — عبور از یک قیمت به پایین\n"
+    "/alert gold move 1% — تغییر بین دو به‌روزرسانی (درصد یا مبلغ)\n"
+    "/alert coin spike 3% 1h — تغییر در یک بازه زمانی (m/h/d، حداکثر 1d)\n"
+    "/alert list — فهرست هشدارها\n"
+    "/alert del 12 — حذف هشدار"
+)
+
+_WINDOW_RE = re.compile(r'^(\d+)([mhd])$')
+_WINDOW_UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+
+
+def _resolve_symbol(instruments, symbol: str):
+    """Map an instrument key or its Persian name to the instrument"""
+    for instrument in instruments.values():
+        if symbol.lower() in (instrument.key, instrument.name):
+            return instrument
+    return None
+
+
+def _parse_alert_args(instruments, args, max_window: Optional[int] = None):
+    """Turn /alert arguments into (instrument key, kind, value, window); raises ValueError
+
+    A spike window longer than `max_window` seconds (the price history the
+    alert engine keeps) is rejected.
+    """
+    if len(args) < 3:
+        raise ValueError("incomplete alert")
+    instrument = _resolve_symbol(instruments, args[0])
+    if instrument is None:
+        raise ValueError(f"unknown symbol {args[0]!r}")
+    kind, amount = args[1].lower(), normalize_digits(args[2])
+    is_percent = amount.endswith('%')
+    value = parse_number(amount.rstrip('%'))
+    if value is None or value <= 0:
+        raise ValueError(f"invalid amount {args[2]!r}")
+
+    window = 0
+    if kind == 'move':
+        kind = 'move_pct' if is_percent else 'move_abs'
+    elif kind == 'spike':
+        match = _WINDOW_RE.match(args[3].lower()) if len(args) > 3 else None
+        if not is_percent or match is None:
+            raise ValueError("spike needs a percent and a window")
+        window = int(match.group(1)) * _WINDOW_UNITS[match.group(2)]
+        if window <= 0 or (max_window is not None and window > max_window):
+            raise ValueError(f"spike window {args[3]!r} outside 1m..{max_window}s")
+    elif kind not in ('above', 'below') or is_percent:
+        raise ValueError(f"unknown alert kind {kind!r}")
+
+    # کاربران قیمت ریالی را به تومان وارد می‌کنند
+    if kind in ('above', 'below', 'move_abs') and instrument.toman:
+        value *= 10
+    return instrument.key, kind, value, window
+
+
+def _describe_rule(instruments, rule) -> str:
+    instrument = instruments.get(rule.instrument)
+    name = instrument.name if instrument is not None else rule.instrument
+    value = rule.value
+    if rule.kind in ('above', 'below', 'move_abs') and (instrument is None or instrument.toman):
+        value = value / 10
+    if rule.kind == 'above':
+        return f"#{rule.id} {name} بالاتر از {value:,}"
+    if rule.kind == 'below':
+        return f"#{rule.id} {name} پایین‌تر از {value:,}"
+    if rule.kind == 'move_abs':
+        return f"#{rule.id} {name} تغییر {value:,}"
+    if rule.kind == 'move_pct':
+        return f"#{rule.id} {name} تغییر {value}%"
+    return f"#{rule.id} {name} تغییر {value}% در {rule.window // 60} دقیقه"
+
+
+async def alert_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /alert command"""
+    bot = context.bot_data['bot_instance']
+    chat_id = update.effective_chat.id
+    args = context.args or []
+
+    if not args or args[0].lower() == 'list':
+        rules = bot.alerts.rules_for_chat(chat_id)
+        if not rules:
+            await update.message.reply_text("ℹ️ هشداری ثبت نکرده‌اید.\n\n" + ALERT_USAGE)
+            return
+        await update.message.reply_text("\n".join(_describe_rule(bot.instruments, rule) for rule in rules))
+        return
+
+    if args[0].lower() in ('del', 'delete', 'remove'):
+        rule_id = parse_number(args[1]) if len(args) > 1 else None
+        if isinstance(rule_id, int) and bot.alerts.remove_rule(rule_id, chat_id=chat_id):
+            await update.message.reply_text(f"✅ هشدار #{rule_id} حذف شد.")
+        else:
+            await update.message.reply_text("❌ هشداری با این شماره پیدا نشد.")
+        return
+
+    try:
+        instrument, kind, value, window = _parse_alert_args(bot.instruments, args, bot.alerts.max_window)
+    except ValueError as e:
+        logger.info(f"Invalid /alert from chat {chat_id}: {e}")
+        await update.message.reply_text("❌ دستور نامعتبر است.\n\n" + ALERT_USAGE)
+        return
+
+    rule = bot.alerts.add_rule(chat_id, instrument, kind, value, window)
+    logger.info(f"Chat {chat_id} added alert {rule!r}")
+    await update.message.reply_text(f"✅ هشدار ثبت شد: {_describe_rule(bot.instruments, rule)}")
 
 
 def setup_handlers(bot):
     """Setup bot handlers"""
     bot.app.add_handler(CommandHandler("price", price_command))
+    bot.app.add_handler(CallbackQueryHandler(price_refresh_callback, pattern=rf"^{PRICE_CALLBACK}:"))
+    bot.app.add_handler(CommandHandler("chart", chart_command))
+    bot.app.add_handler(CommandHandler("subscribe", subscribe_command))
+    bot.app.add_handler(CommandHandler("unsubscribe", unsubscribe_command))
+    bot.app.add_handler(CommandHandler("alert", alert_command))
     bot.app.bot_data['bot_instance'] = bot  # ذخیره instance ربات
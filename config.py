@@ -1,4 +1,5 @@
 import os
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,8 +9,109 @@ class Config:
     # تنظیمات اصلی
     TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN', '7840563922:AAEcEOi_zLFcPxbS8Ms412SWoNoQD33pEaQ')
     CHANNEL_ID = os.getenv('CHANNEL_ID', '@coine_dollar')
+    # کانال‌هایی که قیمت‌ها در آن‌ها منتشر می‌شود (جدا شده با کاما)
+    CHANNEL_IDS = [c.strip() for c in os.getenv('CHANNEL_IDS', CHANNEL_ID).split(',') if c.strip()]
+    # قالب پیام قیمت: <زبان>:<قالب>[:persian]؛ زبان fa/en، قالب markdown/markdown_v2/html، persian برای ارقام فارسی
+    MESSAGE_STYLE = os.getenv('MESSAGE_STYLE', 'fa:markdown')
+    # قالب جداگانه برای هر کانال یا گفتگو، مثلا @channel_en=en:html,-1001234=fa:markdown_v2:persian
+    CHANNEL_STYLES = {
+        chat.strip(): style.strip()
+        for chat, _, style in (entry.partition('=') for entry in os.getenv('CHANNEL_STYLES', '').split(','))
+        if chat.strip() and style.strip()
+    }
     TIMEOUT = int(os.getenv('TIMEOUT', 30))  # 30 ثانیه
+    # آدرس Bot API پیش از توکن، مثلا http://localhost:8081/bot (خالی یعنی api.telegram.org)
+    TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', '')
 
     # تنظیمات جدید برای تلاش مجدد
     RETRY_COUNT = int(os.getenv('RETRY_COUNT', 3))  # اضافه کردن این خط
-    UPDATE_INTERVAL = int(os.getenv('UPDATE_INTERVAL', 3600))
\ No newline at end of file
+    UPDATE_INTERVAL = int(os.getenv('UPDATE_INTERVAL', 3600))
+
+    # تنظیمات مرورگر
+    BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', 2))  # تعداد صفحات باز و آماده
+
+    # تنظیمات اسکرپر: auto (اول HTTP، در صورت نقص داده مرورگر) / http / browser
+    SCRAPER_MODE = os.getenv('SCRAPER_MODE', 'auto')
+    READY_TIMEOUT = int(os.getenv('READY_TIMEOUT', 10))  # حداکثر انتظار برای نمایش قیمت‌ها (ثانیه)
+    BROWSER_EXTRACT = os.getenv('BROWSER_EXTRACT', 'evaluate')  # evaluate (فقط المان‌های لازم) / html
+    HTML_PARSER = os.getenv('HTML_PARSER', 'auto')  # auto / selectolax / lxml / html.parser
+
+    # دریافت داده در پردازه‌های جداگانه (0 یعنی داخل همین پردازه)، تا مرورگر و پارس حلقه ربات را کند نکنند
+    SCRAPER_WORKERS = int(os.getenv('SCRAPER_WORKERS', 0))
+    SCRAPER_WORKER_TIMEOUT = int(os.getenv('SCRAPER_WORKER_TIMEOUT', 90))  # پس از این مدت پردازه کشته و جایگزین می‌شود
+    SCRAPER_MAX_FETCHES = int(os.getenv('SCRAPER_MAX_FETCHES', 100))  # تعویض پردازه پس از این تعداد دریافت
+    SCRAPER_MEMORY_MB = int(os.getenv('SCRAPER_MEMORY_MB', 1024))  # سقف حافظه پردازه به همراه Chromium
+
+    # نمادهای دنبال‌شده به ترتیب نمایش در پیام (از فهرست services/instruments.py)
+    INSTRUMENTS = [k.strip() for k in os.getenv('INSTRUMENTS', 'coin,dollar,tether,gold,ons').split(',') if k.strip()]
+    INSTRUMENTS_FILE = os.getenv('INSTRUMENTS_FILE', '')  # فایل JSON اختیاری برای افزودن نمادهای جدید
+    PAGE_CONCURRENCY = int(os.getenv('PAGE_CONCURRENCY', 4))  # حداکثر صفحات tgju که همزمان دریافت می‌شوند
+
+    # منابع قیمت به ترتیب اولویت، با مهلت اختیاری هر منبع به ثانیه (مثلاً tgju:40,nobitex:5)
+    PRICE_SOURCES = [s.strip() for s in os.getenv('PRICE_SOURCES', 'tgju').split(',') if s.strip()]
+    MERGE_STRATEGY = os.getenv('MERGE_STRATEGY', 'first_good')  # first_good / median
+
+    # کش اسنپ‌شات قیمت‌ها
+    CACHE_TTL = int(os.getenv('CACHE_TTL', 60))  # عمر داده‌های کش‌شده (ثانیه)
+
+    # خط لوله دریافت و ارسال
+    # فاصله به‌روزرسانی پس‌زمینه داده‌ها (ثانیه)؛ به‌طور پیش‌فرض برابر UPDATE_INTERVAL تا بار اضافه‌ای روی منابع نباشد.
+    # مقدار کمتر (مثلاً 45) /price، هشدارها و تیکر را تازه‌تر نگه می‌دارد ولی در هر بازه UPDATE_INTERVAL
+    # به اندازه UPDATE_INTERVAL / POLL_INTERVAL بار صفحات منابع را دریافت می‌کند
+    POLL_INTERVAL = int(os.getenv('POLL_INTERVAL', UPDATE_INTERVAL))
+    SCRAPE_TIMEOUT = int(os.getenv('SCRAPE_TIMEOUT', 45))  # حداکثر زمان یک بار دریافت داده (ثانیه)
+    SEND_QUEUE_SIZE = int(os.getenv('SEND_QUEUE_SIZE', 10))
+    RETRY_INTERVAL = int(os.getenv('RETRY_INTERVAL', 5))  # اولین تلاش مجدد پس از خطای دریافت (ثانیه، با افزایش نمایی)
+
+    # پاسخ /price به کاربران از کش: محدودیت هر کاربر و فاصله مجاز بین دو «به‌روزرسانی» در هر گفتگو
+    PRICE_RATE_LIMIT = float(os.getenv('PRICE_RATE_LIMIT', 6))  # دستور در دقیقه برای هر کاربر
+    PRICE_BURST = int(os.getenv('PRICE_BURST', 3))
+    REFRESH_DEBOUNCE = float(os.getenv('REFRESH_DEBOUNCE', 10))  # ثانیه
+
+    # ارسال آخرین داده سالم هنگام خطای دریافت
+    SNAPSHOT_FILE = os.getenv('SNAPSHOT_FILE', 'data/snapshot.json')
+    STALE_MAX_AGE = int(os.getenv('STALE_MAX_AGE', 1800))  # تا این عمر (ثانیه) داده قدیمی با برچسب زمان نمایش داده می‌شود
+
+    # ارسال گروهی به کانال‌ها و مشترکین
+    SUBSCRIBERS_FILE = os.getenv('SUBSCRIBERS_FILE', 'data/subscribers.json')
+    SEND_RATE = float(os.getenv('SEND_RATE', 25))  # حداکثر پیام در ثانیه (سقف تلگرام حدود ۳۰ است)
+    SEND_CONCURRENCY = int(os.getenv('SEND_CONCURRENCY', 8))
+
+    # تاریخچه قیمت‌ها
+    HISTORY_DB = os.getenv('HISTORY_DB', 'data/history.sqlite3')
+    CHART_WORKERS = int(os.getenv('CHART_WORKERS', 1))  # پردازه‌های رسم نمودار /chart
+
+    # مدار قطع‌کننده اتصال به تلگرام
+    BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 3))  # تعداد خطای پیاپی تا قطع مدار
+    BREAKER_RESET_TIMEOUT = int(os.getenv('BREAKER_RESET_TIMEOUT', 30))  # ثانیه تا بررسی دوباره
+
+    # حالت ارسال: post (پیام جدید در هر نوبت) / ticker (ویرایش یک پیام سنجاق‌شده)
+    DELIVERY_MODE = os.getenv('DELIVERY_MODE', 'post')
+    TICKER_FILE = os.getenv('TICKER_FILE', 'data/ticker.json')
+
+    # هشدارهای قیمت کاربران
+    ALERTS_FILE = os.getenv('ALERTS_FILE', 'data/alerts.json')
+
+    # پایش: نقطه /metrics با قالب Prometheus (اختیاری، مثلاً 9108؛ پورت 0 یعنی غیرفعال) و قالب لاگ text / json
+    # هر پردازه روی یک میزبان پورت جداگانه می‌خواهد
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+
+    # اجرای چند نسخه: فقط پردازه رهبر داده دریافت و به کانال ارسال می‌کند و بقیه اسنپ‌شات مشترک
+    # (SNAPSHOT_FILE) را می‌خوانند. قفل: file:<مسیر> یا sqlite:<مسیر>؛ خالی یعنی یک پردازه
+    CLUSTER_LOCK = os.getenv('CLUSTER_LOCK', '')
+    CLUSTER_LEASE = float(os.getenv('CLUSTER_LEASE', 15))  # ثانیه؛ رهبر هر یک‌سوم این مدت آن را تمدید می‌کند
+    SNAPSHOT_POLL = float(os.getenv('SNAPSHOT_POLL', 2))  # فاصله خواندن اسنپ‌شات مشترک در پیروها (ثانیه)
+
+    # حالت اجرا: polling (دریافت پیوسته) / webhook (تلگرام به‌روزرسانی‌ها را به سرور ما می‌فرستد)
+    RUN_MODE = os.getenv('RUN_MODE', 'polling')
+    WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')  # آدرس عمومی HTTPS، مثلاً https://example.com/telegram
+    WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '127.0.0.1')  # پشت پراکسی معکوس با TLS
+    WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8443))
+    WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', urlsplit(WEBHOOK_URL).path or '/telegram')
+    # در حالت وب‌هوک الزامی است و همه پردازه‌های پشت توزیع‌کننده بار باید مقدار یکسانی داشته باشند
+    WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+    # حذف به‌روزرسانی‌های معوق هنگام ثبت وب‌هوک (پیش‌فرض: نگه داشتن و پردازش آن‌ها)
+    DROP_PENDING_UPDATES = os.getenv('DROP_PENDING_UPDATES', 'false').lower() in ('1', 'true', 'yes')
+    SHUTDOWN_TIMEOUT = int(os.getenv('SHUTDOWN_TIMEOUT', 30))  # حداکثر انتظار برای ارسال پیام‌های صف هنگام توقف
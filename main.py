@@ -1,9 +1,10 @@
 import logging
 from bot.bot import TelegramPriceBot
+from config import Config
 from utils.logger import setup_logging
 
 def main():
-    setup_logging()
+    setup_logging(Config.LOG_FORMAT)
     bot = TelegramPriceBot()
     bot.run()
 
@@ -0,0 +1,289 @@
+import bisect
+import itertools
+import json
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple, Union
+from services.quote import Quote
+from services.subscriptions import ChatId
+
+logger = logging.getLogger(__name__)
+
+
+class AlertRule:
+    """A user's condition on one instrument
+
+    kinds:
+        above / below: the price crosses `value` upwards / downwards
+        move_abs: the price moves by at least `value` between two snapshots
+        move_pct: the price moves by at least `value` percent between two snapshots
+        spike: the price moves by at least `value` percent within `window` seconds
+    """
+
+    KINDS = ('above', 'below', 'move_abs', 'move_pct', 'spike')
+
+    __slots__ = ('id', 'chat_id', 'instrument', 'kind', 'value', 'window')
+
+    def __init__(self, id: int, chat_id: ChatId, instrument: str, kind: str, value: Decimal, window: int = 0):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown alert kind: {kind!r} (expected one of {self.KINDS})")
+        if kind == 'spike' and window <= 0:
+            raise ValueError("spike alerts need a positive window")
+        self.id = id
+        self.chat_id = chat_id
+        self.instrument = instrument
+        self.kind = kind
+        self.value = Decimal(value)
+        self.window = int(window)
+
+    def as_dict(self) -> Dict:
+        return {
+            'id': self.id, 'chat_id': self.chat_id, 'instrument': self.instrument,
+            'kind': self.kind, 'value': str(self.value), 'window': self.window
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'AlertRule':
+        return cls(int(data['id']), data['chat_id'], data['instrument'], data['kind'], Decimal(data['value']),
+                   data.get('window', 0))
+
+    def __repr__(self) -> str:
+        return f"AlertRule({self.as_dict()})"
+
+
+class Alert:
+    """A rule that fired, with the prices that triggered it"""
+
+    __slots__ = ('rule', 'quote', 'previous', 'move')
+
+    def __init__(self, rule: AlertRule, quote: Quote, previous: Decimal, move: Decimal):
+        self.rule = rule
+        self.quote = quote
+        self.previous = previous
+        self.move = move
+
+
+class _SortedIndex:
+    """(threshold, rule id) pairs kept sorted for range lookups"""
+
+    __slots__ = ('keys',)
+
+    def __init__(self):
+        self.keys: List[Tuple[Decimal, int]] = []
+
+    def add(self, threshold: Decimal, rule_id: int):
+        bisect.insort(self.keys, (threshold, rule_id))
+
+    def remove(self, threshold: Decimal, rule_id: int):
+        index = bisect.bisect_left(self.keys, (threshold, rule_id))
+        if index < len(self.keys) and self.keys[index] == (threshold, rule_id):
+            del self.keys[index]
+
+    def up_to(self, limit: Decimal) -> List[int]:
+        """Rule ids whose threshold is <= limit"""
+        end = bisect.bisect_right(self.keys, (limit, float('inf')))
+        return [rule_id for _, rule_id in self.keys[:end]]
+
+    def between(self, low: Decimal, high: Decimal, include_low: bool, include_high: bool) -> List[int]:
+        """Rule ids whose threshold lies between low and high"""
+        if include_low:
+            start = bisect.bisect_left(self.keys, (low, -1))
+        else:
+            start = bisect.bisect_right(self.keys, (low, float('inf')))
+        if include_high:
+            end = bisect.bisect_right(self.keys, (high, float('inf')))
+        else:
+            end = bisect.bisect_left(self.keys, (high, -1))
+        return [rule_id for _, rule_id in self.keys[start:end]]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class AlertEngine:
+    """Evaluates alert rules incrementally against consecutive snapshots
+
+    Rules are indexed per instrument and kind in sorted threshold lists, so a
+    snapshot only touches the rules that actually fire (plus a binary search
+    per index) instead of every rule of every user.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, max_window: int = 86400):
+        self.path = Path(path) if path is not None else None
+        self.max_window = max_window
+
+        self._clear_rules()
+        self._mtime: Optional[int] = None
+
+        self._last: Dict[str, Decimal] = {}
+        self._recent: Dict[str, Deque[Tuple[float, Decimal]]] = defaultdict(deque)
+        self._spike_fired_at: Dict[int, float] = {}
+        self._load()
+
+    def _clear_rules(self):
+        self.rules: Dict[int, AlertRule] = {}
+        self._ids = itertools.count(1)
+        self._above: Dict[str, _SortedIndex] = defaultdict(_SortedIndex)
+        self._below: Dict[str, _SortedIndex] = defaultdict(_SortedIndex)
+        self._moves_abs: Dict[str, _SortedIndex] = defaultdict(_SortedIndex)
+        self._moves_pct: Dict[str, _SortedIndex] = defaultdict(_SortedIndex)
+        self._spikes: Dict[str, Dict[int, _SortedIndex]] = defaultdict(lambda: defaultdict(_SortedIndex))
+
+    def refresh(self) -> bool:
+        """Reload the rules if another process changed the file; returns True if they were reloaded"""
+        if self.path is None or self._file_mtime() == self._mtime:
+            return False
+        self._clear_rules()
+        self._load()
+        self._spike_fired_at = {
+            rule_id: fired_at for rule_id, fired_at in self._spike_fired_at.items() if rule_id in self.rules
+        }
+        return True
+
+    def add_rule(self, chat_id: ChatId, instrument: str, kind: str, value, window: int = 0,
+                 save: bool = True) -> AlertRule:
+        if kind == 'spike' and window > self.max_window:
+            # Prices older than max_window are not kept, so the move would be measured from too recent a price
+            raise ValueError(f"spike window {window}s exceeds the {self.max_window}s of kept history")
+        if save:
+            self.refresh()
+        rule = AlertRule(next(self._ids), chat_id, instrument, kind, Decimal(value), window)
+        self._index(rule)
+        if save:
+            self._save()
+        return rule
+
+    def remove_rule(self, rule_id: int, chat_id: Optional[ChatId] = None) -> bool:
+        """Delete a rule; with `chat_id`, only if it belongs to that chat"""
+        self.refresh()
+        rule = self.rules.get(rule_id)
+        if rule is None or (chat_id is not None and rule.chat_id != chat_id):
+            return False
+        del self.rules[rule_id]
+        self._index_for(rule).remove(rule.value, rule.id)
+        self._spike_fired_at.pop(rule_id, None)
+        self._save()
+        return True
+
+    def rules_for_chat(self, chat_id: ChatId) -> List[AlertRule]:
+        self.refresh()
+        return [rule for rule in self.rules.values() if rule.chat_id == chat_id]
+
+    def evaluate(self, snapshot: Dict[str, Quote], timestamp: Optional[float] = None) -> List[Alert]:
+        """Update per-instrument state with a new snapshot and return the alerts that fired"""
+        now = timestamp if timestamp is not None else time.time()
+        alerts = []
+        for instrument, quote in snapshot.items():
+            price = Decimal(quote.price)
+            previous = self._last.get(instrument)
+            self._last[instrument] = price
+            fired = self._evaluate_spikes(instrument, price, now)
+
+            if previous is not None and price != previous:
+                move = price - previous
+                fired.extend((rule_id, previous, move) for rule_id in self._evaluate_moves(instrument, previous, price))
+
+            alerts.extend(Alert(self.rules[rule_id], quote, prev, move) for rule_id, prev, move in fired)
+        return alerts
+
+    def _evaluate_moves(self, instrument: str, previous: Decimal, price: Decimal) -> List[int]:
+        if price > previous:
+            # Crossed upwards: levels in (previous, price]
+            above = self._above.get(instrument)
+            fired = above.between(previous, price, include_low=False, include_high=True) if above else []
+        else:
+            # Crossed downwards: levels in [price, previous)
+            below = self._below.get(instrument)
+            fired = below.between(price, previous, include_low=True, include_high=False) if below else []
+
+        move = abs(price - previous)
+        moves_abs = self._moves_abs.get(instrument)
+        if moves_abs:
+            fired.extend(moves_abs.up_to(move))
+        moves_pct = self._moves_pct.get(instrument)
+        if moves_pct and previous:
+            fired.extend(moves_pct.up_to(move * 100 / abs(previous)))
+        return fired
+
+    def _evaluate_spikes(self, instrument: str, price: Decimal, now: float) -> List[Tuple[int, Decimal, Decimal]]:
+        recent = self._recent[instrument]
+        recent.append((now, price))
+        while recent and now - recent[0][0] > self.max_window:
+            recent.popleft()
+
+        fired = []
+        spikes = self._spikes.get(instrument)
+        if not spikes:
+            return fired
+        for window, index in spikes.items():
+            # Oldest price still inside the window
+            start = bisect.bisect_left(recent, (now - window, Decimal('-Infinity')))
+            reference = recent[start][1] if start < len(recent) else price
+            if not reference or reference == price:
+                continue
+            move = price - reference
+            for rule_id in index.up_to(abs(move) * 100 / abs(reference)):
+                # A spike keeps matching while it stays inside the window; report it once
+                if now - self._spike_fired_at.get(rule_id, float('-inf')) >= window:
+                    self._spike_fired_at[rule_id] = now
+                    fired.append((rule_id, reference, move))
+        return fired
+
+    def _index_for(self, rule: AlertRule) -> _SortedIndex:
+        if rule.kind == 'above':
+            return self._above[rule.instrument]
+        if rule.kind == 'below':
+            return self._below[rule.instrument]
+        if rule.kind == 'move_abs':
+            return self._moves_abs[rule.instrument]
+        if rule.kind == 'move_pct':
+            return self._moves_pct[rule.instrument]
+        return self._spikes[rule.instrument][rule.window]
+
+    def _index(self, rule: AlertRule):
+        self.rules[rule.id] = rule
+        self._index_for(rule).add(rule.value, rule.id)
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        if self.path is None:
+            return
+        self._mtime = self._file_mtime()
+        if self._mtime is None:
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            if not isinstance(data, list):
+                raise ValueError(f"expected a list of rules, got {type(data).__name__}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load alert rules from {self.path}: {e}")
+            return
+        for item in data:
+            # One bad entry must not cost the other rules, or the bot its startup
+            try:
+                self._index(AlertRule.from_dict(item))
+            except (KeyError, TypeError, ValueError, InvalidOperation) as e:
+                logger.error(f"Skipping invalid alert rule {item!r} in {self.path}: {type(e).__name__} - {e}")
+        self._ids = itertools.count(max(self.rules, default=0) + 1)
+        logger.info(f"Loaded {len(self.rules)} alert rules from {self.path}")
+
+    def save(self):
+        self._save()
+
+    def _save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        tmp_path.write_text(json.dumps([rule.as_dict() for rule in self.rules.values()]), encoding='utf-8')
+        os.replace(tmp_path, self.path)
+        self._mtime = self._file_mtime()
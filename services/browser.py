@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from services.metrics import STAGE_SECONDS
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext, Page, Playwright, Route
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserManager:
+    """Long-lived headless Chromium shared by all scraper fetches"""
+
+    BLOCKED_RESOURCE_TYPES = frozenset({'image', 'font', 'stylesheet', 'media'})
+    BLOCKED_HOSTS = (
+        'googletagmanager.com', 'google-analytics.com', 'doubleclick.net',
+        'googlesyndication.com', 'yektanet.com', 'mediaad.org', 'najva.com',
+        'hotjar.com', 'clarity.ms'
+    )
+
+    def __init__(self, pool_size: int = 2, headless: bool = True, block_resources: bool = True):
+        self.pool_size = max(1, pool_size)
+        self.headless = headless
+        self.block_resources = block_resources
+
+        self._playwright: Optional['Playwright'] = None
+        self._browser: Optional['Browser'] = None
+        self._context: Optional['BrowserContext'] = None
+        self._idle_pages: List['Page'] = []
+        self._slots = asyncio.Semaphore(self.pool_size)
+        self._lock = asyncio.Lock()
+        self._crashed = False
+
+        self.stats: Dict[str, int] = {'launches': 0, 'reuses': 0, 'restarts': 0}
+
+    def is_healthy(self) -> bool:
+        """Check that the browser process is still connected"""
+        return (
+            self._browser is not None
+            and not self._crashed
+            and self._browser.is_connected()
+        )
+
+    async def start(self):
+        """Launch the browser if it is not already running"""
+        async with self._lock:
+            if self.is_healthy():
+                return
+
+            if self._browser is not None:
+                logger.warning("Browser is not healthy, restarting")
+                self.stats['restarts'] += 1
+                await self._shutdown()
+
+            logger.info("Launching headless Chromium")
+            started = time.perf_counter()
+            # Imported here so processes that never launch a browser never load playwright
+            from playwright.async_api import async_playwright
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            self._browser.on('disconnected', self._on_disconnected)
+            self._context = await self._browser.new_context()
+            if self.block_resources:
+                await self._context.route('**/*', self._filter_request)
+            self._crashed = False
+            self.stats['launches'] += 1
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage='browser_launch')
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a warm page from the pool"""
+        async with self._slots:
+            await self.start()
+
+            if self._idle_pages:
+                page = self._idle_pages.pop()
+                self.stats['reuses'] += 1
+            else:
+                page = await self._context.new_page()
+
+            try:
+                yield page
+            except Exception:
+                # A page in an unknown state is not worth keeping around
+                await self._close_page(page)
+                raise
+            else:
+                if self.is_healthy() and not page.is_closed():
+                    self._idle_pages.append(page)
+
+    async def close(self):
+        """Shut down the browser and release playwright"""
+        async with self._lock:
+            await self._shutdown()
+            logger.info(f"Browser closed (stats: {self.stats})")
+
+    @classmethod
+    def should_block(cls, resource_type: str, url: str) -> bool:
+        """Decide whether a request is unnecessary for reading prices"""
+        if resource_type in cls.BLOCKED_RESOURCE_TYPES:
+            return True
+        host = urlsplit(url).hostname or ''
+        return any(host == blocked or host.endswith('.' + blocked) for blocked in cls.BLOCKED_HOSTS)
+
+    async def _filter_request(self, route: 'Route'):
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def _on_disconnected(self, _browser):
+        logger.warning("Browser disconnected")
+        self._crashed = True
+
+    async def _close_page(self, page: 'Page'):
+        try:
+            await page.close()
+        except Exception as e:
+            logger.debug(f"Error closing page: {e}")
+
+    async def _shutdown(self):
+        self._idle_pages.clear()
+        for resource in (self._context, self._browser):
+            if resource is None:
+                continue
+            try:
+                await resource.close()
+            except Exception as e:
+                logger.debug(f"Error closing {type(resource).__name__}: {e}")
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.debug(f"Error stopping playwright: {e}")
+
+        self._context = None
+        self._browser = None
+        self._playwright = None
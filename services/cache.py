@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from services.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCache:
+    """TTL cache for the latest market snapshot with single-flight fetching"""
+
+    def __init__(
+            self,
+            fetch: Callable[[], Awaitable[Optional[Dict]]],
+            ttl: float = 60,
+            clock: Callable[[], float] = time.monotonic
+    ):
+        self._fetch = fetch
+        self.ttl = ttl
+        self._clock = clock
+
+        self._snapshot: Optional[Dict] = None
+        self._fetched_at: Optional[float] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._listeners: List[Callable[[Dict], None]] = []
+
+        self.stats: Dict[str, int] = {'hits': 0, 'misses': 0, 'coalesced': 0, 'failures': 0}
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the last good snapshot, or None if there is none"""
+        if self._fetched_at is None:
+            return None
+        return self._clock() - self._fetched_at
+
+    def is_fresh(self, max_age: Optional[float] = None) -> bool:
+        age = self.age
+        return age is not None and age < (self.ttl if max_age is None else max_age)
+
+    def add_listener(self, listener: Callable[[Dict], None]):
+        """Call `listener(snapshot)` for every new good snapshot; it must not block"""
+        self._listeners.append(listener)
+
+    def seed(self, snapshot: Dict, age: float = 0):
+        """Install a snapshot obtained elsewhere (e.g. from disk) unless the cache already has one"""
+        if self._snapshot is None:
+            self.install(snapshot, age)
+
+    def install(self, snapshot: Dict, age: float = 0):
+        """Replace the snapshot with one fetched elsewhere, `age` seconds ago; listeners are not called"""
+        self._snapshot = snapshot
+        self._fetched_at = self._clock() - max(0.0, age)
+
+    def peek(self) -> Optional[Dict]:
+        """Return the last good snapshot without fetching, however old"""
+        return self._snapshot
+
+    async def get(self, max_age: Optional[float] = None) -> Optional[Dict]:
+        """Return a fresh snapshot, fetching it at most once for concurrent callers"""
+        if self.is_fresh(max_age):
+            self.stats['hits'] += 1
+            CACHE_REQUESTS.inc(result='hit')
+            return self._snapshot
+
+        if self._inflight is not None:
+            self.stats['coalesced'] += 1
+            CACHE_REQUESTS.inc(result='coalesced')
+            return await asyncio.shield(self._inflight)
+
+        self.stats['misses'] += 1
+        CACHE_REQUESTS.inc(result='miss')
+        self._inflight = asyncio.ensure_future(self._refresh())
+        return await asyncio.shield(self._inflight)
+
+    async def refresh(self) -> Optional[Dict]:
+        """Force a fetch regardless of the snapshot age"""
+        return await self.get(max_age=0)
+
+    async def close(self):
+        """Cancel an in-flight fetch, if any"""
+        inflight = self._inflight
+        if inflight is not None:
+            inflight.cancel()
+            await asyncio.gather(inflight, return_exceptions=True)
+
+    def metrics(self) -> Dict:
+        return {**self.stats, 'age': self.age}
+
+    async def _refresh(self) -> Optional[Dict]:
+        try:
+            snapshot = await self._fetch()
+        finally:
+            self._inflight = None
+
+        if not snapshot:
+            self.stats['failures'] += 1
+            logger.warning("Snapshot fetch returned no data, keeping the previous snapshot")
+            return None
+
+        self._snapshot = snapshot
+        self._fetched_at = self._clock()
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"Snapshot listener {listener!r} failed: {e}")
+        return snapshot
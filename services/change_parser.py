@@ -0,0 +1,67 @@
+import re
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+# Persian/Arabic-Indic digits, separators, percent sign and Unicode minus/dash variants
+_CHANGE_CHARS = str.maketrans({
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+    '٫': '.', '٬': ',', '٪': '%',
+    '−': '-', '‐': '-', '‑': '-', '‒': '-', '–': '-', '﹣': '-', '－': '-'
+})
+
+# Every tgju layout in one pass; the first alternative that matches at the leftmost position wins
+_CHANGE_RE = re.compile(r"""
+      \(\s*(?P<p1>[+-]?[\d.]+)\s*%\s*\)(?:\s*(?P<a1>[+-]?[\d,.]+))?    # (1.37%) 8,520  or  (1.37%)
+    | (?P<a2>[+-]?[\d,.]+)\s*\(\s*(?P<p2>[+-]?[\d.]+)\s*%\s*\)         # 8,520 (1.37%)
+    | (?P<p3>[+-]?[\d.]+)\s*%                                          # 1.37%
+    | (?P<a3>[+-]?[\d,.]+)                                             # 8,520
+""", re.VERBOSE)
+
+_ZERO = Decimal(0)
+
+
+def _to_decimal(text: Optional[str]) -> Decimal:
+    if not text:
+        return _ZERO
+    try:
+        return Decimal(text.replace(',', ''))
+    except InvalidOperation:
+        return _ZERO
+
+
+def split_change(change_text: Optional[str]) -> Tuple[str, str]:
+    """Split a tgju change string into ('1.37%', '8520') text parts (uncached)"""
+    if not change_text:
+        return "0%", "0"
+    if not change_text.isascii():
+        change_text = change_text.translate(_CHANGE_CHARS)
+
+    match = _CHANGE_RE.search(change_text)
+    if match is None:
+        return "0%", "0"
+
+    p1, a1, a2, p2, p3, a3 = match.groups()
+    percent = p1 or p2 or p3
+    amount = a1 or a2 or a3
+    return (
+        f"{percent}%" if percent else "0%",
+        amount.replace(',', '') if amount else "0"
+    )
+
+
+# tgju repeats the same change strings between ticks, so results are memoized
+parse_change_text = lru_cache(maxsize=1024)(split_change)
+
+
+@lru_cache(maxsize=1024)
+def parse_change(change_text: Optional[str]) -> Tuple[Decimal, Decimal]:
+    """Parse a tgju change string into (percent, amount) Decimals"""
+    percent, amount = parse_change_text(change_text)
+    return _to_decimal(percent[:-1]), _to_decimal(amount)
+
+
+def parse_changes(change_texts: Iterable[Optional[str]]) -> List[Tuple[Decimal, Decimal]]:
+    """Parse a batch of change strings, e.g. every instrument of one snapshot"""
+    return [parse_change(text) for text in change_texts]
@@ -0,0 +1,206 @@
+import asyncio
+import importlib.util
+import io
+import logging
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from services.history import PriceHistory
+from services.instruments import Instrument
+from services.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# matplotlib is only imported inside the worker processes
+AVAILABLE = importlib.util.find_spec('matplotlib') is not None
+
+# range name: (seconds, candle bucket of PriceHistory.ohlc)
+RANGES = {
+    '1h': (3600, '1m'),
+    '6h': (6 * 3600, '15m'),
+    '24h': (86400, '1h'),
+    '7d': (7 * 86400, '4h'),
+    '30d': (30 * 86400, '1d'),
+}
+RANGE_ALIASES = {'1d': '24h', '1w': '7d', '1m': '30d'}
+DEFAULT_RANGE = '24h'
+STYLES = ('line', 'candle')
+
+# (symbol, range, style, timestamp of the newest data point)
+ChartKey = Tuple[str, str, str, int]
+
+
+def render_chart(title: str, unit: str, style: str, series: Sequence[Tuple]) -> bytes:
+    """PNG of a price series; runs in a worker process
+
+    `series` is [(ts, price)] for line charts and [(ts, open, high, low, close)]
+    for candlesticks. Text on the image stays latin because matplotlib does not
+    shape Persian script; the Telegram caption carries the Persian name.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    from datetime import datetime
+    from matplotlib import dates as mdates
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(8, 4.5), dpi=100)
+    axes = figure.subplots()
+    times = [datetime.fromtimestamp(row[0]) for row in series]
+
+    if style == 'candle':
+        width = (series[1][0] - series[0][0]) / 86400 * 0.7 if len(series) > 1 else 0.02
+        for when, (_, open_, high, low, close) in zip(times, series):
+            color = '#26a69a' if close >= open_ else '#ef5350'
+            x = mdates.date2num(when)
+            axes.vlines(x, low, high, color=color, linewidth=1)
+            axes.bar(x, max(abs(close - open_), (high - low) * 0.01 or 1e-9), width, min(open_, close),
+                     color=color)
+    else:
+        prices = [row[1] for row in series]
+        axes.plot(times, prices, color='#1e88e5', linewidth=1.5)
+        axes.fill_between(times, prices, min(prices), color='#1e88e5', alpha=0.08)
+
+    axes.set_title(title)
+    axes.set_ylabel(unit)
+    axes.grid(True, alpha=0.3)
+    axes.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d %H:%M'))
+    axes.ticklabel_format(axis='y', style='plain', useOffset=False)
+    figure.autofmt_xdate()
+    figure.tight_layout()
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+class Chart:
+    """A rendered chart; once Telegram has stored it only the file_id is kept"""
+
+    __slots__ = ('key', 'png', 'file_id', 'last_ts')
+
+    def __init__(self, key: ChartKey, png: Optional[bytes] = None, file_id: Optional[str] = None):
+        self.key = key
+        self.png = png
+        self.file_id = file_id
+        self.last_ts = key[3]
+
+    @property
+    def photo(self):
+        """What to pass to send_photo: the uploaded file_id if any, else the PNG bytes"""
+        return self.file_id or self.png
+
+
+class ChartRenderer:
+    """Renders history charts in a process pool and caches them by (symbol, range, style, last data point)
+
+    The cache key changes only when new history is written, so repeat requests
+    reuse the image, and after the first upload its Telegram file_id.
+    """
+
+    def __init__(
+            self,
+            history: PriceHistory,
+            workers: int = 1,
+            max_entries: int = 128,
+            render: Callable[[str, str, str, Sequence[Tuple]], bytes] = render_chart
+    ):
+        self.history = history
+        self.workers = max(1, workers)
+        self.max_entries = max_entries
+        self._render = render
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._cache: 'OrderedDict[ChartKey, Chart]' = OrderedDict()
+        self._inflight: Dict[ChartKey, asyncio.Future] = {}
+
+        self.stats: Dict[str, int] = {'rendered': 0, 'cached': 0, 'file_id_reused': 0, 'empty': 0}
+
+    async def get(self, instrument: Instrument, range_name: str = DEFAULT_RANGE,
+                  style: str = 'line') -> Optional[Chart]:
+        """The chart for the newest stored data, or None if the range has too little history"""
+        seconds, bucket = RANGES[range_name]
+        loop = asyncio.get_running_loop()
+        latest = await loop.run_in_executor(None, self.history.latest, instrument.key)
+        if latest is None:
+            self.stats['empty'] += 1
+            return None
+
+        key = (instrument.key, range_name, style, latest[0])
+        chart = self._cache.get(key)
+        if chart is not None:
+            self._cache.move_to_end(key)
+            self.stats['file_id_reused' if chart.file_id else 'cached'] += 1
+            return chart
+
+        if key not in self._inflight:
+            self._inflight[key] = asyncio.ensure_future(self._build(instrument, key, seconds, bucket))
+        try:
+            return await asyncio.shield(self._inflight[key])
+        finally:
+            self._inflight.pop(key, None)
+
+    def remember_file_id(self, key: ChartKey, file_id: str):
+        """Keep Telegram's file_id for an uploaded chart and drop the bytes"""
+        chart = self._cache.get(key)
+        if chart is not None:
+            chart.file_id = file_id
+            chart.png = None
+
+    async def _build(self, instrument: Instrument, key: ChartKey, seconds: int, bucket: str) -> Optional[Chart]:
+        _, range_name, style, last_ts = key
+        # The window ends at the newest data point, so the key fully determines the image
+        start, end = last_ts - seconds, last_ts + 1
+        loop = asyncio.get_running_loop()
+        if style == 'candle':
+            series = await loop.run_in_executor(None, self.history.ohlc, instrument.key, start, end, bucket)
+        else:
+            series = await loop.run_in_executor(None, self.history.query, instrument.key, start, end)
+        if len(series) < 2:
+            self.stats['empty'] += 1
+            return None
+
+        scale = 0.1 if instrument.toman else 1
+        if scale != 1:
+            series = [(row[0], *(value * scale for value in row[1:])) for row in series]
+        unit = 'Toman' if instrument.toman else 'Rial' if instrument.unit == 'rial' else 'USD'
+        title = f"{instrument.key.upper()} - {range_name}"
+
+        with STAGE_SECONDS.time(stage='chart'):
+            png = await loop.run_in_executor(self._get_executor(), self._render, title, unit, style, series)
+        self.stats['rendered'] += 1
+
+        chart = Chart(key, png)
+        self._cache[key] = chart
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        logger.info(f"Rendered {style} chart of {instrument.key} ({range_name}, {len(series)} points, "
+                    f"{len(png) // 1024} KiB)")
+        return chart
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: never fork a process that is running an event loop and worker threads
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def metrics(self) -> Dict:
+        return {**self.stats, 'entries': len(self._cache)}
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def parse_chart_args(args: List[str]) -> Tuple[str, str]:
+    """(range, style) from the optional /chart arguments after the symbol; raises ValueError"""
+    range_name, style = DEFAULT_RANGE, 'line'
+    for arg in args:
+        value = arg.lower()
+        if value in STYLES:
+            style = value
+        elif RANGE_ALIASES.get(value, value) in RANGES:
+            range_name = RANGE_ALIASES.get(value, value)
+        else:
+            raise ValueError(f"unknown chart option {arg!r}")
+    return range_name, style
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Union
+from services.cache import SnapshotCache
+from services.snapshot_store import SnapshotStore
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """Cross-process leadership; `acquire` is called periodically and must not block"""
+
+    def acquire(self) -> bool:
+        """Become or stay leader; False if another process holds the lock"""
+        raise NotImplementedError
+
+    def release(self):
+        """Give up leadership so another process can take over immediately"""
+
+
+class FileLeaderLock(LeaderLock):
+    """flock() on a local file: held while this process keeps it open, freed by the kernel if it dies"""
+
+    def __init__(self, path: Union[str, Path], owner: str):
+        if fcntl is None:
+            raise RuntimeError("File locks need fcntl; use a sqlite: lock on this platform")
+        self.path = Path(path)
+        self.owner = owner
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # Informational only: who holds the lock
+        os.ftruncate(fd, 0)
+        os.write(fd, self.owner.encode('utf-8'))
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class SqliteLeaderLock(LeaderLock):
+    """A lease row in SQLite: the owner renews it on every `acquire`, others take over once it expires"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS leader (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path: Union[str, Path], owner: str, ttl: float = 15, name: str = 'scraper',
+                 clock: Callable[[], float] = time.time):
+        self.path = Path(path)
+        self.owner = owner
+        self.ttl = ttl
+        self.name = name
+        self._clock = clock
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(self.SCHEMA)
+
+    def acquire(self) -> bool:
+        now = self._clock()
+        with self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO leader (name, owner, expires_at) VALUES (:name, :owner, :expires_at)
+                ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE leader.owner = excluded.owner OR leader.expires_at < :now
+                """,
+                {'name': self.name, 'owner': self.owner, 'expires_at': now + self.ttl, 'now': now}
+            )
+            row = self._conn.execute('SELECT owner FROM leader WHERE name = ?', (self.name,)).fetchone()
+        return row is not None and row[0] == self.owner
+
+    def release(self):
+        with self._conn:
+            self._conn.execute('DELETE FROM leader WHERE name = ? AND owner = ?', (self.name, self.owner))
+
+    def close(self):
+        self._conn.close()
+
+
+def create_lock(spec: str, owner: str, ttl: float = 15) -> LeaderLock:
+    """Lock from a Config.CLUSTER_LOCK value: file:<path> or sqlite:<path>"""
+    backend, _, path = spec.partition(':')
+    if not path:
+        raise ValueError(f"Cluster lock needs a path: {spec!r} (expected file:<path> or sqlite:<path>)")
+    if backend == 'file':
+        return FileLeaderLock(path, owner)
+    if backend == 'sqlite':
+        return SqliteLeaderLock(path, owner, ttl=ttl)
+    raise ValueError(f"Unknown cluster lock backend: {backend!r} (expected file or sqlite)")
+
+
+class LeaderElector:
+    """Periodically tries the lock and reports leadership changes
+
+    `interval` must be well below a lease lock's ttl so the leader renews in time.
+    """
+
+    def __init__(
+            self,
+            lock: LeaderLock,
+            on_elected: Callable[[], Awaitable[None]],
+            on_demoted: Callable[[], Awaitable[None]],
+            interval: float = 5
+    ):
+        self.lock = lock
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.interval = interval
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'elected': 0, 'demoted': 0, 'errors': 0}
+
+    async def start(self):
+        """Try once right away, then keep checking in the background"""
+        await self.check()
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            await self._set_leader(False)
+            await asyncio.get_running_loop().run_in_executor(None, self.lock.release)
+            logger.info("Released cluster leadership")
+
+    async def check(self):
+        try:
+            acquired = await asyncio.get_running_loop().run_in_executor(None, self.lock.acquire)
+        except Exception as e:
+            # Without a confirmed lease it is safer to stop scraping and posting
+            self.stats['errors'] += 1
+            logger.error(f"Cluster lock check failed: {type(e).__name__} - {e}")
+            acquired = False
+        if acquired != self.is_leader:
+            await self._set_leader(acquired)
+
+    async def _set_leader(self, leader: bool):
+        self.is_leader = leader
+        self.stats['elected' if leader else 'demoted'] += 1
+        logger.info("This process is now the cluster leader" if leader else "This process is now a follower")
+        try:
+            await (self.on_elected() if leader else self.on_demoted())
+        except Exception as e:
+            logger.error(f"Leadership change handler failed: {type(e).__name__} - {e}")
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+
+class SnapshotFollower:
+    """Keeps a follower's cache in sync with the snapshot the leader publishes to the shared store"""
+
+    def __init__(self, store: SnapshotStore, cache: SnapshotCache, interval: float = 2):
+        self.store = store
+        self.cache = cache
+        self.interval = interval
+        self._version: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'loaded': 0}
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def poll(self) -> bool:
+        """Install the stored snapshot if it changed since the last poll"""
+        version = self.store.version()
+        if version is None or version == self._version:
+            return False
+        stored = self.store.load()
+        if stored is None:
+            return False
+        self._version = version
+        snapshot, saved_at = stored
+        self.cache.install(snapshot, age=time.time() - saved_at)
+        self.stats['loaded'] += 1
+        return True
+
+    async def _loop(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Reading the shared snapshot failed: {type(e).__name__} - {e}")
+            await asyncio.sleep(self.interval)
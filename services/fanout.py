@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+from services.metrics import MESSAGES, RETRIES, STAGE_SECONDS, record_failure
+from services.subscriptions import ChatId
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class FanoutSender:
+    """Sends one prepared message to many chats within Telegram's rate limits"""
+
+    def __init__(
+            self,
+            send: Callable[[ChatId, str], Awaitable[None]],
+            global_rate: float = 30,
+            per_chat_rate: float = 1,
+            concurrency: int = 8,
+            max_retries: int = 3,
+            send_timeout: float = 30,
+            on_forbidden: Optional[Callable[[ChatId], None]] = None
+    ):
+        self._send = send
+        self.global_bucket = TokenBucket(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.send_timeout = send_timeout
+        self.on_forbidden = on_forbidden
+
+        self._chat_buckets: Dict[ChatId, TokenBucket] = {}
+        self._paused_until = 0.0
+
+        self.stats: Dict[str, float] = {'sent': 0, 'failed': 0, 'retry_after': 0}
+        self.last_report: Dict[str, float] = {}
+
+    async def broadcast(self, chat_ids: Iterable[ChatId], message: str) -> Dict[str, float]:
+        """Deliver `message` to every chat concurrently; never raises for a single chat"""
+        chat_ids = list(dict.fromkeys(chat_ids))
+        queue: asyncio.Queue = asyncio.Queue()
+        for chat_id in chat_ids:
+            queue.put_nowait(chat_id)
+
+        report = {'recipients': len(chat_ids), 'sent': 0, 'failed': 0}
+        started = time.perf_counter()
+
+        async def worker():
+            while not queue.empty():
+                chat_id = queue.get_nowait()
+                if await self._deliver(chat_id, message):
+                    report['sent'] += 1
+                else:
+                    report['failed'] += 1
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(chat_ids)))))
+
+        elapsed = time.perf_counter() - started
+        report['seconds'] = elapsed
+        report['rate'] = report['sent'] / elapsed if elapsed > 0 else 0.0
+        self.last_report = report
+        logger.info(
+            f"Broadcast to {report['recipients']} chats: {report['sent']} sent, {report['failed']} failed, "
+            f"{report['rate']:.1f} msg/s"
+        )
+        return report
+
+    async def _deliver(self, chat_id: ChatId, message: str) -> bool:
+        for attempt in range(1, self.max_retries + 1):
+            await self._wait_for_pause()
+            await self._chat_bucket(chat_id).acquire()
+            await self.global_bucket.acquire()
+            if attempt > 1:
+                RETRIES.inc(operation='telegram_send')
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._send(chat_id, message), self.send_timeout)
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage='telegram_send')
+                self.stats['sent'] += 1
+                MESSAGES.inc(outcome='sent')
+                return True
+            except RetryAfter as e:
+                # Flood control applies to the whole bot, so every worker backs off
+                record_failure('telegram_send', e)
+                self.stats['retry_after'] += 1
+                retry_after = float(e.retry_after)
+                logger.warning(f"Flood control for {chat_id}, pausing sends for {retry_after}s")
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            except Forbidden as e:
+                record_failure('telegram_send', e)
+                logger.warning(f"Chat {chat_id} is not reachable anymore: {e}")
+                if self.on_forbidden is not None:
+                    self.on_forbidden(chat_id)
+                break
+            except BadRequest as e:
+                record_failure('telegram_send', e)
+                logger.warning(f"Telegram rejected the message for {chat_id}: {e}")
+                break
+            except (TelegramError, asyncio.TimeoutError, OSError) as e:
+                record_failure('telegram_send', e)
+                logger.warning(f"Send to {chat_id} failed (attempt {attempt}/{self.max_retries}): {e}")
+                await asyncio.sleep(min(2 ** attempt, 10))
+
+        self.stats['failed'] += 1
+        MESSAGES.inc(outcome='failed')
+        return False
+
+    async def _wait_for_pause(self):
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _chat_bucket(self, chat_id: ChatId) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.per_chat_rate)
+        return bucket
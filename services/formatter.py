@@ -1,71 +1,83 @@
-import re
 import logging
-from typing import Tuple
+from decimal import Decimal
+from typing import Tuple, TYPE_CHECKING
+from services.change_parser import parse_change_text
+from services.numbers import Number, normalize_digits, parse_number
+
+if TYPE_CHECKING:
+    from services.quote import Quote
 
 logger = logging.getLogger(__name__)
 
 class PriceFormatter:
     @staticmethod
-    def format_price(price_text: str, is_rial: bool = True) -> str:
-        """Format price text"""
-        try:
-            if price_text is None:
-                return "نامشخص"
+    def format_number(value: Number) -> str:
+        """Render a number with thousands separators"""
+        return f"{value:,}"
+
+    @staticmethod
+    def to_toman(rial: Number) -> int:
+        """Convert a Rial amount to whole Tomans"""
+        return int(rial) // 10
 
-            clean_price = ''.join(c for c in price_text if c.isdigit() or c == '.' or c == ',')
-            clean_price = clean_price.replace(',', '')
+    @classmethod
+    def format_quote(cls, quote: 'Quote', toman: bool = True) -> Tuple[str, str, str, str]:
+        """Render (price, percent, change amount, currency) of a parsed quote
 
-            if '.' in clean_price:
-                formatted = f"{float(clean_price):,.2f}"
-            else:
-                formatted = f"{int(clean_price):,}"
+        As in the original messages, a Toman change amount is shown without its
+        sign (the trend emoji carries the direction) while a negative percent
+        and USD amount keep theirs. Percents are rendered from the parsed
+        number, so an explicit '+' in tgju's text is not reproduced.
+        """
+        percent = f"{cls.format_number(quote.percent)}%"
+        if not quote.is_rial:
+            return cls.format_number(quote.price), percent, cls.format_number(quote.change), 'دلار'
+        if not toman:
+            return cls.format_number(quote.price), percent, cls.format_number(quote.change), 'ریال'
 
-            return f"{formatted} ریال" if is_rial else formatted
-        except Exception as e:
-            logger.error(f"Price format error: {e}")
+        amount = cls.format_number(cls.to_toman(abs(quote.change))) if quote.change else "0"
+        return cls.format_number(cls.to_toman(quote.price)), percent, amount, 'تومان'
+
+    @staticmethod
+    def format_price(price_text: str, is_rial: bool = True) -> str:
+        """Format price text"""
+        if price_text is None:
+            return "نامشخص"
+
+        value = parse_number(price_text)
+        if value is None:
+            logger.error(f"Price format error: {price_text!r}")
             return price_text
 
+        # Signs are dropped, as they always were
+        value = abs(value)
+        formatted = f"{float(value):,.2f}" if isinstance(value, Decimal) else f"{value:,}"
+        return f"{formatted} ریال" if is_rial else formatted
+
     @staticmethod
     def extract_change_values(change_text: str) -> Tuple[str, str]:
         """Extract percentage and amount from change text"""
         try:
-            if change_text is None:
-                return "0%", "0"
-
-            change_text = change_text.strip()
-            patterns = [
-                r'\(([+-]?[\d.]+)%\)\s*([+-]?[\d,.]+)',
-                r'([+-]?[\d,.]+)\s*\(([+-]?[\d.]+)%\)',
-                r'([+-]?[\d.]+)%',
-                r'([+-]?[\d,.]+)'
-            ]
-
-            for pattern in patterns:
-                match = re.search(pattern, change_text)
-                if match:
-                    groups = match.groups()
-                    if len(groups) == 2:
-                        return f"{groups[0]}%", groups[1].replace(',', '')
-                    return f"{groups[0]}%", "0" if '%' in groups[0] else groups[0].replace(',', '')
-
-            return "0%", "0"
+            return parse_change_text(change_text)
         except Exception as e:
             logger.error(f"Change extraction error: {e}")
             return "0%", "0"
 
-    @staticmethod
-    def convert_to_toman(price_str: str) -> str:
-        """Convert price from Rial to Toman"""
-        try:
-            if isinstance(price_str, (str, int, float)):
-                if isinstance(price_str, str):
-                    price_num = int(''.join(c for c in price_str if c.isdigit()))
-                else:
-                    price_num = int(price_str)
+    @classmethod
+    def convert_to_toman(cls, price_str: str) -> str:
+        """Convert price from Rial to Toman
 
-                toman_value = price_num // 10
-                return "{:,}".format(toman_value)
+        Text is read digit by digit, so signs and decimal points are ignored
+        ('-8,520' gives '852'); numbers keep their sign.
+        """
+        if isinstance(price_str, str):
+            digits = ''.join(char for char in normalize_digits(price_str) if char.isdigit())
+            value = int(digits) if digits else None
+        elif isinstance(price_str, (int, float)):
+            value = int(price_str)
+        else:
+            value = None
+        if value is None:
+            logger.error(f"Toman conversion error: {price_str!r}")
             return str(price_str)
-        except Exception as e:
-            logger.error(f"Toman conversion error: {e}")
-            return str(price_str)
\ No newline at end of file
+        return cls.format_number(cls.to_toman(value))
\ No newline at end of file
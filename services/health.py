@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Passive connectivity tracking from the outcomes of real requests
+
+    closed: requests flow; `failure_threshold` consecutive failures open the circuit.
+    open: requests are refused until `reset_timeout` has passed.
+    half_open: a single probe decides whether to close or re-open the circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+            self,
+            name: str = 'telegram',
+            failure_threshold: int = 3,
+            reset_timeout: float = 30,
+            probe: Optional[Callable[[], Awaitable[bool]]] = None,
+            clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._probe = probe
+        self._clock = clock
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.transitions: Counter = Counter()
+        self._opened_at = 0.0
+        self._probe_lock = asyncio.Lock()
+
+    async def allow(self) -> bool:
+        """Whether a request may be attempted right now"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and self._clock() - self._opened_at < self.reset_timeout:
+            return False
+
+        async with self._probe_lock:
+            if self.state == self.OPEN:
+                self._transition(self.HALF_OPEN)
+            if self.state != self.HALF_OPEN:
+                return self.state == self.CLOSED
+            if self._probe is None:
+                # The next real request is the probe
+                return True
+
+            try:
+                healthy = await self._probe()
+            except Exception as e:
+                logger.debug(f"{self.name} probe raised {type(e).__name__}: {e}")
+                healthy = False
+            if healthy:
+                self.record_success()
+            else:
+                self.record_failure()
+            return healthy
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        if self.state != self.CLOSED:
+            self._transition(self.CLOSED)
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold
+        ):
+            self._opened_at = self._clock()
+            self._transition(self.OPEN)
+
+    def metrics(self) -> Dict:
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'transitions': dict(self.transitions)
+        }
+
+    def _transition(self, state: str):
+        logger.warning(f"Circuit {self.name}: {self.state} -> {state}")
+        self.transitions[f"{self.state}->{state}"] += 1
+        self.state = state
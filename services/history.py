@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+from services.quote import Quote
+
+logger = logging.getLogger(__name__)
+
+# (instrument, ts, price, change_percent, change_amount, trend)
+Row = Tuple[str, int, float, Optional[float], Optional[float], str]
+
+
+class PriceHistory:
+    """Time-series store of price snapshots in SQLite (WAL mode)"""
+
+    BUCKETS = {'1m': 60, '15m': 900, '1h': 3600, '4h': 14400, '1d': 86400}
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS prices (
+            instrument TEXT NOT NULL,
+            ts INTEGER NOT NULL,
+            price REAL NOT NULL,
+            change_percent REAL,
+            change_amount REAL,
+            trend TEXT,
+            PRIMARY KEY (instrument, ts)
+        ) WITHOUT ROWID
+    """
+
+    def __init__(self, path: Union[str, Path], batch_size: int = 500, flush_interval: float = 5):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        if str(path) != ':memory:':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(self.SCHEMA)
+        self._db_lock = threading.Lock()
+
+        self._buffer: List[Row] = []
+        # Guards the buffer against a flush swapping it on the writer thread
+        self._buffer_lock = threading.Lock()
+        self._flushes: Set[asyncio.Future] = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='history')
+        self._task: Optional[asyncio.Task] = None
+
+    def append(self, snapshot: Dict[str, Quote], timestamp: Optional[float] = None):
+        """Buffer one scraper snapshot; this never touches the disk"""
+        ts = int(timestamp if timestamp is not None else time.time())
+        rows = [self._to_row(instrument, ts, quote) for instrument, quote in snapshot.items()]
+        with self._buffer_lock:
+            self._buffer.extend(rows)
+            full = len(self._buffer) >= self.batch_size
+        if full and self._task is not None and not self._flushes:
+            flush = asyncio.ensure_future(self.flush_async())
+            self._flushes.add(flush)
+            flush.add_done_callback(self._on_flushed)
+
+    def append_rows(self, rows: Iterable[Row]):
+        rows = list(rows)
+        with self._buffer_lock:
+            self._buffer.extend(rows)
+
+    def flush(self) -> int:
+        """Write buffered rows in a single transaction; returns the number written
+
+        If the write fails the rows go back to the front of the buffer, so the
+        next flush retries them.
+        """
+        with self._buffer_lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        try:
+            with self._db_lock, self._conn:
+                self._conn.executemany('INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?)', rows)
+        except Exception:
+            with self._buffer_lock:
+                self._buffer[:0] = rows
+            raise
+        return len(rows)
+
+    async def flush_async(self) -> int:
+        """Flush on the writer thread so the event loop is never blocked by disk I/O"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.flush)
+
+    def start(self):
+        """Start periodic background flushing on the running loop"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._flush_loop())
+
+    async def stop(self):
+        """Stop background flushing, write what is left and close the database"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        await self.flush_async()
+        self._executor.shutdown(wait=True)
+        self.close()
+
+    def close(self):
+        with self._db_lock:
+            self._conn.close()
+
+    def query(self, instrument: str, start: float, end: float) -> List[Tuple[int, float]]:
+        """(ts, price) points of an instrument in [start, end)"""
+        with self._db_lock:
+            return self._conn.execute(
+                'SELECT ts, price FROM prices WHERE instrument = ? AND ts >= ? AND ts < ? ORDER BY ts',
+                (instrument, int(start), int(end))
+            ).fetchall()
+
+    def latest(self, instrument: str) -> Optional[Tuple[int, float]]:
+        with self._db_lock:
+            return self._conn.execute(
+                'SELECT ts, price FROM prices WHERE instrument = ? ORDER BY ts DESC LIMIT 1',
+                (instrument,)
+            ).fetchone()
+
+    def ohlc(self, instrument: str, start: float, end: float, bucket: str = '1h') -> List[Tuple]:
+        """Downsample to (bucket_ts, open, high, low, close) candles"""
+        if bucket not in self.BUCKETS:
+            raise ValueError(f"Unknown bucket: {bucket!r} (expected one of {tuple(self.BUCKETS)})")
+        size = self.BUCKETS[bucket]
+
+        with self._db_lock:
+            return self._conn.execute(
+                """
+                SELECT bucket,
+                       (SELECT price FROM prices WHERE instrument = :instrument AND ts = first_ts),
+                       high, low,
+                       (SELECT price FROM prices WHERE instrument = :instrument AND ts = last_ts)
+                FROM (
+                    SELECT ts - ts % :size AS bucket, MIN(ts) AS first_ts, MAX(ts) AS last_ts,
+                           MAX(price) AS high, MIN(price) AS low
+                    FROM prices
+                    WHERE instrument = :instrument AND ts >= :start AND ts < :end
+                    GROUP BY bucket
+                )
+                ORDER BY bucket
+                """,
+                {'instrument': instrument, 'size': size, 'start': int(start), 'end': int(end)}
+            ).fetchall()
+
+    def _on_flushed(self, flush: asyncio.Future):
+        self._flushes.discard(flush)
+        if not flush.cancelled() and flush.exception() is not None:
+            logger.error(f"History flush failed: {flush.exception()}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                if self._buffer:
+                    written = await self.flush_async()
+                    logger.debug(f"Wrote {written} history rows")
+            except sqlite3.Error as e:
+                logger.error(f"History flush failed: {e}")
+
+    @staticmethod
+    def _to_row(instrument: str, ts: int, quote: Quote) -> Row:
+        return instrument, ts, float(quote.price), float(quote.percent), float(quote.change), quote.trend
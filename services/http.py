@@ -0,0 +1,7 @@
+# HTTP settings shared by everything that fetches price pages and APIs
+
+# Browser-like User-Agent; tgju and some exchanges turn away obvious bots
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/119.0 Safari/537.36"
+)
@@ -0,0 +1,106 @@
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class Instrument:
+    """One tgju symbol: where it is published and how it is displayed"""
+
+    UNITS = ('rial', 'usd')
+
+    __slots__ = ('key', 'element_id', 'name', 'unit', 'page', 'toman', 'name_en')
+
+    def __init__(self, key: str, element_id: str, name: str, unit: str = 'rial', page: str = '/',
+                 toman: Optional[bool] = None, name_en: Optional[str] = None):
+        if unit not in self.UNITS:
+            raise ValueError(f"Unknown unit for {key}: {unit!r} (expected one of {self.UNITS})")
+        self.key = key
+        self.element_id = element_id
+        self.name = name
+        self.unit = unit
+        self.page = page if page.startswith('/') else f"/{page}"
+        # Rial prices are shown in toman unless the catalog says otherwise
+        self.toman = unit == 'rial' if toman is None else bool(toman) and unit == 'rial'
+        # Shown in English-language messages
+        self.name_en = name_en or key.replace('_', ' ').title()
+
+    def as_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Instrument':
+        return cls(data['key'], data['element_id'], data['name'], data.get('unit', 'rial'),
+                   data.get('page', '/'), data.get('toman'), data.get('name_en'))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Instrument):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self) -> str:
+        return f"Instrument({self.as_dict()})"
+
+
+# Every symbol the bot knows about; Config.INSTRUMENTS picks which ones are tracked
+CATALOG: Dict[str, Instrument] = {instrument.key: instrument for instrument in (
+    Instrument('coin', 'sekee', 'سکه', name_en='Gold coin'),
+    Instrument('dollar', 'price_dollar_rl', 'دلار', name_en='US dollar'),
+    Instrument('tether', 'crypto-tether-irr', 'تتر', name_en='Tether'),
+    Instrument('gold', 'geram18', 'طلا', name_en='18k gold (gram)'),
+    Instrument('ons', 'ons', 'انس', unit='usd', name_en='Gold ounce'),
+
+    Instrument('eur', 'price_eur', 'یورو', page='/currency', name_en='Euro'),
+    Instrument('gbp', 'price_gbp', 'پوند', page='/currency', name_en='British pound'),
+    Instrument('aed', 'price_aed', 'درهم', page='/currency', name_en='UAE dirham'),
+    Instrument('try', 'price_try', 'لیر', page='/currency', name_en='Turkish lira'),
+    Instrument('cny', 'price_cny', 'یوان', page='/currency', name_en='Chinese yuan'),
+
+    Instrument('bahar', 'sekeb', 'سکه بهار آزادی', page='/coin', name_en='Bahar Azadi coin'),
+    Instrument('half_coin', 'nim', 'نیم سکه', page='/coin', name_en='Half coin'),
+    Instrument('quarter_coin', 'rob', 'ربع سکه', page='/coin', name_en='Quarter coin'),
+    Instrument('gerami', 'gerami', 'سکه گرمی', page='/coin', name_en='Gram coin'),
+
+    Instrument('gold24', 'geram24', 'طلای ۲۴ عیار', page='/gold-chart', name_en='24k gold (gram)'),
+    Instrument('mesghal', 'mesghal', 'مثقال طلا', page='/gold-chart', name_en='Gold mesghal'),
+
+    Instrument('btc', 'crypto-bitcoin', 'بیت کوین', unit='usd', page='/crypto', name_en='Bitcoin'),
+    Instrument('eth', 'crypto-ethereum', 'اتریوم', unit='usd', page='/crypto', name_en='Ethereum'),
+
+    Instrument('brent', 'oil_brent', 'نفت برنت', unit='usd', page='/energy', name_en='Brent crude'),
+    Instrument('wti', 'oil', 'نفت WTI', unit='usd', page='/energy', name_en='WTI crude'),
+)}
+
+DEFAULT_KEYS = ('coin', 'dollar', 'tether', 'gold', 'ons')
+
+
+def load_catalog(keys: Optional[Iterable[str]] = None,
+                 path: Optional[Union[str, Path]] = None) -> Dict[str, Instrument]:
+    """Tracked instruments in display order
+
+    `path` may point to a JSON list of instrument dicts that add to or override
+    the built-in catalog; `keys` selects and orders the tracked symbols.
+    """
+    catalog = dict(CATALOG)
+    if path:
+        items = json.loads(Path(path).read_text(encoding='utf-8'))
+        for item in items:
+            instrument = Instrument.from_dict(item)
+            catalog[instrument.key] = instrument
+        logger.info(f"Loaded {len(items)} instruments from {path}")
+
+    keys = list(keys) if keys is not None else list(DEFAULT_KEYS)
+    unknown = [key for key in keys if key not in catalog]
+    if unknown:
+        raise ValueError(f"Unknown instruments: {unknown} (known: {sorted(catalog)})")
+    return {key: catalog[key] for key in keys}
+
+
+def group_by_page(instruments: Iterable[Instrument]) -> Dict[str, List[Instrument]]:
+    """Instruments grouped by the tgju page that publishes them, so each page is fetched once"""
+    pages: Dict[str, List[Instrument]] = {}
+    for instrument in instruments:
+        pages.setdefault(instrument.page, []).append(instrument)
+    return pages
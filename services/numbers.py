@@ -0,0 +1,32 @@
+from decimal import Decimal, InvalidOperation
+from typing import Optional, Union
+
+Number = Union[int, Decimal]
+
+# Persian and Arabic-Indic digits plus their decimal/thousands separators
+_DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩٫٬', '01234567890123456789.,')
+_NUMBER_CHARS = frozenset('0123456789.')
+
+
+def normalize_digits(text: str) -> str:
+    """Replace Persian/Arabic-Indic digits and separators with ASCII ones"""
+    return text.translate(_DIGITS)
+
+
+def parse_number(text) -> Optional[Number]:
+    """Parse a tgju number such as '1,452,000' or '۲٬۶۵۲٫۴۱' into int or Decimal"""
+    if text is None:
+        return None
+    if isinstance(text, (int, Decimal)):
+        return text
+
+    text = normalize_digits(str(text)).strip()
+    negative = text[:1] in ('-', '\u2212')
+    cleaned = ''.join(c for c in text if c in _NUMBER_CHARS)
+    if not cleaned or cleaned == '.':
+        return None
+    try:
+        value = Decimal(cleaned) if '.' in cleaned else int(cleaned)
+    except (ValueError, InvalidOperation):
+        return None
+    return -value if negative else value
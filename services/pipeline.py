@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, Type
+from services.cache import SnapshotCache
+from services.metrics import FAILURES, RETRIES, STAGE_SECONDS, record_failure
+from utils.logger import TICK_ID, new_tick
+
+logger = logging.getLogger(__name__)
+
+
+class StageStats:
+    """Rolling latency samples for one pipeline stage, mirrored into the stage histogram"""
+
+    def __init__(self, name: str, window: int = 100):
+        self.name = name
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.failures = 0
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        STAGE_SECONDS.observe(seconds, stage=self.name)
+
+    def fail(self, error: BaseException):
+        self.failures += 1
+        record_failure(self.name, error)
+
+    def summary(self) -> Dict:
+        samples = sorted(self.samples)
+        return {
+            'count': self.count,
+            'failures': self.failures,
+            'last': self.samples[-1] if self.samples else None,
+            'p50': samples[len(samples) // 2] if samples else None,
+            'max': samples[-1] if samples else None
+        }
+
+
+class PricePipeline:
+    """Decouples scraping from delivery: poller -> message queue -> sender"""
+
+    def __init__(
+            self,
+            cache: SnapshotCache,
+            render: Callable[[Dict], str],
+            deliver: Callable[[str], Awaitable[None]],
+            render_stale: Optional[Callable[[Dict, float], str]] = None,
+            max_stale: float = 1800,
+            poll_interval: float = 45,
+            retry_interval: float = 5,
+            scrape_timeout: float = 45,
+            send_timeout: Optional[float] = 30,
+            send_retries: int = 3,
+            queue_size: int = 10,
+            retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+            on_give_up: Optional[Callable[[str, Exception], Awaitable[None]]] = None
+    ):
+        self.cache = cache
+        self.render = render
+        self.deliver = deliver
+        self.render_stale = render_stale
+        self.max_stale = max_stale
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self.scrape_timeout = scrape_timeout
+        self.send_timeout = send_timeout
+        self.send_retries = send_retries
+        self.retry_on = retry_on
+        self.on_give_up = on_give_up
+
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.stats: Dict[str, StageStats] = {
+            stage: StageStats(stage) for stage in ('scrape', 'render', 'queue_wait', 'send')
+        }
+        self.dropped = 0
+        self.stale_served = 0
+        self._poll_failures = 0
+        self._tasks = []
+        # Publishing wakes the poller instead of scraping itself, so a tick costs one scrape
+        self._wake = asyncio.Event()
+        self._polling = False
+        self._next_poll: Optional[asyncio.Future] = None
+
+    def start(self):
+        """Start the poller and sender tasks on the running loop"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.ensure_future(self._poll_loop()),
+            asyncio.ensure_future(self._send_loop())
+        ]
+        logger.info("Price pipeline started")
+
+    async def stop(self):
+        """Cancel background tasks; undelivered messages are dropped"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._resolve_poll(None)
+        await self.cache.close()
+        self._tasks = []
+        logger.info(f"Price pipeline stopped (metrics: {self.metrics()})")
+
+    async def drain(self, timeout: float = 30) -> bool:
+        """Wait until every queued message has been delivered; False if `timeout` passed first"""
+        if not self._tasks:
+            return True
+        if not self.queue.empty():
+            logger.info(f"Draining {self.queue.qsize()} queued messages")
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.queue.qsize()} messages were still queued after {timeout}s")
+            return False
+
+    async def publish(self) -> bool:
+        """Render the freshest snapshot and queue it for delivery
+
+        While the poller runs, a stale cache is refreshed by waking it (or by
+        waiting for the scrape it already has in flight) rather than scraping
+        here, so each tick costs at most one scrape. If the scrape fails, the last good snapshot is rendered with
+        `render_stale` as long as it is younger than `max_stale` seconds.
+        """
+        tick_id = new_tick()
+        logger.info(f"Publish tick {tick_id} started")
+        snapshot = await self._snapshot()
+        stale_age = None
+        if not snapshot:
+            snapshot, stale_age = self._stale_snapshot()
+            if not snapshot:
+                return False
+
+        started = time.perf_counter()
+        message = self.render(snapshot) if stale_age is None else self.render_stale(snapshot, stale_age)
+        self.stats['render'].observe(time.perf_counter() - started)
+
+        self.enqueue(message)
+        return True
+
+    def enqueue(self, message: str):
+        """Queue a prepared message, dropping the oldest one if the queue is full"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+            logger.warning("Send queue full, dropped the oldest message")
+        self.queue.put_nowait((time.perf_counter(), TICK_ID.get(), message))
+
+    def metrics(self) -> Dict:
+        return {
+            'stages': {name: stage.summary() for name, stage in self.stats.items()},
+            'queue_size': self.queue.qsize(),
+            'dropped': self.dropped,
+            'stale_served': self.stale_served,
+            'poll_failures': self._poll_failures,
+            'cache': self.cache.metrics()
+        }
+
+    async def _snapshot(self) -> Optional[Dict]:
+        if self.cache.is_fresh():
+            return await self.cache.get()
+        if self._tasks:
+            return await self._poll_now()
+        return await self._timed_scrape(self.cache.get)
+
+    async def _poll_now(self) -> Optional[Dict]:
+        """The snapshot of the poller's next (or current) scrape, waking it if it is idle"""
+        if self._next_poll is None or self._next_poll.done():
+            self._next_poll = asyncio.get_running_loop().create_future()
+        next_poll = self._next_poll
+        if not self._polling:
+            self._wake.set()
+        return await asyncio.shield(next_poll)
+
+    def _resolve_poll(self, snapshot: Optional[Dict]):
+        if self._next_poll is not None and not self._next_poll.done():
+            self._next_poll.set_result(snapshot)
+
+    def _stale_snapshot(self) -> Tuple[Optional[Dict], Optional[float]]:
+        snapshot, age = self.cache.peek(), self.cache.age
+        if self.render_stale is None or snapshot is None:
+            return None, None
+        if age > self.max_stale:
+            logger.warning(f"Last good snapshot is {age:.0f}s old (limit {self.max_stale}s), not serving it")
+            return None, None
+        self.stale_served += 1
+        logger.warning(f"Scrape failed, serving the last good snapshot ({age:.0f}s old)")
+        return snapshot, age
+
+    async def _timed_scrape(self, fetch: Callable[[], Awaitable[Optional[Dict]]]) -> Optional[Dict]:
+        started = time.perf_counter()
+        try:
+            snapshot = await asyncio.wait_for(fetch(), self.scrape_timeout)
+        except asyncio.TimeoutError as e:
+            self.stats['scrape'].fail(e)
+            logger.warning(f"Scrape did not finish within {self.scrape_timeout}s")
+            return None
+        self.stats['scrape'].observe(time.perf_counter() - started)
+        if not snapshot:
+            self.stats['scrape'].failures += 1
+            FAILURES.inc(stage='scrape', exception='NoData')
+        return snapshot
+
+    async def _poll_loop(self):
+        while True:
+            new_tick()
+            snapshot = None
+            self._polling = True
+            self._wake.clear()
+            try:
+                snapshot = await self._timed_scrape(self.cache.refresh)
+            except Exception as e:
+                logger.error(f"Poller error: {type(e).__name__} - {e}")
+            finally:
+                self._polling = False
+            self._poll_failures = 0 if snapshot else self._poll_failures + 1
+            self._resolve_poll(snapshot)
+            # A publish wakes the poller early; the next regular poll is then counted from this scrape
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._poll_delay())
+            except asyncio.TimeoutError:
+                pass
+
+    def _poll_delay(self) -> float:
+        """Regular interval after a success; exponential backoff from `retry_interval` after failures"""
+        if not self._poll_failures:
+            return self.poll_interval
+        return min(self.poll_interval, self.retry_interval * 2 ** (self._poll_failures - 1))
+
+    async def _send_loop(self):
+        while True:
+            enqueued_at, tick_id, message = await self.queue.get()
+            # Delivery logs carry the id of the tick that produced the message
+            TICK_ID.set(tick_id)
+            self.stats['queue_wait'].observe(time.perf_counter() - enqueued_at)
+            started = time.perf_counter()
+            try:
+                await self._deliver_with_retry(message)
+                self.stats['send'].observe(time.perf_counter() - started)
+            except Exception as e:
+                self.stats['send'].fail(e)
+                logger.error(f"Giving up on message delivery: {type(e).__name__} - {e}")
+                if self.on_give_up is not None:
+                    await self._notify_give_up(message, e)
+            finally:
+                self.queue.task_done()
+
+    async def _notify_give_up(self, message: str, error: Exception):
+        try:
+            await self.on_give_up(message, error)
+        except Exception as e:
+            logger.error(f"Error in give-up handler: {e}")
+
+    async def _deliver_with_retry(self, message: str):
+        # tenacity is only needed once the first message goes out; keep it off the startup path
+        from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+        async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(self.send_retries),
+                wait=wait_exponential(multiplier=1, min=1, max=10),
+                retry=retry_if_exception_type(self.retry_on),
+                before_sleep=self._count_retry,
+                reraise=True
+        ):
+            with attempt:
+                await asyncio.wait_for(self.deliver(message), self.send_timeout)
+
+    @staticmethod
+    def _count_retry(retry_state):
+        RETRIES.inc(operation='deliver')
+        error = retry_state.outcome.exception()
+        if error is not None:
+            record_failure('deliver_attempt', error)
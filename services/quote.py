@@ -0,0 +1,87 @@
+import logging
+import time
+from decimal import Decimal
+from typing import Dict, Optional
+from services.change_parser import parse_change
+from services.numbers import Number, parse_number
+
+logger = logging.getLogger(__name__)
+
+
+class Quote:
+    """One instrument's price, parsed once from the scraped text"""
+
+    __slots__ = ('key', 'name', 'price', 'change', 'percent', 'trend', 'unit', 'source', 'fetched_at')
+
+    # Provenance (source, fetched_at) does not make two quotes different
+    VALUE_FIELDS = __slots__[:7]
+
+    def __init__(
+            self,
+            key: str,
+            name: str,
+            price: Number,
+            change: Decimal = Decimal(0),
+            percent: Decimal = Decimal(0),
+            trend: str = 'neutral',
+            unit: str = 'rial',
+            source: Optional[str] = None,
+            fetched_at: Optional[float] = None
+    ):
+        self.key = key
+        self.name = name
+        self.price = price
+        self.change = change
+        self.percent = percent
+        self.trend = trend
+        self.unit = unit
+        self.source = source
+        self.fetched_at = fetched_at
+
+    @classmethod
+    def from_text(
+            cls,
+            key: str,
+            name: str,
+            price_text: Optional[str],
+            change_text: Optional[str],
+            trend: str = 'neutral',
+            unit: str = 'rial'
+    ) -> Optional['Quote']:
+        """Build a quote from tgju's price and change strings; None if the price is unreadable"""
+        price = parse_number(price_text)
+        if price is None:
+            logger.warning(f"Unreadable price for {key}: {price_text!r}")
+            return None
+
+        percent, change = parse_change(change_text)
+        return cls(
+            key, name, price,
+            change=change,
+            percent=percent,
+            trend=trend,
+            unit=unit
+        )
+
+    @property
+    def is_rial(self) -> bool:
+        return self.unit == 'rial'
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the quote was fetched, if the source recorded it"""
+        if self.fetched_at is None:
+            return None
+        return time.time() - self.fetched_at
+
+    def as_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Quote):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.VALUE_FIELDS)
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{slot}={getattr(self, slot)!r}" for slot in self.__slots__)
+        return f"Quote({fields})"
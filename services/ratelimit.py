@@ -0,0 +1,53 @@
+import logging
+import time
+from typing import Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Non-blocking token bucket per key: `allow(key)` answers whether an action may run now
+
+    Unlike fanout.TokenBucket, callers are never delayed; a denied request is
+    simply refused, which is what user-triggered commands need.
+    """
+
+    def __init__(self, rate: float, burst: float = 1, clock: Callable[[], float] = time.monotonic,
+                 max_keys: int = 10000):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_keys = max_keys
+        self._clock = clock
+        # key -> (tokens, last update)
+        self._buckets: Dict[Hashable, Tuple[float, float]] = {}
+        self.stats: Dict[str, int] = {'allowed': 0, 'denied': 0}
+
+    def _tokens(self, key: Hashable, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def allow(self, key: Hashable) -> bool:
+        now = self._clock()
+        tokens = self._tokens(key, now)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            self.stats['denied'] += 1
+            return False
+        self._buckets[key] = (tokens - 1, now)
+        self.stats['allowed'] += 1
+        if len(self._buckets) > self.max_keys:
+            self._prune(now)
+        return True
+
+    def retry_after(self, key: Hashable) -> float:
+        """Seconds until `key` gets its next token (0 if it has one now)"""
+        return max(0.0, (1 - self._tokens(key, self._clock())) / self.rate)
+
+    def _prune(self, now: float):
+        """Forget keys whose bucket has refilled; they are indistinguishable from new ones"""
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items() if self._tokens(key, now) < self.burst
+        }
+        logger.debug(f"Rate limiter pruned to {len(self._buckets)} keys")
@@ -1,68 +1,320 @@
+import asyncio
+import importlib
 import logging
-from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright
-from typing import Dict, Optional
+import time
+import httpx
+from typing import Dict, Iterable, List, Optional, Tuple
+from services.browser import BrowserManager
+from services.http import USER_AGENT
+from services.instruments import Instrument, group_by_page, load_catalog
+from services.metrics import STAGE_SECONDS, record_failure
+from services.quote import Quote
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser
+    except ImportError:
+        HTMLParser = None
+
+try:
+    import lxml  # noqa: F401
+    BS4_PARSER = 'lxml'
+except ImportError:
+    BS4_PARSER = 'html.parser'
 
 logger = logging.getLogger(__name__)
 
 
 class TgjuScraper:
-    async def get_tgju_data(self) -> Optional[Dict]:
+    URL = "https://www.tgju.org"
+    MODES = ('auto', 'http', 'browser')
+    EXTRACT_MODES = ('evaluate', 'html')
+    PARSERS = ('auto', 'selectolax', 'lxml', 'html.parser')
+    USER_AGENT = USER_AGENT
+
+    # True once every tracked <li> has a non-empty price
+    READY_SCRIPT = """
+        (ids) => ids.every((id) => {
+            const price = document.querySelector(`li#l-${id} .info-price`);
+            return price !== null && price.textContent.trim() !== '';
+        })
+    """
+
+    # Reads only the tracked <li> nodes instead of serializing the whole DOM
+    EXTRACT_SCRIPT = """
+        (ids) => {
+            const result = {};
+            for (const id of ids) {
+                const li = document.querySelector(`li#l-${id}`);
+                if (li === null) continue;
+                const price = li.querySelector('span.info-price');
+                const change = li.querySelector('span.info-change');
+                result[id] = {
+                    price: price ? price.textContent.trim() : null,
+                    change: change ? change.textContent.trim() : null,
+                    classes: Array.from(li.classList)
+                };
+            }
+            return result;
+        }
+    """
+
+    def __init__(
+            self,
+            browser: Optional[BrowserManager] = None,
+            mode: str = 'auto',
+            http_client: Optional[httpx.AsyncClient] = None,
+            timeout: int = 30,
+            ready_timeout: float = 10,
+            extract: str = 'evaluate',
+            parser: str = 'auto',
+            instruments: Optional[Dict[str, Instrument]] = None,
+            page_concurrency: int = 4
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown scraper mode: {mode!r} (expected one of {self.MODES})")
+        if extract not in self.EXTRACT_MODES:
+            raise ValueError(f"Unknown extract mode: {extract!r} (expected one of {self.EXTRACT_MODES})")
+        if parser not in self.PARSERS:
+            raise ValueError(f"Unknown parser: {parser!r} (expected one of {self.PARSERS})")
+        if parser == 'selectolax' and HTMLParser is None:
+            raise ValueError("selectolax parser requested but selectolax is not installed")
+
+        self.browser = browser or BrowserManager()
+        self.mode = mode
+        self.timeout = timeout
+        self.ready_timeout = ready_timeout
+        self.extract = extract
+        self.parser = parser
+        self._http_client = http_client
+        self.instruments = instruments if instruments is not None else load_catalog()
+        self.pages = group_by_page(self.instruments.values())
+        self._page_slots = asyncio.Semaphore(max(1, page_concurrency))
+
+        self.last_path: Optional[str] = None
+        self.path_stats: Dict[str, int] = {'http': 0, 'browser': 0}
+
+    async def warm_up(self):
+        """Load the parser and browser modules off the event loop, and launch Chromium in browser mode
+
+        Runs in the background at startup so the first fetch does not pay for
+        imports (bs4 and playwright take a few hundred milliseconds together).
+        """
+        started = time.perf_counter()
+        modules = [] if self._resolve_parser() == 'selectolax' else ['bs4']
+        if self.mode != 'http':
+            modules.append('playwright.async_api')
+        loop = asyncio.get_running_loop()
+        for module in modules:
+            await loop.run_in_executor(None, importlib.import_module, module)
+        self._get_http_client()
+        if self.mode == 'browser':
+            await self.browser.start()
+        logger.info(f"Scraper warmed up in {time.perf_counter() - started:.2f}s (mode: {self.mode})")
+
+    async def get_tgju_data(self) -> Optional[Dict[str, Quote]]:
         """Get data from TGJU website"""
-        url = "https://www.tgju.org"
+        started = time.perf_counter()
         try:
-            logger.info("Starting data retrieval from tgju")
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page()
+            logger.info(f"Starting data retrieval from tgju (mode: {self.mode}, pages: {len(self.pages)})")
+            results = await asyncio.gather(
+                *(self._fetch_page(page, instruments) for page, instruments in self.pages.items()),
+                return_exceptions=True
+            )
 
-                logger.info(f"Navigating to {url}")
-                await page.goto(url, timeout=30000)
+            merged: Dict[str, Quote] = {}
+            paths = set()
+            for page, result in zip(self.pages, results):
+                if isinstance(result, BaseException):
+                    logger.error(f"Fetching {page} failed: {type(result).__name__} - {result}")
+                    continue
+                path, data = result
+                if data:
+                    paths.add(path)
+                    merged.update(data)
 
-                logger.info("Waiting for page to load...")
-                await page.wait_for_selector('li[id^="l-"]', timeout=10000)
-                await page.wait_for_timeout(5000)
+            if not merged:
+                return None
 
-                html = await page.content()
-                logger.info(f"HTML received (length: {len(html)})")
-                await browser.close()
-
-            return self._parse_html(html)
+            # Keep the catalog's display order regardless of which page finished first
+            data = {key: merged[key] for key in self.instruments if key in merged}
+            path = 'browser' if 'browser' in paths else 'http'
+            self.last_path = path
+            self.path_stats[path] += 1
+            logger.info(
+                f"Fetch served by {path} path in {time.perf_counter() - started:.2f}s "
+                f"(path stats: {self.path_stats}, browser stats: {self.browser.stats})"
+            )
+            return data
         except Exception as e:
             logger.error(f"Error in get_tgju_data: {e}")
             return None
 
-    def _parse_html(self, html: str) -> Dict:
-        """Parse HTML and extract data"""
-        soup = BeautifulSoup(html, "html.parser")
-
-        elements = {
-            'coin': ('sekee', 'سکه'),
-            'dollar': ('price_dollar_rl', 'دلار'),
-            'gold': ('geram18', 'طلا'),
-            'ons': ('ons', 'انس'),
-            'tether': ('crypto-tether-irr', 'تتر')
-        }
+    async def _fetch_page(self, page: str, instruments: List[Instrument]) -> Tuple[str, Optional[Dict[str, Quote]]]:
+        """Fetch one tgju page; at most `page_concurrency` pages are in flight at once"""
+        async with self._page_slots:
+            url = self.URL + page if page != '/' else self.URL
+            data = None
+            path = 'http'
+
+            if self.mode in ('auto', 'http'):
+                data = await self._fetch_http(url, instruments)
+
+            if self.mode == 'browser' or (self.mode == 'auto' and not self._is_complete(data, instruments)):
+                if self.mode == 'auto':
+                    missing = sorted({instrument.key for instrument in instruments} - set(data or {}))
+                    logger.info(f"HTTP fast path missing {missing} on {page}, falling back to browser")
+                data = await self._fetch_browser(url, instruments)
+                path = 'browser'
+            return path, data
+
+    async def close(self):
+        """Release the shared browser and HTTP client"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        await self.browser.close()
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                http2=True,
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={'User-Agent': self.USER_AGENT},
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=4)
+            )
+        return self._http_client
 
+    async def _fetch_http(self, url: str, instruments: List[Instrument]) -> Optional[Dict[str, Quote]]:
+        """Fetch the server-rendered page without a browser"""
+        try:
+            with STAGE_SECONDS.time(stage='http_fetch'):
+                response = await self._get_http_client().get(url)
+                response.raise_for_status()
+            logger.info(f"HTML received over HTTP from {url} (length: {len(response.text)})")
+            with STAGE_SECONDS.time(stage='parse'):
+                return self._parse_html(response.text, instruments)
+        except httpx.HTTPError as e:
+            record_failure('http_fetch', e)
+            logger.warning(f"HTTP fetch failed: {type(e).__name__} - {e}")
+            return None
+
+    async def _fetch_browser(self, url: str, instruments: List[Instrument]) -> Dict[str, Quote]:
+        """Fetch the fully rendered page with Chromium"""
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        async with self.browser.page() as page:
+            started = time.perf_counter()
+            logger.info(f"Navigating to {url}")
+            await page.goto(url, timeout=self.timeout * 1000, wait_until='domcontentloaded')
+            navigated = time.perf_counter()
+
+            logger.info("Waiting for prices to appear...")
+            ids = [instrument.element_id for instrument in instruments]
+            try:
+                await page.wait_for_function(self.READY_SCRIPT, arg=ids, timeout=self.ready_timeout * 1000)
+            except PlaywrightTimeoutError as e:
+                record_failure('ready', e)
+                logger.warning(f"Not all prices were ready after {self.ready_timeout}s, using what is loaded")
+            ready = time.perf_counter()
+
+            if self.extract == 'evaluate':
+                raw = await page.evaluate(self.EXTRACT_SCRIPT, ids)
+                data = self._build_data(raw, instruments)
+            else:
+                html = await page.content()
+                logger.info(f"HTML received (length: {len(html)})")
+                data = self._parse_html(html, instruments)
+
+        extracted = time.perf_counter()
+        STAGE_SECONDS.observe(navigated - started, stage='navigate')
+        STAGE_SECONDS.observe(ready - navigated, stage='ready')
+        STAGE_SECONDS.observe(extracted - ready, stage='extract')
+        logger.info(
+            f"Browser stages for {url}: navigate={navigated - started:.2f}s, "
+            f"ready={ready - navigated:.2f}s, extract={extracted - ready:.2f}s"
+        )
+        return data
+
+    @staticmethod
+    def _is_complete(data: Optional[Dict], instruments: Iterable[Instrument]) -> bool:
+        return bool(data) and all(instrument.key in data for instrument in instruments)
+
+    def _build_data(self, raw: Dict[str, Dict],
+                    instruments: Optional[Iterable[Instrument]] = None) -> Dict[str, Quote]:
+        """Build scraper output from {element_id: {price, change, classes}}"""
         data = {}
-        for key, (element_id, name) in elements.items():
-            element = soup.find('li', {'id': f'l-{element_id}'})
-            if not element:
+        for instrument in instruments if instruments is not None else self.instruments.values():
+            element = raw.get(instrument.element_id)
+            if element is None:
                 continue
+            quote = self._build_quote(
+                instrument.key, instrument.name, instrument.unit,
+                element.get('price'), element.get('change'), element.get('classes')
+            )
+            if quote is not None:
+                data[instrument.key] = quote
+        return data
+
+    @staticmethod
+    def _build_quote(key: str, name: str, unit: str, price_text: Optional[str], change_text: Optional[str],
+                     li_classes: Optional[Iterable[str]]) -> Optional[Quote]:
+        li_classes = li_classes or ()
+        trend = 'low' if 'low' in li_classes else 'high' if 'high' in li_classes else 'neutral'
+        return Quote.from_text(
+            key, name,
+            "0" if price_text is None else price_text,
+            "(0%)" if change_text is None else change_text,
+            trend=trend,
+            unit=unit
+        )
+
+    def _resolve_parser(self) -> str:
+        if self.parser != 'auto':
+            return self.parser
+        return 'selectolax' if HTMLParser is not None else BS4_PARSER
+
+    def _parse_html(self, html: str, instruments: Optional[List[Instrument]] = None) -> Dict[str, Quote]:
+        """Parse HTML and extract data"""
+        if instruments is None:
+            instruments = list(self.instruments.values())
+        parser = self._resolve_parser()
+        if parser == 'selectolax':
+            return self._parse_html_selectolax(html, instruments)
 
-            li_classes = element.get('class', [])
+        from bs4 import BeautifulSoup, SoupStrainer
+
+        ids = [f'l-{instrument.element_id}' for instrument in instruments]
+        soup = BeautifulSoup(html, parser, parse_only=SoupStrainer('li', id=ids))
+
+        raw = {}
+        for element in soup.find_all('li'):
             price_element = element.find('span', class_='info-price')
             change_element = element.find('span', class_='info-change')
+            raw[element['id'][2:]] = {
+                'price': price_element.text.strip() if price_element else None,
+                'change': change_element.text.strip() if change_element else None,
+                'classes': element.get('class', [])
+            }
+        return self._build_data(raw, instruments)
 
-            price_text = price_element.text.strip() if price_element else "0"
-            change_text = change_element.text.strip() if change_element else "(0%)"
-            trend = 'low' if 'low' in li_classes else 'high' if 'high' in li_classes else 'neutral'
+    def _parse_html_selectolax(self, html: str, instruments: List[Instrument]) -> Dict[str, Quote]:
+        tree = HTMLParser(html)
 
-            data[key] = {
-                'name': name,
-                'price': price_text,
-                'change': change_text,
-                'trend': trend
+        raw = {}
+        for instrument in instruments:
+            element_id = instrument.element_id
+            element = tree.css_first(f'li#l-{element_id}')
+            if element is None:
+                continue
+            price_element = element.css_first('span.info-price')
+            change_element = element.css_first('span.info-change')
+            raw[element_id] = {
+                'price': price_element.text(strip=True) if price_element else None,
+                'change': change_element.text(strip=True) if change_element else None,
+                'classes': (element.attributes.get('class') or '').split()
             }
-
-        return data
\ No newline at end of file
+        return self._build_data(raw, instruments)
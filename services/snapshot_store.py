@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+from services.numbers import parse_number
+from services.quote import Quote
+
+logger = logging.getLogger(__name__)
+
+Snapshot = Dict[str, Quote]
+
+
+class SnapshotStore:
+    """The last good snapshot on disk, so a restart can still serve prices"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+
+    def save(self, snapshot: Snapshot, timestamp: Optional[float] = None):
+        """Write the snapshot atomically; `timestamp` is wall-clock time of the fetch"""
+        saved_at = timestamp if timestamp is not None else time.time()
+        payload = {
+            'saved_at': saved_at,
+            'quotes': [self._dump_quote(quote) for quote in snapshot.values()]
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+            tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding='utf-8')
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Could not save snapshot to {self.path}: {e}")
+
+    def version(self) -> Optional[int]:
+        """Modification time of the stored file, to notice saves by another process cheaply"""
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def load(self) -> Optional[Tuple[Snapshot, float]]:
+        """Return (snapshot, saved_at) or None if nothing usable is stored"""
+        if not self.path.exists():
+            return None
+        try:
+            payload = json.loads(self.path.read_text(encoding='utf-8'))
+            snapshot = {item['key']: self._load_quote(item) for item in payload['quotes']}
+            saved_at = float(payload['saved_at'])
+        except (OSError, ValueError, KeyError, TypeError, InvalidOperation) as e:
+            logger.error(f"Could not load snapshot from {self.path}: {e}")
+            return None
+        if not snapshot:
+            return None
+        logger.info(f"Loaded snapshot of {len(snapshot)} quotes saved at {saved_at:.0f} from {self.path}")
+        return snapshot, saved_at
+
+    @staticmethod
+    def _dump_quote(quote: Quote) -> Dict:
+        data = quote.as_dict()
+        for field in ('price', 'change', 'percent'):
+            data[field] = str(data[field])
+        return data
+
+    @staticmethod
+    def _load_quote(item: Dict) -> Quote:
+        price = parse_number(item['price'])
+        if price is None:
+            raise ValueError(f"Unreadable stored price for {item['key']}: {item['price']!r}")
+        return Quote(
+            item['key'], item['name'], price,
+            change=Decimal(item['change']),
+            percent=Decimal(item['percent']),
+            trend=item.get('trend', 'neutral'),
+            unit=item.get('unit', 'rial'),
+            source=item.get('source'),
+            fetched_at=item.get('fetched_at')
+        )
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import statistics
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import httpx
+from services.http import USER_AGENT
+from services.instruments import Instrument
+from services.metrics import SOURCE_SECONDS, record_failure
+from services.numbers import parse_number
+from services.quote import Quote
+
+if TYPE_CHECKING:
+    from services.scraper import TgjuScraper
+
+logger = logging.getLogger(__name__)
+
+
+class PriceSource:
+    """A place quotes can be fetched from; subclasses implement `fetch`"""
+
+    name = 'source'
+
+    async def fetch(self) -> Optional[Dict[str, Quote]]:
+        """Return {instrument key: Quote} for the instruments this source knows, or None"""
+        raise NotImplementedError
+
+    async def warm_up(self):
+        """Load whatever the first fetch would otherwise pay for; called in the background at startup"""
+
+    async def close(self):
+        """Release connections held by the source"""
+
+
+class TgjuSource(PriceSource):
+    """tgju.org through the HTTP/browser scraper, in-process or via a ScraperPool"""
+
+    name = 'tgju'
+
+    def __init__(self, scraper: 'TgjuScraper'):
+        self.scraper = scraper
+
+    async def fetch(self) -> Optional[Dict[str, Quote]]:
+        return await self.scraper.get_tgju_data()
+
+    async def warm_up(self):
+        await self.scraper.warm_up()
+
+    async def close(self):
+        await self.scraper.close()
+
+
+class NobitexSource(PriceSource):
+    """Nobitex market stats: tether in rial and major coins in USDT"""
+
+    name = 'nobitex'
+    URL = "https://api.nobitex.ir/market/stats"
+
+    # instrument key: (market, unit)
+    MARKETS = {
+        'tether': ('usdt-rls', 'rial'),
+        'btc': ('btc-usdt', 'usd'),
+        'eth': ('eth-usdt', 'usd'),
+    }
+
+    def __init__(self, instruments: Dict[str, Instrument], http_client: Optional[httpx.AsyncClient] = None,
+                 timeout: float = 10):
+        self.instruments = instruments
+        self.timeout = timeout
+        self._http_client = http_client
+
+    async def fetch(self) -> Optional[Dict[str, Quote]]:
+        markets = {key: market for key, market in self.MARKETS.items() if key in self.instruments}
+        if not markets:
+            return None
+
+        sources = sorted({market.split('-')[0] for market, _ in markets.values()})
+        destinations = sorted({market.split('-')[1] for market, _ in markets.values()})
+        response = await self._get_http_client().get(
+            self.URL, params={'srcCurrency': ','.join(sources), 'dstCurrency': ','.join(destinations)}
+        )
+        response.raise_for_status()
+        return self._parse(response.json(), markets)
+
+    def _parse(self, payload: Dict, markets: Dict[str, Tuple[str, str]]) -> Dict[str, Quote]:
+        stats = payload.get('stats') or {}
+        data = {}
+        for key, (market, unit) in markets.items():
+            item = stats.get(market)
+            if not item or item.get('isClosed'):
+                continue
+            price = parse_number(item.get('latest'))
+            if not price:
+                continue
+            percent = parse_number(item.get('dayChange')) or 0
+            day_open = parse_number(item.get('dayOpen'))
+            change = price - day_open if day_open else 0
+            trend = 'high' if percent > 0 else 'low' if percent < 0 else 'neutral'
+            data[key] = Quote(
+                key, self.instruments[key].name, price,
+                change=abs(change), percent=abs(percent), trend=trend, unit=unit
+            )
+        return data
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(timeout=self.timeout, headers={'User-Agent': USER_AGENT})
+        return self._http_client
+
+    async def close(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+
+# name -> factory(**context); the bot passes scraper, instruments and timeout
+_REGISTRY: Dict[str, Callable[..., PriceSource]] = {}
+
+
+def register_source(name: str, factory: Callable[..., PriceSource]):
+    """Make a source available to Config.PRICE_SOURCES under `name`"""
+    _REGISTRY[name] = factory
+
+
+def create_source(name: str, **context) -> PriceSource:
+    if name not in _REGISTRY:
+        raise ValueError(f"Unknown price source: {name!r} (registered: {sorted(_REGISTRY)})")
+    return _REGISTRY[name](**context)
+
+
+register_source('tgju', lambda scraper, **_: TgjuSource(scraper))
+register_source('nobitex', lambda instruments, timeout=10, **_: NobitexSource(instruments, timeout=timeout))
+
+
+class PriceAggregator:
+    """Queries several sources concurrently and merges their quotes
+
+    first_good: each instrument comes from the first source that delivers it;
+        the fetch returns as soon as every expected instrument is covered, so
+        latency follows the fastest healthy source.
+    median: waits for every source (each bounded by its deadline) and keeps
+        the quote with the median price per instrument.
+    """
+
+    STRATEGIES = ('first_good', 'median')
+
+    def __init__(
+            self,
+            sources: Sequence[PriceSource],
+            strategy: str = 'first_good',
+            deadline: float = 30,
+            deadlines: Optional[Dict[str, float]] = None,
+            expected: Optional[Iterable[str]] = None
+    ):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown merge strategy: {strategy!r} (expected one of {self.STRATEGIES})")
+        if not sources:
+            raise ValueError("PriceAggregator needs at least one source")
+        self.sources = list(sources)
+        self.strategy = strategy
+        self.deadline = deadline
+        self.deadlines = deadlines or {}
+        self.expected = set(expected) if expected is not None else None
+
+        self.stats: Dict[str, Dict[str, float]] = {
+            source.name: {'ok': 0, 'empty': 0, 'failed': 0, 'timeouts': 0, 'cancelled': 0, 'last_seconds': 0.0}
+            for source in self.sources
+        }
+
+    async def fetch(self) -> Optional[Dict[str, Quote]]:
+        """One merged snapshot, or None if no source delivered anything"""
+        tasks = {asyncio.ensure_future(self._fetch_source(source)): source for source in self.sources}
+        try:
+            if self.strategy == 'median':
+                results = await asyncio.gather(*tasks)
+                data = self._merge_median([result for result in results if result])
+            else:
+                data = await self._merge_first_good(tasks)
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+                self.stats[tasks[task].name]['cancelled'] += 1
+            # Let stragglers unwind (close pages, release pool slots) before returning
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if not data:
+            return None
+        logger.info(f"Aggregated {len(data)} quotes from {sorted({q.source for q in data.values()})}")
+        return data
+
+    async def _merge_first_good(self, tasks: Dict[asyncio.Future, PriceSource]) -> Dict[str, Quote]:
+        data: Dict[str, Quote] = {}
+        for next_done in asyncio.as_completed(list(tasks)):
+            result = await next_done
+            for key, quote in (result or {}).items():
+                data.setdefault(key, quote)
+            if self.expected is not None and self.expected <= data.keys():
+                break
+        return data
+
+    @staticmethod
+    def _merge_median(results: List[Dict[str, Quote]]) -> Dict[str, Quote]:
+        candidates: Dict[str, List[Quote]] = {}
+        for result in results:
+            for key, quote in result.items():
+                candidates.setdefault(key, []).append(quote)
+
+        data = {}
+        for key, quotes in candidates.items():
+            # The low median is a real quote, so its change and trend stay consistent with the price
+            median = statistics.median_low(quote.price for quote in quotes)
+            data[key] = next(quote for quote in quotes if quote.price == median)
+        return data
+
+    async def _fetch_source(self, source: PriceSource) -> Optional[Dict[str, Quote]]:
+        """Fetch one source within its deadline and tag its quotes; never raises"""
+        stats = self.stats[source.name]
+        started = time.perf_counter()
+        try:
+            data = await asyncio.wait_for(source.fetch(), self.deadlines.get(source.name, self.deadline))
+        except asyncio.TimeoutError as e:
+            stats['timeouts'] += 1
+            record_failure(f'source:{source.name}', e)
+            logger.warning(f"Source {source.name} missed its deadline")
+            return None
+        except Exception as e:
+            stats['failed'] += 1
+            record_failure(f'source:{source.name}', e)
+            logger.warning(f"Source {source.name} failed: {type(e).__name__} - {e}")
+            return None
+        finally:
+            elapsed = time.perf_counter() - started
+            stats['last_seconds'] = round(elapsed, 3)
+            SOURCE_SECONDS.observe(elapsed, source=source.name)
+
+        if not data:
+            stats['empty'] += 1
+            return None
+        stats['ok'] += 1
+        fetched_at = time.time()
+        for quote in data.values():
+            quote.source = quote.source or source.name
+            quote.fetched_at = quote.fetched_at or fetched_at
+        return data
+
+    async def warm_up(self):
+        """Warm every source concurrently; a failed warm-up is logged and left to the first fetch"""
+        results = await asyncio.gather(*(source.warm_up() for source in self.sources), return_exceptions=True)
+        for source, result in zip(self.sources, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Warming up source {source.name} failed: {type(result).__name__} - {result}")
+
+    def metrics(self) -> Dict:
+        return {'strategy': self.strategy, 'sources': self.stats}
+
+    async def close(self):
+        for source in self.sources:
+            await source.close()
@@ -0,0 +1,76 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+ChatId = Union[int, str]
+
+
+class SubscriptionStore:
+    """Chats that receive every price update, persisted as a JSON list"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._chats: Set[ChatId] = set()
+        self._mtime: Optional[int] = None
+        self._load()
+
+    def __contains__(self, chat_id: ChatId) -> bool:
+        return chat_id in self._chats
+
+    def __len__(self) -> int:
+        return len(self._chats)
+
+    def list(self) -> List[ChatId]:
+        return sorted(self._chats, key=str)
+
+    def refresh(self) -> bool:
+        """Re-read the file if another process changed it; returns True if it was reloaded"""
+        if self._file_mtime() == self._mtime:
+            return False
+        self._load()
+        return True
+
+    def add(self, chat_id: ChatId) -> bool:
+        """Subscribe a chat; returns False if it was already subscribed"""
+        self.refresh()
+        if chat_id in self._chats:
+            return False
+        self._chats.add(chat_id)
+        self._save()
+        return True
+
+    def remove(self, chat_id: ChatId) -> bool:
+        """Unsubscribe a chat; returns False if it was not subscribed"""
+        self.refresh()
+        if chat_id not in self._chats:
+            return False
+        self._chats.discard(chat_id)
+        self._save()
+        return True
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        self._mtime = self._file_mtime()
+        if self._mtime is None:
+            return
+        try:
+            self._chats = set(json.loads(self.path.read_text(encoding='utf-8')))
+            logger.info(f"Loaded {len(self._chats)} subscribers from {self.path}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load subscribers from {self.path}: {e}")
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        tmp_path.write_text(json.dumps(self.list(), ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, self.path)
+        self._mtime = self._file_mtime()
@@ -0,0 +1,277 @@
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from string import Formatter
+from typing import Dict, Iterable, List, Optional, Tuple
+from services.formatter import PriceFormatter
+from services.instruments import Instrument
+from services.quote import Quote
+from utils.date_utils import get_jalali_date, get_time_of_day
+
+logger = logging.getLogger(__name__)
+
+# markup format: Telegram parse_mode
+FORMATS = {'markdown': 'Markdown', 'markdown_v2': 'MarkdownV2', 'html': 'HTML'}
+DEFAULT_STYLE = 'fa:markdown'
+
+# Layouts use <b>...</b> for bold whatever the output format; literal text is escaped when compiled
+LAYOUTS = {
+    'fa': {
+        'header': "📊 <b>قیمت‌های لحظه‌ای بازار</b>\n🕒 {date}",
+        'stale': "⏳ داده تازه در دسترس نیست؛ قیمت‌ها مربوط به ساعت {time} هستند",
+        'divider': "\n━━━━━━━━✨<b>وضعیت بازار</b>✨━━━━━━━━\n",
+        'row': "{emoji} <b>{name}</b>: {price} {currency}\nتغییر: {percent} ({amount} {currency})\n",
+        'currencies': {'toman': 'تومان', 'rial': 'ریال', 'usd': 'دلار'},
+    },
+    'en': {
+        'header': "📊 <b>Live market prices</b>\n🕒 {date}",
+        'stale': "⏳ Fresh data is unavailable; prices are as of {time}",
+        'divider': "\n━━━━━━━━✨<b>Market</b>✨━━━━━━━━\n",
+        'row': "{emoji} <b>{name}</b>: {price} {currency}\nChange: {percent} ({amount} {currency})\n",
+        'currencies': {'toman': 'Toman', 'rial': 'Rial', 'usd': 'USD'},
+    },
+}
+TREND_EMOJI = {'low': '🔴', 'high': '🟢'}
+NEUTRAL_EMOJI = '⚪️'
+
+_BOLD = {'markdown': ('*', '*'), 'markdown_v2': ('*', '*'), 'html': ('<b>', '</b>')}
+_ESCAPES = {
+    'markdown': str.maketrans({char: '\\' + char for char in '_*`['}),
+    'markdown_v2': str.maketrans({char: '\\' + char for char in '\\_*[]()~`>#+-=|{}.!'}),
+    'html': str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'}),
+}
+# Legacy Markdown cannot escape inside an entity, so a '*' in bold text becomes a look-alike
+_MARKDOWN_BOLD_ESCAPE = str.maketrans({'*': '∗'})
+PERSIAN_DIGITS = str.maketrans('0123456789,.%', '۰۱۲۳۴۵۶۷۸۹٬٫٪')
+
+_TAG = re.compile(r'(</?b>)')
+
+
+def normalize_style(spec: str) -> str:
+    """Canonical <language>:<format>[:persian] form of a style; raises ValueError
+
+    The language comes first (fa or en); the format (markdown, markdown_v2 or
+    html, default markdown) and the `persian` digits flag may follow in any order.
+    """
+    parts = [part.strip().lower() for part in spec.split(':') if part.strip()]
+    if not parts or parts[0] not in LAYOUTS:
+        raise ValueError(f"Message style {spec!r} must start with a language: {sorted(LAYOUTS)}")
+    language, fmt, persian = parts[0], 'markdown', False
+    for part in parts[1:]:
+        if part in FORMATS:
+            fmt = part
+        elif part == 'persian':
+            persian = True
+        else:
+            raise ValueError(f"Unknown message style option {part!r} in {spec!r} "
+                             f"(expected one of {sorted(FORMATS)} or persian)")
+    return f"{language}:{fmt}:persian" if persian else f"{language}:{fmt}"
+
+
+def compile_part(source: str, fmt: str) -> Tuple[str, Dict[str, bool]]:
+    """A str.format template with the literal text of `source` escaped for `fmt`
+
+    Also returns, for every field, whether it sits inside bold text, which
+    decides how its values are escaped.
+    """
+    escape, (bold_open, bold_close) = _ESCAPES[fmt], _BOLD[fmt]
+    parts, fields, bold = [], {}, False
+    for literal, field, _, _ in Formatter().parse(source):
+        for piece in _TAG.split(literal):
+            if piece == '<b>':
+                parts.append(bold_open)
+                bold = True
+            elif piece == '</b>':
+                parts.append(bold_close)
+                bold = False
+            else:
+                parts.append(piece.translate(escape).replace('{', '{{').replace('}', '}}'))
+        if field is not None:
+            parts.append(f"{{{field}}}")
+            fields[field] = bold
+    return ''.join(parts), fields
+
+
+class MessageTemplate:
+    """The price message in one style (language, markup format, digits), compiled once"""
+
+    def __init__(self, spec: str):
+        self.spec = normalize_style(spec)
+        self.language, self.format, *flags = self.spec.split(':')
+        self.persian_digits = 'persian' in flags
+        self.parse_mode = FORMATS[self.format]
+
+        layout = LAYOUTS[self.language]
+        self._escape = _ESCAPES[self.format]
+        self._bold_escape = _MARKDOWN_BOLD_ESCAPE if self.format == 'markdown' else self._escape
+        self._header = compile_part(layout['header'], self.format)[0]
+        self._stale = compile_part(layout['stale'], self.format)[0]
+        self._divider = compile_part(layout['divider'], self.format)[0].format()
+        self._row, row_fields = compile_part(layout['row'], self.format)
+        self._name_escape = self._bold_escape if row_fields['name'] else self._escape
+        # Digits, separators and '%' only need escaping in MarkdownV2 ('.', '-')
+        self._number_escape = self._escape if self.format == 'markdown_v2' else None
+        self._currencies = {unit: name.translate(self._escape) for unit, name in layout['currencies'].items()}
+        self._names: Dict[str, str] = {}
+        self._date: Tuple[int, str] = (-1, '')
+
+    def date(self) -> str:
+        """The current date line (minute resolution); Jalali in Persian"""
+        minute = int(time.time() // 60)
+        if self._date[0] != minute:
+            now = get_jalali_date() if self.language == 'fa' else datetime.now().strftime('%H:%M - %d %b %Y')
+            self._date = (minute, now)
+        return self._date[1]
+
+    def fill(self, source: str, **values) -> str:
+        """A one-off message in this template's format: `source` marks bold text with <b>...</b>,
+        and both its literal text and every value are escaped"""
+        compiled, fields = compile_part(source, self.format)
+        return compiled.format(**{
+            name: str(value).translate(self._bold_escape if fields.get(name) else self._escape)
+            for name, value in values.items()
+        })
+
+    def _digits(self, text: str) -> str:
+        return text.translate(PERSIAN_DIGITS) if self.persian_digits else text
+
+    def _number(self, text: str) -> str:
+        text = self._digits(text)
+        return text.translate(self._number_escape) if self._number_escape else text
+
+    def _name(self, instrument: Instrument) -> str:
+        name = self._names.get(instrument.key)
+        if name is None:
+            name = instrument.name if self.language == 'fa' else instrument.name_en
+            name = self._names[instrument.key] = name.translate(self._name_escape)
+        return name
+
+    def render(
+            self,
+            instruments: Dict[str, Instrument],
+            snapshot: Dict[str, Quote],
+            formatter: PriceFormatter,
+            date: str,
+            as_of: Optional[float] = None,
+            keys: Optional[Iterable[str]] = None
+    ) -> str:
+        lines = [self._header.format(date=self._digits(date).translate(self._escape))]
+        if as_of is not None:
+            lines.append(self._stale.format(time=self._number(get_time_of_day(as_of))))
+        lines.append(self._divider)
+
+        number = self._number
+        for key, instrument in instruments.items():
+            if keys is not None and key not in keys:
+                continue
+            quote = snapshot.get(key)
+            if not quote:
+                continue
+            price, percent, amount, _ = formatter.format_quote(quote, instrument.toman)
+            currency = self._currencies['usd' if not quote.is_rial else 'toman' if instrument.toman else 'rial']
+            lines.append(self._row.format(
+                emoji=TREND_EMOJI.get(quote.trend, NEUTRAL_EMOJI),
+                name=self._name(instrument),
+                price=number(price),
+                percent=number(percent),
+                amount=number(amount),
+                currency=currency
+            ))
+        return "\n".join(lines)
+
+
+class MessageTemplates:
+    """Compiled price-message templates per chat, with memoized renders
+
+    Every style in use is compiled at construction, so a bad CHANNEL_STYLES
+    entry fails at startup. A render is reused while the snapshot's quotes,
+    the date line and the options are unchanged, so a tick fanned out to many
+    chats renders each style once.
+    """
+
+    def __init__(
+            self,
+            instruments: Dict[str, Instrument],
+            default: str = DEFAULT_STYLE,
+            channels: Optional[Dict[str, str]] = None,
+            formatter: Optional[PriceFormatter] = None,
+            max_entries: int = 64
+    ):
+        self.instruments = instruments
+        self.formatter = formatter or PriceFormatter()
+        self.max_entries = max_entries
+        self._templates: Dict[str, MessageTemplate] = {}
+        self.default = self.template(default)
+        self._channels = {str(chat_id): self.template(spec) for chat_id, spec in (channels or {}).items()}
+        self._memo: 'OrderedDict[Tuple, Tuple[Dict[str, Quote], str]]' = OrderedDict()
+
+        self.stats: Dict[str, int] = {'rendered': 0, 'memoized': 0}
+
+    def template(self, spec: Optional[str] = None) -> MessageTemplate:
+        """The compiled template of a style, compiling it on first use"""
+        if spec is None:
+            return self.default
+        spec = normalize_style(spec)
+        template = self._templates.get(spec)
+        if template is None:
+            template = self._templates[spec] = MessageTemplate(spec)
+        return template
+
+    def template_for(self, chat_id) -> MessageTemplate:
+        return self._channels.get(str(chat_id), self.default)
+
+    def group(self, chat_ids: Iterable) -> Dict[str, List]:
+        """Chats by the style they receive: {style: [chat_id]}"""
+        groups: Dict[str, List] = {}
+        for chat_id in chat_ids:
+            groups.setdefault(self.template_for(chat_id).spec, []).append(chat_id)
+        return groups
+
+    def render(
+            self,
+            snapshot: Dict[str, Quote],
+            style: Optional[str] = None,
+            as_of: Optional[float] = None,
+            keys: Optional[Iterable[str]] = None
+    ) -> str:
+        template = self.template(style)
+        keys = tuple(keys) if keys is not None else None
+        date = template.date()
+        memo_key = (template.spec, date, get_time_of_day(as_of) if as_of is not None else None, keys)
+
+        entry = self._memo.get(memo_key)
+        # Quote equality ignores provenance, so a re-fetched but unchanged snapshot still hits
+        if entry is not None and (entry[0] is snapshot or entry[0] == snapshot):
+            self._memo.move_to_end(memo_key)
+            self.stats['memoized'] += 1
+            return entry[1]
+
+        text = template.render(self.instruments, snapshot, self.formatter, date, as_of, keys)
+        self.stats['rendered'] += 1
+        self._memo[memo_key] = (snapshot, text)
+        self._memo.move_to_end(memo_key)
+        while len(self._memo) > self.max_entries:
+            self._memo.popitem(last=False)
+        return text
+
+    def metrics(self) -> Dict:
+        return {**self.stats, 'styles': sorted(self._templates), 'memo_entries': len(self._memo)}
+
+
+class PriceMessage:
+    """A snapshot queued for publishing, rendered per chat style on delivery"""
+
+    __slots__ = ('templates', 'snapshot', 'as_of')
+
+    def __init__(self, templates: MessageTemplates, snapshot: Dict[str, Quote], as_of: Optional[float] = None):
+        self.templates = templates
+        self.snapshot = snapshot
+        self.as_of = as_of
+
+    def text(self, style: Optional[str] = None) -> str:
+        return self.templates.render(self.snapshot, style, as_of=self.as_of)
+
+    def __str__(self) -> str:
+        return self.text()
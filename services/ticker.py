@@ -0,0 +1,109 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+from telegram import Bot
+from telegram.error import BadRequest
+from services.subscriptions import ChatId
+
+logger = logging.getLogger(__name__)
+
+
+def text_fingerprint(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class LiveTicker:
+    """Keeps one pinned message per chat up to date by editing it in place"""
+
+    def __init__(
+            self,
+            bot: Bot,
+            path: Union[str, Path],
+            fingerprint: Callable[[str], str] = text_fingerprint,
+            parse_mode: Optional[str] = 'Markdown',
+            pin: bool = True,
+            timeout: float = 30
+    ):
+        self.bot = bot
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        self.parse_mode = parse_mode
+        self.pin = pin
+        self.timeout = timeout
+
+        # str(chat_id) -> {'message_id': int, 'fingerprint': str}
+        self._messages: Dict[str, Dict] = {}
+        self.stats: Dict[str, int] = {'skipped': 0, 'edited': 0, 'posted': 0}
+        self._load()
+
+    async def update(self, chat_id: ChatId, text: str, parse_mode: Optional[str] = None) -> str:
+        """Show `text` in the chat's ticker message; returns 'skipped', 'edited' or 'posted'"""
+        parse_mode = parse_mode or self.parse_mode
+        fingerprint = self.fingerprint(text)
+        current = self._messages.get(str(chat_id))
+
+        if current is not None:
+            if current['fingerprint'] == fingerprint:
+                return self._count('skipped')
+            try:
+                await self.bot.edit_message_text(
+                    text,
+                    chat_id=chat_id,
+                    message_id=current['message_id'],
+                    parse_mode=parse_mode,
+                    read_timeout=self.timeout,
+                    write_timeout=self.timeout
+                )
+                self._remember(chat_id, current['message_id'], fingerprint)
+                return self._count('edited')
+            except BadRequest as e:
+                if 'not modified' in e.message.lower():
+                    self._remember(chat_id, current['message_id'], fingerprint)
+                    return self._count('skipped')
+                if 'not found' not in e.message.lower():
+                    raise
+                logger.warning(f"Ticker message in {chat_id} is gone, posting a new one")
+
+        message = await self.bot.send_message(
+            chat_id=chat_id,
+            text=text,
+            parse_mode=parse_mode,
+            read_timeout=self.timeout,
+            write_timeout=self.timeout
+        )
+        self._remember(chat_id, message.message_id, fingerprint)
+        if self.pin:
+            await self._pin(chat_id, message.message_id)
+        return self._count('posted')
+
+    async def _pin(self, chat_id: ChatId, message_id: int):
+        try:
+            await self.bot.pin_chat_message(chat_id=chat_id, message_id=message_id, disable_notification=True)
+        except BadRequest as e:
+            # Missing pin rights should not stop the ticker from working
+            logger.warning(f"Could not pin ticker message in {chat_id}: {e}")
+
+    def _count(self, outcome: str) -> str:
+        self.stats[outcome] += 1
+        return outcome
+
+    def _remember(self, chat_id: ChatId, message_id: int, fingerprint: str):
+        self._messages[str(chat_id)] = {'message_id': message_id, 'fingerprint': fingerprint}
+        self._save()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            self._messages = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load ticker state from {self.path}: {e}")
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        tmp_path.write_text(json.dumps(self._messages), encoding='utf-8')
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,92 @@
+import hmac
+import json
+import logging
+from typing import TYPE_CHECKING, Dict, Optional
+from telegram import Update
+from telegram.ext import Application
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookServer:
+    """Receives Telegram updates over HTTP (aiohttp) and feeds them to the application's update queue
+
+    Telegram sends the secret configured with setWebhook in the
+    X-Telegram-Bot-Api-Secret-Token header; requests without it are refused.
+    TLS is expected to be terminated by a reverse proxy in front of this server.
+    """
+
+    SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+    def __init__(
+            self,
+            app: Application,
+            secret_token: str,
+            path: str = '/telegram',
+            host: str = '127.0.0.1',
+            port: int = 8443,
+            max_body: int = 1024 * 1024,
+            shutdown_timeout: float = 10
+    ):
+        if not secret_token:
+            raise ValueError("A webhook needs a secret token")
+        self.app = app
+        self.secret_token = secret_token
+        self.path = path if path.startswith('/') else f"/{path}"
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self.shutdown_timeout = shutdown_timeout
+
+        self._runner: Optional['web.AppRunner'] = None
+        self.stats: Dict[str, int] = {'accepted': 0, 'rejected': 0}
+
+    async def start(self):
+        # Only webhook mode needs aiohttp; polling processes never import it
+        from aiohttp import web
+
+        @web.middleware
+        async def count(request: web.Request, handler) -> web.StreamResponse:
+            try:
+                response = await handler(request)
+            except web.HTTPException:
+                self.stats['rejected'] += 1
+                raise
+            self.stats['accepted' if response.status == 200 else 'rejected'] += 1
+            return response
+
+        http_app = web.Application(client_max_size=self.max_body, middlewares=[count])
+        http_app.router.add_post(self.path, self._handle)
+        self._runner = web.AppRunner(http_app, access_log=None, shutdown_timeout=self.shutdown_timeout)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.port = self._runner.addresses[0][1]
+        logger.info(f"Webhook listening on http://{self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        """Stop accepting connections and let requests already being handled finish"""
+        if self._runner is None:
+            return
+        await self._runner.cleanup()
+        self._runner = None
+        logger.info(f"Webhook stopped (stats: {self.stats})")
+
+    async def _handle(self, request: 'web.Request') -> 'web.Response':
+        from aiohttp import web
+
+        token = request.headers.get(self.SECRET_HEADER, '').encode('utf-8', 'surrogateescape')
+        if not hmac.compare_digest(token, self.secret_token.encode('utf-8')):
+            logger.warning("Webhook request with a wrong secret token refused")
+            raise web.HTTPForbidden()
+        try:
+            update = Update.de_json(json.loads(await request.read()), self.app.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            logger.debug(f"Malformed webhook request: {type(e).__name__} - {e}")
+            raise web.HTTPBadRequest()
+        if update is None:
+            raise web.HTTPBadRequest()
+        await self.app.update_queue.put(update)
+        return web.Response()
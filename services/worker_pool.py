@@ -0,0 +1,252 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from services.instruments import Instrument
+from services.metrics import STAGE_SECONDS, record_failure
+from services.quote import Quote
+
+logger = logging.getLogger(__name__)
+
+# How often a waiting supervisor checks that its worker is still alive
+_LIVENESS_INTERVAL = 0.5
+
+
+class WorkerDied(Exception):
+    """A scraper worker exited while it owned a job"""
+
+
+def tree_rss_kib(pid: int) -> Optional[int]:
+    """Resident memory of a process and all its descendants (e.g. Chromium), from /proc; None off Linux"""
+    proc = Path('/proc')
+    if not proc.is_dir():
+        return None
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            for line in (proc / str(current) / 'status').read_text().splitlines():
+                if line.startswith('VmRSS:'):
+                    total += int(line.split()[1])
+                    break
+            for task in (proc / str(current) / 'task').iterdir():
+                children = (task / 'children').read_text().split()
+                pending.extend(int(child) for child in children)
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+def _worker_main(options: Dict, inbox, outbox):
+    """Entry point of a worker process: serve fetch jobs until told to stop"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(processName)s - %(levelname)s - %(message)s')
+    asyncio.run(_serve(options, inbox, outbox))
+
+
+async def _serve(options: Dict, inbox, outbox):
+    # Playwright, BeautifulSoup and Chromium are only ever loaded here, in the worker
+    from services.browser import BrowserManager
+    from services.scraper import TgjuScraper
+
+    options = dict(options)
+    instruments = {item['key']: Instrument.from_dict(item) for item in options.pop('instruments')}
+    url = options.pop('url', None)
+    scraper = TgjuScraper(BrowserManager(pool_size=options.pop('browser_pool_size', 1)),
+                          instruments=instruments, **options)
+    if url:
+        scraper.URL = url
+
+    loop = asyncio.get_running_loop()
+    try:
+        try:
+            await scraper.warm_up()
+        except Exception as e:
+            logger.warning(f"Scraper warm-up failed: {type(e).__name__} - {e}")
+        while True:
+            job_id = await loop.run_in_executor(None, inbox.get)
+            if job_id is None:
+                break
+            data = await scraper.get_tgju_data()
+            outbox.put((job_id, data, tree_rss_kib(os.getpid())))
+    finally:
+        await scraper.close()
+
+
+class _Worker:
+    """One scraper process and its job/result queues"""
+
+    def __init__(self, context, options: Dict, name: str):
+        self.name = name
+        self.inbox = context.Queue()
+        self.outbox = context.Queue()
+        self.process = context.Process(target=_worker_main, args=(options, self.inbox, self.outbox),
+                                       name=name, daemon=True)
+        self.process.start()
+        self.fetches = 0
+        self.rss_kib: Optional[int] = None
+
+    def wait(self, job_id: int, timeout: float) -> Tuple[Optional[Dict[str, Quote]], Optional[int]]:
+        """Block (on a helper thread) until the worker answers `job_id`; raises queue.Empty or WorkerDied"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise queue.Empty
+            try:
+                answered, data, rss_kib = self.outbox.get(timeout=min(_LIVENESS_INTERVAL, remaining))
+            except queue.Empty:
+                if not self.process.is_alive():
+                    raise WorkerDied(f"{self.name} exited with code {self.process.exitcode}")
+                continue
+            if answered == job_id:
+                return data, rss_kib
+
+    def retire(self, timeout: float = 10):
+        """Ask the worker to finish and close its browser; kill it if it does not"""
+        if self.process.is_alive():
+            self.inbox.put(None)
+            self.process.join(timeout)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        for q in (self.inbox, self.outbox):
+            q.close()
+            q.cancel_join_thread()
+
+
+class ScraperPool:
+    """Supervised worker processes running TgjuScraper, so scraping never blocks the bot's event loop
+
+    Drop-in for TgjuScraper behind TgjuSource: `get_tgju_data` hands the job to an
+    idle worker over its queue. A worker that misses `timeout` or dies is killed
+    and replaced; one that has served `max_fetches` jobs or grown past
+    `memory_limit_mb` (including its Chromium children) is recycled.
+    """
+
+    def __init__(
+            self,
+            options: Dict,
+            instruments: Dict[str, Instrument],
+            workers: int = 1,
+            timeout: float = 90,
+            max_fetches: int = 100,
+            memory_limit_mb: int = 1024
+    ):
+        self.options = {**options, 'instruments': [instrument.as_dict() for instrument in instruments.values()]}
+        self.size = max(1, workers)
+        self.timeout = timeout
+        self.max_fetches = max_fetches
+        self.memory_limit_kib = memory_limit_mb * 1024 if memory_limit_mb else None
+
+        self._context = multiprocessing.get_context('spawn')
+        self._names = itertools.count(1)
+        self._jobs = itertools.count(1)
+        self._workers: Dict[str, _Worker] = {}
+        self._idle: Optional[asyncio.Queue] = None
+        # Threads that block on worker queues; one per worker is enough
+        self._waiters = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='scraper-pool')
+
+        self.stats: Dict[str, int] = {'fetches': 0, 'timeouts': 0, 'crashed': 0, 'recycled': 0, 'started': 0}
+
+    async def get_tgju_data(self) -> Optional[Dict[str, Quote]]:
+        self._ensure_started()
+        worker = await self._idle.get()
+        job_id = next(self._jobs)
+        started = time.perf_counter()
+        worker.inbox.put(job_id)
+        waiting = asyncio.get_running_loop().run_in_executor(self._waiters, worker.wait, job_id, self.timeout)
+        try:
+            await asyncio.shield(waiting)
+        except asyncio.CancelledError:
+            # The worker is still busy with the job; it rejoins the pool once it answers or times out
+            waiting.add_done_callback(lambda _: asyncio.ensure_future(self._settle(worker, waiting)))
+            raise
+        except (queue.Empty, WorkerDied):
+            pass
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage='worker_fetch')
+        return await self._settle(worker, waiting)
+
+    async def _settle(self, worker: _Worker, waiting: asyncio.Future) -> Optional[Dict[str, Quote]]:
+        """Put the worker back in rotation, or replace it, depending on how its job ended"""
+        if self._idle is None:
+            return None  # the pool was closed meanwhile
+        try:
+            data, worker.rss_kib = waiting.result()
+        except queue.Empty:
+            self.stats['timeouts'] += 1
+            record_failure('scrape_worker', TimeoutError())
+            logger.error(f"Scraper worker {worker.name} missed the {self.timeout}s deadline, replacing it")
+            await self._replace(worker)
+            return None
+        except WorkerDied as e:
+            self.stats['crashed'] += 1
+            record_failure('scrape_worker', e)
+            logger.error(f"{e}, replacing it")
+            await self._replace(worker)
+            return None
+
+        self.stats['fetches'] += 1
+        worker.fetches += 1
+        if worker.fetches >= self.max_fetches:
+            logger.info(f"Recycling scraper worker {worker.name} after {worker.fetches} fetches")
+            self._recycle(worker)
+        elif self.memory_limit_kib and worker.rss_kib and worker.rss_kib > self.memory_limit_kib:
+            logger.warning(f"Recycling scraper worker {worker.name}: {worker.rss_kib // 1024} MiB resident")
+            self._recycle(worker)
+        else:
+            self._idle.put_nowait(worker)
+        return data
+
+    async def warm_up(self):
+        """Spawn the workers now; each one warms its scraper before taking the first job"""
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            self._idle.put_nowait(self._spawn())
+        logger.info(f"Started {self.size} scraper workers")
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._context, self.options, f"scraper-{next(self._names)}")
+        self._workers[worker.name] = worker
+        self.stats['started'] += 1
+        return worker
+
+    async def _replace(self, worker: _Worker):
+        """Kill a hung or dead worker and put a fresh one in its place"""
+        self._workers.pop(worker.name, None)
+        await asyncio.get_running_loop().run_in_executor(None, worker.kill)
+        if self._idle is not None:
+            self._idle.put_nowait(self._spawn())
+
+    def _recycle(self, worker: _Worker):
+        """Swap a healthy worker for a fresh one; the old one finishes closing its browser in the background"""
+        self.stats['recycled'] += 1
+        self._workers.pop(worker.name, None)
+        self._idle.put_nowait(self._spawn())
+        asyncio.get_running_loop().run_in_executor(None, worker.retire)
+
+    def metrics(self) -> Dict:
+        return {
+            **self.stats,
+            'workers': {name: {'fetches': w.fetches, 'rss_kib': w.rss_kib} for name, w in self._workers.items()},
+        }
+
+    async def close(self):
+        workers, self._workers = list(self._workers.values()), {}
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(None, worker.retire) for worker in workers))
+        self._waiters.shutdown(wait=False)
+        self._idle = None
@@ -0,0 +1,139 @@
+"""A minimal local stand-in for the Telegram Bot API, for tests and benchmarks"""
+import asyncio
+import json
+import time
+from typing import Dict, List
+from urllib.parse import parse_qsl
+
+
+class FakeBotApi:
+    """Answers getMe, getUpdates, sendMessage, editMessageText and pinChatMessage; can inject flood-control errors"""
+
+    def __init__(self, retry_after: int = 0, flood_every: int = 0, latency: float = 0):
+        self.retry_after = retry_after
+        self.flood_every = flood_every
+        self.latency = latency
+        self.requests: List[Dict] = []
+        self.sent: List[Dict] = []
+        self.port = None
+        self._server = None
+        self._message_id = 0
+        self.messages: Dict[int, Dict] = {}
+        self.edits: List[Dict] = []
+        self._handlers = set()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/bot"
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._server.close()
+        # Long polls held open by getUpdates would outlive the event loop
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode('latin-1').strip()
+                    if not line:
+                        break
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                path = request_line.decode('latin-1').split()[1]
+                status, payload = await self._dispatch(path.rsplit('/', 1)[-1], headers, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+            self._handlers.discard(task)
+
+    async def _dispatch(self, method: str, headers: Dict, body: bytes):
+        params = self._parse_body(headers, body)
+        self.requests.append({'method': method, 'params': params})
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == 'getMe':
+            return 200, {'ok': True, 'result': {
+                'id': 1, 'is_bot': True, 'first_name': 'FakeBot', 'username': 'fake_bot'
+            }}
+
+        if method == 'getUpdates':
+            # No updates ever arrive; hold the long poll briefly so pollers do not spin
+            await asyncio.sleep(min(float(params.get('timeout') or 0), 1))
+            return 200, {'ok': True, 'result': []}
+
+        if method in ('deleteWebhook', 'setWebhook'):
+            return 200, {'ok': True, 'result': True}
+
+        if self.flood_every and len(self.requests) % self.flood_every == 0:
+            return 429, {
+                'ok': False, 'error_code': 429,
+                'description': f'Too Many Requests: retry after {self.retry_after}',
+                'parameters': {'retry_after': self.retry_after}
+            }
+
+        if method == 'pinChatMessage':
+            return 200, {'ok': True, 'result': True}
+
+        if method == 'editMessageText':
+            message = self.messages.get(int(params.get('message_id', 0)))
+            if message is None:
+                return self._bad_request('message to edit not found')
+            if message['text'] == params.get('text'):
+                return self._bad_request('message is not modified')
+            message['text'] = params.get('text')
+            self.edits.append(params)
+            return 200, {'ok': True, 'result': message}
+
+        self._message_id += 1
+        chat_id = params.get('chat_id')
+        message = {
+            'message_id': self._message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(chat_id) if str(chat_id).lstrip('-').isdigit() else -100, 'type': 'private'},
+            'text': params.get('text', '')
+        }
+        if method == 'sendMessage':
+            self.sent.append(params)
+            self.messages[self._message_id] = message
+        return 200, {'ok': True, 'result': message}
+
+    def delete_message(self, message_id: int):
+        self.messages.pop(message_id, None)
+
+    @staticmethod
+    def _bad_request(description: str):
+        return 400, {'ok': False, 'error_code': 400, 'description': f'Bad Request: {description}'}
+
+    @staticmethod
+    def _parse_body(headers: Dict, body: bytes) -> Dict:
+        content_type = headers.get('content-type', '')
+        if 'json' in content_type:
+            return json.loads(body or b'{}')
+        if 'x-www-form-urlencoded' in content_type:
+            return dict(parse_qsl(body.decode()))
+        return {}
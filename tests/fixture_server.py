@@ -0,0 +1,69 @@
+"""A local HTTP server that plays back the synthetic tgju pages in tests/fixtures, for tests and benchmarks"""
+import asyncio
+from pathlib import Path
+from typing import Dict, List, Optional
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+# Layout name -> synthetic home page (hand-written, not recorded; see fixtures/README.md)
+LAYOUTS = {
+    'current': FIXTURES / "tgju_home.html",
+    'alternate': FIXTURES / "tgju_home_alternate.html",
+}
+
+
+class FixtureServer:
+    """Serves one fixture page for every path (tgju's sub-pages share the home page markup)"""
+
+    def __init__(self, layout: str = 'current', latency: float = 0, pages: Optional[Dict[str, str]] = None):
+        self.html = LAYOUTS[layout].read_text(encoding='utf-8').encode('utf-8')
+        self.latency = latency
+        self.pages = {path: html.encode('utf-8') for path, html in (pages or {}).items()}
+        self.requests: List[str] = []
+        self.port = None
+        self._server = None
+        self._handlers = set()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._server.close()
+        # Requests still sleeping out `latency` would outlive the test's event loop
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()).strip():
+                    pass
+
+                path = request_line.decode('latin-1').split()[1].split('?')[0]
+                self.requests.append(path)
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                body = self.pages.get(path, self.html)
+                writer.write(
+                    f"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            self._handlers.discard(task)
@@ -0,0 +1,83 @@
+import json
+from decimal import Decimal
+from services.alerts import AlertEngine
+from services.quote import Quote
+
+
+def snapshot(price, key='dollar'):
+    return {key: Quote(key, 'دلار', price)}
+
+
+def fired_ids(alerts):
+    return sorted(alert.rule.id for alert in alerts)
+
+
+def test_level_crossing_fires_in_the_right_direction():
+    engine = AlertEngine()
+    above = engine.add_rule(1, 'dollar', 'above', 650_000)
+    below = engine.add_rule(2, 'dollar', 'below', 600_000)
+
+    assert engine.evaluate(snapshot(640_000), 0) == []
+    assert fired_ids(engine.evaluate(snapshot(650_000), 60)) == [above.id]
+    assert engine.evaluate(snapshot(655_000), 120) == []
+    assert fired_ids(engine.evaluate(snapshot(590_000), 180)) == [below.id]
+
+
+def test_move_rules_use_consecutive_snapshots():
+    engine = AlertEngine()
+    absolute = engine.add_rule(1, 'dollar', 'move_abs', 10_000)
+    percent = engine.add_rule(1, 'dollar', 'move_pct', 2)
+    other = engine.add_rule(1, 'ons', 'move_pct', 0.1)
+
+    engine.evaluate(snapshot(600_000), 0)
+    assert fired_ids(engine.evaluate(snapshot(611_000), 60)) == [absolute.id]
+    alerts = engine.evaluate(snapshot(595_000), 120)
+    assert fired_ids(alerts) == [absolute.id, percent.id]
+    assert alerts[0].move == Decimal(-16_000)
+    assert other.id not in fired_ids(alerts)
+
+
+def test_spike_within_window_fires_once():
+    engine = AlertEngine()
+    spike = engine.add_rule(1, 'dollar', 'spike', 3, window=3600)
+
+    engine.evaluate(snapshot(600_000), 0)
+    engine.evaluate(snapshot(610_000), 600)
+    assert fired_ids(engine.evaluate(snapshot(620_000), 1200)) == [spike.id]
+    assert engine.evaluate(snapshot(625_000), 1800) == []
+
+
+def test_rules_are_persisted(tmp_path):
+    path = tmp_path / 'alerts.json'
+    engine = AlertEngine(path)
+    rule = engine.add_rule(7, 'gold', 'above', 150_000_000)
+    engine.add_rule(8, 'gold', 'below', 1)
+
+    reloaded = AlertEngine(path)
+    assert [r.as_dict() for r in reloaded.rules_for_chat(7)] == [rule.as_dict()]
+    assert not reloaded.remove_rule(rule.id, chat_id=8)
+    assert reloaded.remove_rule(rule.id, chat_id=7)
+    assert reloaded.add_rule(7, 'gold', 'above', 1).id == 3
+    assert len(AlertEngine(path).rules) == 2
+
+
+def test_invalid_rules_on_disk_are_skipped(tmp_path):
+    path = tmp_path / 'alerts.json'
+    engine = AlertEngine(path)
+    engine.add_rule(7, 'gold', 'above', 150_000_000)
+    rules = json.loads(path.read_text(encoding='utf-8'))
+    rules += [
+        {'id': 2, 'chat_id': 7, 'instrument': 'gold', 'kind': 'above'},
+        {'id': 3, 'chat_id': 7, 'instrument': 'gold', 'kind': 'sideways', 'value': '1'},
+        {'id': 4, 'chat_id': 7, 'instrument': 'gold', 'kind': 'below', 'value': 'lots'},
+        {'id': 5, 'chat_id': 7, 'instrument': 'gold', 'kind': 'spike', 'value': '3', 'window': None},
+        'not a rule',
+    ]
+    path.write_text(json.dumps(rules), encoding='utf-8')
+
+    reloaded = AlertEngine(path)
+    assert list(reloaded.rules) == [1]
+    assert reloaded.add_rule(7, 'gold', 'below', 1).id == 2
+
+    path.write_text('{"id": 1}', encoding='utf-8')
+    assert AlertEngine(path).rules == {}
@@ -0,0 +1,192 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from services.browser import BrowserManager
+
+
+class _FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeContext:
+    def __init__(self):
+        self.pages = []
+        self.routes = []
+
+    async def new_page(self):
+        page = _FakePage()
+        self.pages.append(page)
+        return page
+
+    async def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+    async def close(self):
+        pass
+
+
+class _FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+        self.listeners = {}
+        self.contexts = []
+
+    def on(self, event, callback):
+        self.listeners[event] = callback
+
+    def is_connected(self):
+        return self.connected
+
+    def crash(self):
+        self.connected = False
+        self.listeners['disconnected'](self)
+
+    async def new_context(self):
+        context = _FakeContext()
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakePlaywright:
+    """Stands in for async_playwright(): every launch hands out a new fake browser"""
+
+    def __init__(self):
+        self.browsers = []
+        self.chromium = self
+
+    def __call__(self):
+        return self
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+    async def launch(self, headless=True):
+        await asyncio.sleep(0)
+        browser = _FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+
+@pytest.fixture
+def playwright(monkeypatch):
+    fake = _FakePlaywright()
+    monkeypatch.setattr('playwright.async_api.async_playwright', fake)
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_pages_are_reused_from_the_pool(playwright):
+    manager = BrowserManager(pool_size=2)
+    async with manager.page() as first:
+        pass
+    async with manager.page() as second:
+        pass
+
+    assert second is first
+    assert manager.stats == {'launches': 1, 'reuses': 1, 'restarts': 0}
+    assert len(playwright.browsers) == 1
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_borrowers_share_one_launch(playwright):
+    manager = BrowserManager(pool_size=3)
+    borrowed, all_in = [], asyncio.Event()
+
+    async def borrow():
+        async with manager.page() as page:
+            borrowed.append(page)
+            if len(borrowed) == 3:
+                all_in.set()
+            await all_in.wait()
+
+    await asyncio.wait_for(asyncio.gather(*(borrow() for _ in range(3))), 5)
+    assert manager.stats['launches'] == 1
+    assert len(playwright.browsers[0].contexts[0].pages) == 3
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_unhealthy_browser_is_restarted_exactly_once(playwright):
+    manager = BrowserManager()
+    async with manager.page():
+        pass
+    playwright.browsers[0].crash()
+    assert not manager.is_healthy()
+
+    for _ in range(3):
+        async with manager.page() as page:
+            pass
+
+    assert manager.stats == {'launches': 2, 'reuses': 2, 'restarts': 1}
+    assert playwright.browsers[0].closed
+    assert page in playwright.browsers[1].contexts[0].pages
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_page_is_closed_not_returned_to_the_pool(playwright):
+    manager = BrowserManager()
+    with pytest.raises(RuntimeError):
+        async with manager.page() as broken:
+            raise RuntimeError('navigation failed')
+    async with manager.page() as page:
+        pass
+
+    assert broken.closed and page is not broken
+    assert manager.stats['reuses'] == 0
+    await manager.close()
+
+
+class _FakeRoute:
+    def __init__(self, resource_type, url):
+        self.request = SimpleNamespace(resource_type=resource_type, url=url)
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = 'aborted'
+
+    async def continue_(self):
+        self.outcome = 'continued'
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('resource_type, url, outcome', [
+    *((kind, 'https://www.tgju.org/static/asset', 'aborted') for kind in sorted(BrowserManager.BLOCKED_RESOURCE_TYPES)),
+    *(('script', f'https://{host}/tag.js', 'aborted') for host in BrowserManager.BLOCKED_HOSTS),
+    ('script', 'https://www.googletagmanager.com/gtm.js', 'aborted'),
+    ('document', 'https://www.tgju.org/', 'continued'),
+    ('script', 'https://www.tgju.org/app.js', 'continued'),
+    ('xhr', 'https://api.tgju.org/v1/market', 'continued'),
+    ('script', 'https://notgoogle-analytics.com/x.js', 'continued'),
+])
+async def test_filter_request_blocks_only_what_prices_do_not_need(resource_type, url, outcome):
+    route = _FakeRoute(resource_type, url)
+    await BrowserManager()._filter_request(route)
+    assert route.outcome == outcome
+
+
+@pytest.mark.asyncio
+async def test_request_filter_is_installed_only_when_blocking(playwright):
+    blocking, plain = BrowserManager(), BrowserManager(block_resources=False)
+    await blocking.start()
+    await plain.start()
+
+    assert playwright.browsers[0].contexts[0].routes == [('**/*', blocking._filter_request)]
+    assert playwright.browsers[1].contexts[0].routes == []
+    await blocking.close()
+    await plain.close()
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from services.cache import SnapshotCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_serves_fresh_snapshot_until_ttl_expires():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return {'dollar': {'price': str(len(calls))}}
+
+    clock = FakeClock()
+    cache = SnapshotCache(fetch, ttl=60, clock=clock)
+
+    assert (await cache.get())['dollar']['price'] == '1'
+    clock.now += 30
+    assert (await cache.get())['dollar']['price'] == '1'
+    clock.now += 31
+    assert (await cache.get())['dollar']['price'] == '2'
+    assert cache.stats == {'hits': 1, 'misses': 2, 'coalesced': 0, 'failures': 0}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_fetch():
+    calls = []
+    release = asyncio.Event()
+
+    async def fetch():
+        calls.append(1)
+        await release.wait()
+        return {'dollar': {}}
+
+    cache = SnapshotCache(fetch, ttl=60)
+    waiters = [asyncio.ensure_future(cache.get()) for _ in range(10)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert len(calls) == 1
+    assert all(result == {'dollar': {}} for result in results)
+    assert cache.stats['misses'] == 1
+    assert cache.stats['coalesced'] == 9
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_keeps_previous_snapshot():
+    results = iter([{'dollar': {}}, None])
+
+    async def fetch():
+        return next(results)
+
+    cache = SnapshotCache(fetch, ttl=0)
+    await cache.get()
+    assert await cache.get() is None
+    assert cache.peek() == {'dollar': {}}
+    assert cache.stats['failures'] == 1
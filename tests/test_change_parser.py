@@ -0,0 +1,37 @@
+import pytest
+from decimal import Decimal
+from services.change_parser import parse_change, parse_change_text, parse_changes
+from services.formatter import PriceFormatter
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('(1.37%) 8,520', ('1.37%', '8520')),
+    ('8,520 (1.37%)', ('1.37%', '8520')),
+    ('1.37%', ('1.37%', '0')),
+    ('8,520', ('0%', '8520')),
+    ('(0%) 0', ('0%', '0')),
+    ('(0%)', ('0%', '0')),
+    ('  (2.5%)   1,200,000 ', ('2.5%', '1200000')),
+    ('(-0.5%) -300', ('-0.5%', '-300')),
+    ('(۱٫۳۷%) ۸,۵۲۰', ('1.37%', '8520')),
+    ('۸٬۵۲۰ (۱٫۳۷٪)', ('1.37%', '8520')),
+    ('(٠٫١٨%) ٤٫٧٧', ('0.18%', '4.77')),
+    ('(−1.37%) −8,520', ('-1.37%', '-8520')),
+    ('abc', ('0%', '0')),
+    ('', ('0%', '0')),
+    (None, ('0%', '0')),
+])
+def test_parse_change_text(text, expected):
+    assert parse_change_text(text) == expected
+    assert PriceFormatter.extract_change_values(text) == expected
+
+
+def test_parse_change_returns_decimals():
+    assert parse_change('(1.37%) 8,520') == (Decimal('1.37'), Decimal('8520'))
+    assert parse_change('(1.2.3%) 1') == (Decimal(0), Decimal(1))
+
+
+def test_parse_changes_batch():
+    assert parse_changes(['(1%) 10', '2%', None]) == [
+        (Decimal(1), Decimal(10)), (Decimal(2), Decimal(0)), (Decimal(0), Decimal(0))
+    ]
@@ -0,0 +1,69 @@
+import pytest
+from services.charts import ChartRenderer, parse_chart_args, render_chart
+from services.history import PriceHistory
+from services.instruments import CATALOG
+
+pytest.importorskip('matplotlib')
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+START = 1_700_000_000
+
+
+@pytest.fixture
+def history(tmp_path):
+    store = PriceHistory(tmp_path / 'history.sqlite3')
+    store.append_rows(('dollar', START + i * 600, 600_000 + (i % 7) * 1000, None, None, 'neutral')
+                      for i in range(144))
+    store.flush()
+    yield store
+    store.close()
+
+
+def test_parse_chart_args():
+    assert parse_chart_args([]) == ('24h', 'line')
+    assert parse_chart_args(['7d', 'candle']) == ('7d', 'candle')
+    assert parse_chart_args(['CANDLE', '1w']) == ('7d', 'candle')
+    with pytest.raises(ValueError):
+        parse_chart_args(['2y'])
+
+
+@pytest.mark.parametrize('style, series', [
+    ('line', [(START, 10.0), (START + 60, 12.5), (START + 120, 11.0)]),
+    ('candle', [(START, 10, 13, 9, 12), (START + 3600, 12, 12, 8, 9)]),
+])
+def test_render_chart_produces_png(style, series):
+    assert render_chart('DOLLAR - 24h', 'Toman', style, series).startswith(PNG_SIGNATURE)
+
+
+@pytest.mark.asyncio
+async def test_charts_are_cached_until_new_data(history):
+    renderer = ChartRenderer(history)
+    dollar = CATALOG['dollar']
+    try:
+        chart = await renderer.get(dollar, '24h', 'line')
+        assert chart.png.startswith(PNG_SIGNATURE)
+        assert chart.key == ('dollar', '24h', 'line', START + 143 * 600)
+
+        assert await renderer.get(dollar, '24h', 'line') is chart
+        renderer.remember_file_id(chart.key, 'AgAD-file-id')
+        again = await renderer.get(dollar, '24h', 'line')
+        assert again.photo == 'AgAD-file-id' and again.png is None
+
+        # A new data point changes the key and renders a new image
+        history.append_rows([('dollar', START + 144 * 600, 610_000, None, None, 'high')])
+        history.flush()
+        fresh = await renderer.get(dollar, '24h', 'line')
+        assert fresh is not chart and fresh.png.startswith(PNG_SIGNATURE)
+
+        assert renderer.stats['rendered'] == 2
+        assert renderer.stats['cached'] == 1
+        assert renderer.stats['file_id_reused'] == 1
+    finally:
+        renderer.close()
+
+
+@pytest.mark.asyncio
+async def test_no_chart_without_history(history):
+    renderer = ChartRenderer(history)
+    assert await renderer.get(CATALOG['coin']) is None
+    assert renderer.stats['empty'] == 1
@@ -0,0 +1,135 @@
+import multiprocessing
+import time
+from decimal import Decimal
+import pytest
+from services.alerts import AlertEngine
+from services.cache import SnapshotCache
+from services.cluster import FileLeaderLock, LeaderElector, SnapshotFollower, SqliteLeaderLock, create_lock
+from services.quote import Quote
+from services.snapshot_store import SnapshotStore
+from services.subscriptions import SubscriptionStore
+
+BACKENDS = ('file', 'sqlite')
+
+
+def _contend(spec: str, owner: str, hold: float, results):
+    """Worker process: try to lead once, hold the result for `hold` seconds, report"""
+    lock = create_lock(spec, owner, ttl=30)
+    acquired = lock.acquire()
+    results.put((owner, acquired))
+    time.sleep(hold)
+    if acquired:
+        lock.release()
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_exactly_one_process_leads(tmp_path, backend):
+    spec = f"{backend}:{tmp_path / 'leader.lock'}"
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    workers = [context.Process(target=_contend, args=(spec, f"worker-{i}", 2, results)) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    outcomes = [results.get(timeout=30) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=30)
+
+    assert sum(acquired for _, acquired in outcomes) == 1
+    # The leader released the lock on exit, so the next contender gets it
+    assert create_lock(spec, 'next', ttl=30).acquire()
+
+
+def test_file_lock_is_freed_when_the_holder_dies(tmp_path):
+    path = tmp_path / 'leader.lock'
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    holder = context.Process(target=_contend, args=(f"file:{path}", 'holder', 60, results))
+    holder.start()
+    try:
+        assert results.get(timeout=30) == ('holder', True)
+        follower = FileLeaderLock(path, 'follower')
+        assert not follower.acquire()
+    finally:
+        holder.kill()
+        holder.join()
+    assert follower.acquire()
+    assert follower.acquire(), "the holder keeps leading"
+    assert path.read_text() == 'follower'
+
+
+def test_sqlite_lease_is_renewed_and_expires(tmp_path):
+    now = [1000.0]
+    path = tmp_path / 'cluster.sqlite3'
+    first = SqliteLeaderLock(path, 'a', ttl=15, clock=lambda: now[0])
+    second = SqliteLeaderLock(path, 'b', ttl=15, clock=lambda: now[0])
+
+    assert first.acquire()
+    assert not second.acquire()
+    now[0] += 10
+    assert first.acquire()  # renewed until 1025
+    now[0] += 10
+    assert not second.acquire()
+    # The leader stopped renewing
+    now[0] += 20
+    assert second.acquire()
+    assert not first.acquire()
+
+
+@pytest.mark.asyncio
+async def test_elector_reports_leadership_changes(tmp_path):
+    now = [1000.0]
+    path = tmp_path / 'cluster.sqlite3'
+    events = []
+
+    async def elected():
+        events.append('elected')
+
+    async def demoted():
+        events.append('demoted')
+
+    elector = LeaderElector(SqliteLeaderLock(path, 'a', ttl=15, clock=lambda: now[0]), elected, demoted, interval=60)
+    rival = SqliteLeaderLock(path, 'b', ttl=15, clock=lambda: now[0])
+    await elector.start()
+    assert elector.is_leader
+
+    now[0] += 30
+    assert rival.acquire()
+    await elector.check()
+    assert not elector.is_leader
+
+    rival.release()
+    await elector.check()
+    await elector.stop()
+    assert events == ['elected', 'demoted', 'elected', 'demoted']
+    assert rival.acquire()
+
+
+def test_follower_installs_the_leaders_snapshot(tmp_path):
+    path = tmp_path / 'snapshot.json'
+    SnapshotStore(path).save({'dollar': Quote('dollar', 'دلار', 622300, Decimal('0'), Decimal('0'))},
+                             timestamp=time.time() - 30)
+
+    cache = SnapshotCache(fetch=None, ttl=60)
+    follower = SnapshotFollower(SnapshotStore(path), cache)
+    assert follower.poll()
+    assert cache.peek()['dollar'].price == 622300
+    assert 29 <= cache.age < 40
+    # Unchanged file: nothing to reload
+    assert not follower.poll()
+
+
+def test_stores_pick_up_changes_from_other_processes(tmp_path):
+    leader_subscriptions = SubscriptionStore(tmp_path / 'subscribers.json')
+    SubscriptionStore(tmp_path / 'subscribers.json').add(42)
+    assert leader_subscriptions.refresh()
+    assert 42 in leader_subscriptions
+
+    leader_alerts = AlertEngine(tmp_path / 'alerts.json')
+    worker_alerts = AlertEngine(tmp_path / 'alerts.json')
+    rule = worker_alerts.add_rule(42, 'dollar', 'above', 650_000)
+    assert leader_alerts.refresh()
+    alerts = leader_alerts.evaluate({'dollar': Quote('dollar', 'دلار', 640_000)}, timestamp=0)
+    alerts += leader_alerts.evaluate({'dollar': Quote('dollar', 'دلار', 655_000)}, timestamp=1)
+    assert [alert.rule.id for alert in alerts] == [rule.id]
+    # A rule added later by the leader does not reuse the worker's id
+    assert leader_alerts.add_rule(7, 'coin', 'below', 1).id == rule.id + 1
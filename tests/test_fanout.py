@@ -0,0 +1,44 @@
+import pytest
+from telegram import Bot
+from services.fanout import FanoutSender
+from services.subscriptions import SubscriptionStore
+from tests.fake_bot_api import FakeBotApi
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_every_chat_through_bot_api():
+    async with FakeBotApi() as api:
+        async with Bot('123:TEST', base_url=api.base_url) as bot:
+            sender = FanoutSender(
+                lambda chat_id, text: bot.send_message(chat_id=chat_id, text=text),
+                global_rate=1000, concurrency=4
+            )
+            report = await sender.broadcast([1, 2, 3, 2, '@channel'], 'hello')
+
+    assert report['sent'] == 4
+    assert sorted(str(params['chat_id']) for params in api.sent) == ['1', '2', '3', '@channel']
+    assert {params['text'] for params in api.sent} == {'hello'}
+
+
+@pytest.mark.asyncio
+async def test_broadcast_backs_off_on_retry_after():
+    async with FakeBotApi(retry_after=1, flood_every=3) as api:
+        async with Bot('123:TEST', base_url=api.base_url) as bot:
+            sender = FanoutSender(
+                lambda chat_id, text: bot.send_message(chat_id=chat_id, text=text),
+                global_rate=1000, concurrency=2
+            )
+            report = await sender.broadcast([1, 2, 3, 4], 'hello')
+
+    assert report['sent'] == 4
+    assert sender.stats['retry_after'] >= 1
+
+
+def test_subscription_store_persists(tmp_path):
+    path = tmp_path / 'subscribers.json'
+    store = SubscriptionStore(path)
+    assert store.add(42)
+    assert not store.add(42)
+    assert 42 in SubscriptionStore(path)
+    assert store.remove(42)
+    assert len(SubscriptionStore(path)) == 0
@@ -0,0 +1,48 @@
+from decimal import Decimal
+import pytest
+from bot.handlers import _parse_alert_args
+from services.alerts import AlertEngine
+from services.instruments import load_catalog
+
+INSTRUMENTS = load_catalog(['dollar', 'coin', 'ons'])
+DAY = 86400
+
+
+@pytest.mark.parametrize('args, expected', [
+    (['dollar', 'above', '65000'], ('dollar', 'above', 650000, 0)),
+    (['دلار', 'below', '۶۰۰۰۰'], ('dollar', 'below', 600000, 0)),
+    (['ons', 'above', '2700.5'], ('ons', 'above', Decimal('2700.5'), 0)),
+    (['dollar', 'move', '1%'], ('dollar', 'move_pct', 1, 0)),
+    (['dollar', 'move', '500'], ('dollar', 'move_abs', 5000, 0)),
+    (['coin', 'spike', '3%', '30m'], ('coin', 'spike', 3, 1800)),
+    (['coin', 'SPIKE', '3%', '1d'], ('coin', 'spike', 3, DAY)),
+])
+def test_parse_alert_args(args, expected):
+    assert _parse_alert_args(INSTRUMENTS, args, DAY) == expected
+
+
+@pytest.mark.parametrize('args', [
+    ['dollar', 'above'],
+    ['euro', 'above', '1'],
+    ['dollar', 'above', '0'],
+    ['dollar', 'above', 'lots'],
+    ['dollar', 'above', '5%'],
+    ['dollar', 'sideways', '1'],
+    ['coin', 'spike', '3'],
+    ['coin', 'spike', '3%', '1w'],
+    ['coin', 'spike', '3%', '0m'],
+    ['coin', 'spike', '3%', '25h'],
+    ['coin', 'spike', '3%', '30d'],
+])
+def test_invalid_alert_args_are_rejected(args):
+    with pytest.raises(ValueError):
+        _parse_alert_args(INSTRUMENTS, args, DAY)
+
+
+def test_spike_window_is_bounded_by_the_engine_history():
+    engine = AlertEngine(max_window=3600)
+    with pytest.raises(ValueError):
+        _parse_alert_args(INSTRUMENTS, ['coin', 'spike', '3%', '2h'], engine.max_window)
+    with pytest.raises(ValueError):
+        engine.add_rule(1, 'coin', 'spike', 3, window=7200)
+    assert engine.add_rule(1, 'coin', 'spike', 3, window=3600).window == 3600
@@ -0,0 +1,49 @@
+import pytest
+from services.health import CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_opens_after_consecutive_failures_and_recovers_via_probe():
+    clock = FakeClock()
+    probes = []
+
+    async def probe():
+        probes.append(clock.now)
+        return len(probes) > 1
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, probe=probe, clock=clock)
+    breaker.record_failure()
+    assert await breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not await breaker.allow()
+    assert probes == []
+
+    clock.now = 11
+    assert not await breaker.allow()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 22
+    assert await breaker.allow()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.metrics()['transitions'] == {
+        'closed->open': 1, 'open->half_open': 2, 'half_open->open': 1, 'half_open->closed': 1
+    }
+
+
+@pytest.mark.asyncio
+async def test_success_resets_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert await breaker.allow()
@@ -0,0 +1,63 @@
+import sqlite3
+import pytest
+from decimal import Decimal
+from services.history import PriceHistory
+from services.quote import Quote
+
+
+@pytest.fixture
+def history(tmp_path):
+    store = PriceHistory(tmp_path / 'history.sqlite3')
+    yield store
+    store.close()
+
+
+def test_append_buffers_snapshot_until_flush(history):
+    history.append({
+        'dollar': Quote('dollar', 'دلار', 622300, Decimal('8520'), Decimal('1.37'), 'high'),
+        'ons': Quote('ons', 'انس', Decimal('2652.41'), Decimal('4.77'), Decimal('0.18'), 'low', unit='usd')
+    }, timestamp=1_700_000_000)
+    assert history.query('dollar', 0, 2_000_000_000) == []
+    assert history.flush() == 2
+
+    assert history.latest('dollar') == (1_700_000_000, 622300.0)
+    assert history.latest('ons') == (1_700_000_000, 2652.41)
+
+
+def test_ohlc_downsampling(history):
+    prices = [10, 12, 9, 11, 20, 18]
+    history.append_rows(('dollar', 3600 + i * 1200, p, None, None, 'neutral') for i, p in enumerate(prices))
+    history.flush()
+
+    assert history.ohlc('dollar', 0, 10 ** 9, '1h') == [
+        (3600, 10, 12, 9, 9),
+        (7200, 11, 20, 11, 18)
+    ]
+    with pytest.raises(ValueError):
+        history.ohlc('dollar', 0, 1, '5m')
+
+
+def test_failed_flush_keeps_the_rows_for_the_next_one(history):
+    history.append_rows([('dollar', 60, 10, None, None, 'neutral'), ('dollar', 120, 11, None, None, 'neutral')])
+    history.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        history.flush()
+
+    history._conn = sqlite3.connect(str(history.path))
+    history.append_rows([('dollar', 180, 12, None, None, 'neutral')])
+    assert history.flush() == 3
+    assert history.query('dollar', 0, 1000) == [(60, 10.0), (120, 11.0), (180, 12.0)]
+
+
+@pytest.mark.asyncio
+async def test_batch_flushes_are_tracked_and_awaited_on_stop(tmp_path):
+    history = PriceHistory(tmp_path / 'history.sqlite3', batch_size=2, flush_interval=60)
+    history.start()
+    history.append({'dollar': Quote('dollar', 'دلار', 1), 'ons': Quote('ons', 'انس', 2, unit='usd')}, timestamp=60)
+    assert len(history._flushes) == 1
+
+    await history.stop()
+    assert not history._flushes
+    reopened = PriceHistory(tmp_path / 'history.sqlite3')
+    assert reopened.latest('ons') == (60, 2.0)
+    reopened.close()
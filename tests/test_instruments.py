@@ -0,0 +1,32 @@
+import json
+import pytest
+from services.instruments import CATALOG, DEFAULT_KEYS, Instrument, group_by_page, load_catalog
+
+
+def test_default_catalog_keeps_display_order():
+    assert list(load_catalog()) == list(DEFAULT_KEYS)
+    assert load_catalog()['ons'].toman is False
+    assert load_catalog()['dollar'].toman is True
+
+
+def test_unknown_instrument_is_rejected():
+    with pytest.raises(ValueError):
+        load_catalog(['dollar', 'doge'])
+
+
+def test_catalog_file_adds_and_overrides(tmp_path):
+    path = tmp_path / 'instruments.json'
+    path.write_text(json.dumps([
+        {'key': 'cad', 'element_id': 'price_cad', 'name': 'دلار کانادا', 'page': 'currency'},
+        {'key': 'dollar', 'element_id': 'price_dollar_rl', 'name': 'دلار', 'toman': False},
+    ]), encoding='utf-8')
+    catalog = load_catalog(['dollar', 'cad'], path)
+    assert catalog['cad'] == Instrument('cad', 'price_cad', 'دلار کانادا', page='/currency')
+    assert catalog['dollar'].toman is False
+
+
+def test_group_by_page():
+    pages = group_by_page(CATALOG[key] for key in ['eur', 'dollar', 'aed', 'btc'])
+    assert {page: [i.key for i in items] for page, items in pages.items()} == {
+        '/currency': ['eur', 'aed'], '/': ['dollar'], '/crypto': ['btc']
+    }
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import logging
+import pytest
+from services.metrics import Counter, Histogram, MetricsRegistry, MetricsServer
+from utils.logger import TICK_ID, new_tick
+from utils.logger import JsonFormatter, TickFilter
+
+
+def _registry():
+    registry = MetricsRegistry()
+    counter = registry.register(Counter('test_failures_total', 'Failures', ['exception']))
+    histogram = registry.register(Histogram('test_stage_seconds', 'Stage latency', ['stage'], buckets=(0.1, 1)))
+    return registry, counter, histogram
+
+
+def test_text_exposition():
+    registry, counter, histogram = _registry()
+    counter.inc(exception='TimeoutError')
+    counter.inc(2, exception='NetworkError')
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, stage='navigate')
+    registry.gauge('test_queue_size', 'Queue size', lambda: 4)
+
+    text = registry.render()
+    assert '# TYPE test_failures_total counter' in text
+    assert 'test_failures_total{exception="NetworkError"} 2' in text
+    assert 'test_stage_seconds_bucket{stage="navigate",le="0.1"} 2' in text
+    assert 'test_stage_seconds_bucket{stage="navigate",le="1.0"} 3' in text
+    assert 'test_stage_seconds_bucket{stage="navigate",le="+Inf"} 4' in text
+    assert 'test_stage_seconds_count{stage="navigate"} 4' in text
+    assert 'test_stage_seconds_sum{stage="navigate"} 3.65' in text
+    assert 'test_queue_size 4.0' in text
+
+
+def test_wrong_labels_are_rejected():
+    _, counter, _ = _registry()
+    with pytest.raises(ValueError):
+        counter.inc(stage='send')
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    registry, counter, _ = _registry()
+    counter.inc(exception='OSError')
+    server = MetricsServer(registry, port=0)
+    await server.start()
+    try:
+        async def get(path):
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            return response.decode()
+
+        response = await get('/metrics')
+        assert response.startswith('HTTP/1.1 200 OK')
+        assert 'test_failures_total{exception="OSError"} 1' in response
+        assert (await get('/')).startswith('HTTP/1.1 404')
+    finally:
+        await server.stop()
+
+
+def test_json_logs_carry_the_tick_id():
+    tick_id = new_tick()
+    record = logging.LogRecord('bot', logging.INFO, __file__, 1, 'دلار %s', ('622,300',), None)
+    TickFilter().filter(record)
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['tick_id'] == tick_id == TICK_ID.get()
+    assert entry['message'] == 'دلار 622,300'
@@ -0,0 +1,190 @@
+import asyncio
+import pytest
+from services.cache import SnapshotCache
+from services.pipeline import PricePipeline
+
+
+def _pipeline(fetch, deliver, **kwargs):
+    cache = SnapshotCache(fetch, ttl=60)
+    options = dict(poll_interval=3600, scrape_timeout=1, send_timeout=1, send_retries=3)
+    options.update(kwargs)
+    return PricePipeline(cache, render=lambda snapshot: f"price={snapshot['dollar']}", deliver=deliver, **options)
+
+
+@pytest.mark.asyncio
+async def test_publish_renders_and_delivers():
+    delivered = []
+
+    async def fetch():
+        return {'dollar': '622,300'}
+
+    async def deliver(message):
+        delivered.append(message)
+
+    pipeline = _pipeline(fetch, deliver)
+    pipeline.start()
+    try:
+        assert await pipeline.publish()
+        await asyncio.wait_for(pipeline.queue.join(), 1)
+    finally:
+        await pipeline.stop()
+
+    assert delivered == ['price=622,300']
+    assert pipeline.stats['send'].count == 1
+
+
+@pytest.mark.asyncio
+async def test_sender_retries_transient_failures(monkeypatch):
+    attempts = []
+
+    async def fetch():
+        return {'dollar': '1'}
+
+    async def deliver(message):
+        attempts.append(message)
+        if len(attempts) < 3:
+            raise ConnectionError("flaky")
+
+    pipeline = _pipeline(fetch, deliver, retry_on=(ConnectionError,))
+    monkeypatch.setattr(asyncio, 'sleep', _no_sleep(asyncio.sleep))
+    await pipeline._deliver_with_retry('hello')
+    assert len(attempts) == 3
+
+
+@pytest.mark.asyncio
+async def test_slow_scrape_does_not_block_queued_delivery():
+    delivered = asyncio.Event()
+
+    async def fetch():
+        await asyncio.sleep(10)
+
+    async def deliver(message):
+        delivered.set()
+
+    pipeline = _pipeline(fetch, deliver, poll_interval=0)
+    pipeline.start()
+    try:
+        pipeline.enqueue('already prepared')
+        await asyncio.wait_for(delivered.wait(), 0.5)
+    finally:
+        await pipeline.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_scrape_serves_last_good_snapshot_until_max_stale():
+    results = [{'dollar': '622,300'}, None, None]
+
+    async def fetch():
+        return results.pop(0)
+
+    async def deliver(message):
+        pass
+
+    pipeline = _pipeline(
+        fetch, deliver, max_stale=600,
+        render_stale=lambda snapshot, age: f"stale={snapshot['dollar']} age={age:.0f}"
+    )
+    assert await pipeline.publish()
+    pipeline.cache._fetched_at -= 120
+    assert await pipeline.publish()
+    assert pipeline.queue.get_nowait()[-1] == 'price=622,300'
+    assert pipeline.queue.get_nowait()[-1] == 'stale=622,300 age=120'
+
+    pipeline.cache._fetched_at -= 600
+    assert not await pipeline.publish()
+    assert pipeline.stale_served == 1
+
+
+def test_poll_delay_backs_off_after_failures():
+    pipeline = _pipeline(None, None, poll_interval=45, retry_interval=5)
+    delays = []
+    for failures in range(5):
+        pipeline._poll_failures = failures
+        delays.append(pipeline._poll_delay())
+    assert delays == [45, 5, 10, 20, 40]
+    pipeline._poll_failures = 10
+    assert pipeline._poll_delay() == 45
+
+
+def _no_sleep(real_sleep):
+    async def sleep(delay, *args, **kwargs):
+        await real_sleep(0)
+    return sleep
+
+
+@pytest.mark.asyncio
+async def test_drain_waits_for_queued_messages():
+    delivered = []
+
+    async def fetch():
+        return {'dollar': '1'}
+
+    async def deliver(message):
+        await asyncio.sleep(0.05)
+        delivered.append(message)
+
+    pipeline = _pipeline(fetch, deliver)
+    pipeline.start()
+    try:
+        assert await pipeline.publish()
+        assert await pipeline.publish()
+        assert await pipeline.drain(timeout=1)
+        assert len(delivered) == 2
+    finally:
+        await pipeline.stop()
+
+
+@pytest.mark.asyncio
+async def test_each_tick_costs_one_scrape():
+    scrapes = []
+
+    async def fetch():
+        scrapes.append(1)
+        await asyncio.sleep(0.01)
+        return {'dollar': str(len(scrapes))}
+
+    delivered = []
+
+    async def deliver(message):
+        delivered.append(message)
+
+    pipeline = _pipeline(fetch, deliver, poll_interval=3600)
+    pipeline.start()
+    try:
+        # The first tick waits for the poller's startup scrape instead of starting its own
+        assert await pipeline.publish()
+        for _ in range(3):
+            # An hour later the cache has expired and the poller is still asleep
+            pipeline.cache._fetched_at -= 3600
+            assert await pipeline.publish()
+        assert await pipeline.drain(timeout=1)
+    finally:
+        await pipeline.stop()
+
+    assert len(scrapes) == 4
+    assert delivered == [f'price={n}' for n in range(1, 5)]
+
+
+@pytest.mark.asyncio
+async def test_a_tick_restarts_the_poll_timer():
+    scrapes = []
+
+    async def fetch():
+        scrapes.append(1)
+        return {'dollar': '1'}
+
+    async def deliver(message):
+        pass
+
+    pipeline = _pipeline(fetch, deliver, poll_interval=0.3)
+    pipeline.start()
+    try:
+        assert await pipeline.publish()
+        await asyncio.sleep(0.2)
+        pipeline.cache._fetched_at -= 3600
+        assert await pipeline.publish()
+        # The poller's old schedule would have scraped again at 0.3s
+        await asyncio.sleep(0.2)
+        assert len(scrapes) == 2
+    finally:
+        await pipeline.stop()
@@ -0,0 +1,49 @@
+from decimal import Decimal
+import pytest
+from services.formatter import PriceFormatter
+from services.quote import Quote
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('622,300', '62,230'),
+    ('۶۲۲,۳۰۰', '62,230'),
+    ('-8,520', '852'),
+    ('+8,520', '852'),
+    ('1,234.5', '1,234'),
+    (8520, '852'),
+    (6223.7, '622'),
+    (-85.5, '-9'),
+    ('abc', 'abc'),
+    (None, 'None'),
+])
+def test_convert_to_toman_matches_the_original_output(value, expected):
+    assert PriceFormatter.convert_to_toman(value) == expected
+
+
+@pytest.mark.parametrize('text, is_rial, expected', [
+    ('622,300', True, '622,300 ریال'),
+    ('2,652.41', False, '2,652.41'),
+    ('-5', True, '5 ریال'),
+    ('+5', True, '5 ریال'),
+    (None, True, 'نامشخص'),
+    ('abc', True, 'abc'),
+])
+def test_format_price_matches_the_original_output(text, is_rial, expected):
+    assert PriceFormatter.format_price(text, is_rial) == expected
+
+
+@pytest.mark.parametrize('change_text, expected', [
+    ('(1.37%) 8,520', ('62,230', '1.37%', '852', 'تومان')),
+    ('(-1.37%) -8,525', ('62,230', '-1.37%', '852', 'تومان')),
+    # The parsed percent has no room for tgju's explicit '+'
+    ('(+1.37%) +8,520', ('62,230', '1.37%', '852', 'تومان')),
+    ('(0%) 0', ('62,230', '0%', '0', 'تومان')),
+])
+def test_format_quote_in_toman(change_text, expected):
+    quote = Quote.from_text('dollar', 'دلار', '622,300', change_text)
+    assert PriceFormatter.format_quote(quote) == expected
+
+
+def test_format_quote_in_usd_keeps_the_sign():
+    quote = Quote('ons', 'انس', Decimal('2652.41'), change=Decimal('-4.77'), percent=Decimal('-0.18'), unit='usd')
+    assert PriceFormatter.format_quote(quote) == ('2,652.41', '-0.18%', '-4.77', 'دلار')
@@ -0,0 +1,37 @@
+from services.ratelimit import RateLimiter
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_then_refill():
+    clock = _Clock()
+    limiter = RateLimiter(rate=0.5, burst=2, clock=clock)
+
+    assert limiter.allow('a')
+    assert limiter.allow('a')
+    assert not limiter.allow('a')
+    assert limiter.retry_after('a') == 2.0
+    # Keys are independent
+    assert limiter.allow('b')
+
+    clock.now = 2.0
+    assert limiter.allow('a')
+    assert not limiter.allow('a')
+    assert limiter.stats == {'allowed': 4, 'denied': 2}
+
+
+def test_idle_keys_are_pruned():
+    clock = _Clock()
+    limiter = RateLimiter(rate=1, burst=1, clock=clock, max_keys=2)
+    limiter.allow(1)
+    limiter.allow(2)
+    clock.now = 5.0
+    limiter.allow(3)
+    assert list(limiter._buckets) == [3]
+    assert limiter.allow(1)
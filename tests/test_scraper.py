@@ -1,11 +1,183 @@
+import asyncio
 import pytest
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from pathlib import Path
+import httpx
+from services.instruments import load_catalog
+from services.quote import Quote
 from services.scraper import TgjuScraper
 from bs4 import BeautifulSoup
+from tests.fixture_server import FixtureServer
+
+FIXTURE = Path(__file__).parent / "fixtures" / "tgju_home.html"
 
 @pytest.mark.asyncio
-async def test_get_market_data():
-    scraper = TgjuScraper()
-    data = await scraper.get_market_data()
+@pytest.mark.parametrize('layout', ['current', 'alternate'])
+async def test_get_tgju_data_from_fixture_pages(layout):
+    async with FixtureServer(layout) as server:
+        scraper = TgjuScraper(mode='http')
+        scraper.URL = server.base_url
+        try:
+            data = await scraper.get_tgju_data()
+        finally:
+            await scraper.close()
     assert data is not None
-    assert isinstance(data, dict)
-    assert 'dollar' in data
\ No newline at end of file
+    assert list(data) == list(scraper.instruments)
+    assert data['dollar'].price > 0
+
+
+def _mock_client(html: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=html)))
+
+
+@pytest.mark.asyncio
+async def test_http_path_serves_complete_page():
+    scraper = TgjuScraper(mode='auto', http_client=_mock_client(FIXTURE.read_text(encoding='utf-8')))
+    data = await scraper.get_tgju_data()
+    assert scraper.last_path == 'http'
+    assert list(data) == list(scraper.instruments)
+    assert data['dollar'] == Quote('dollar', 'دلار', 622300, Decimal('8520'), Decimal('1.37'), 'high')
+
+
+@pytest.mark.asyncio
+async def test_http_mode_returns_partial_page_without_browser():
+    scraper = TgjuScraper(mode='http', http_client=_mock_client(
+        '<li id="l-price_dollar_rl" class="low"><span class="info-price">600,000</span></li>'
+    ))
+    data = await scraper.get_tgju_data()
+    assert scraper.last_path == 'http'
+    assert list(data) == ['dollar']
+    assert scraper.browser.stats['launches'] == 0
+
+
+@pytest.mark.parametrize('parser', ['html.parser', 'lxml', 'selectolax'])
+def test_parsers_agree_on_fixture(parser):
+    pytest.importorskip('lxml' if parser == 'lxml' else 'selectolax' if parser == 'selectolax' else 'bs4')
+    html = FIXTURE.read_text(encoding='utf-8')
+    assert TgjuScraper(parser=parser)._parse_html(html) == TgjuScraper(parser='html.parser')._parse_html(html)
+
+
+@pytest.mark.asyncio
+async def test_pages_are_fetched_concurrently_and_merged_in_catalog_order():
+    html = FIXTURE.read_text(encoding='utf-8')
+    in_flight = peak = 0
+    requested = []
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        requested.append(request.url.path)
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, text=html)
+
+    instruments = load_catalog(['btc', 'dollar', 'eur', 'half_coin', 'quarter_coin', 'aed', 'brent'])
+    scraper = TgjuScraper(
+        mode='http',
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        instruments=instruments,
+        page_concurrency=2
+    )
+    data = await scraper.get_tgju_data()
+
+    assert sorted(requested) == ['/', '/coin', '/crypto', '/currency', '/energy']
+    assert peak == 2
+    assert list(data) == list(instruments)
+    assert data['half_coin'].price == 820000000
+    assert data['btc'] == Quote('btc', 'بیت کوین', Decimal('97412.55'), Decimal('2040.10'), Decimal('2.14'),
+                                'high', 'usd')
+
+
+class _RecordingBrowser:
+    def __init__(self):
+        self.started = 0
+
+    async def start(self):
+        self.started += 1
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('mode, launches', [('http', 0), ('auto', 0), ('browser', 1)])
+async def test_warm_up_launches_chromium_only_in_browser_mode(mode, launches):
+    browser = _RecordingBrowser()
+    scraper = TgjuScraper(browser, mode=mode, parser='html.parser')
+    try:
+        await scraper.warm_up()
+    finally:
+        await scraper.close()
+    assert browser.started == launches
+
+
+class _SlowPage:
+    """A page where some prices never load: the readiness wait always times out"""
+
+    def __init__(self, html: str):
+        self.html = html
+        self.evaluated = None
+
+    async def goto(self, url, timeout, wait_until):
+        pass
+
+    async def wait_for_function(self, script, arg, timeout):
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+        raise PlaywrightTimeoutError(f"Timeout {timeout}ms exceeded.")
+
+    async def content(self):
+        return self.html
+
+    async def evaluate(self, script, ids):
+        self.evaluated = ids
+        # Only the dollar had rendered when the wait gave up
+        return {'price_dollar_rl': {'price': '622,300', 'change': '(1.37%) 8,520', 'classes': ['high']}}
+
+
+class _PageBrowser(_RecordingBrowser):
+    def __init__(self, page):
+        super().__init__()
+        self._page = page
+
+    @asynccontextmanager
+    async def page(self):
+        yield self._page
+
+
+@pytest.mark.asyncio
+async def test_ready_timeout_still_parses_the_loaded_prices():
+    html = FIXTURE.read_text(encoding='utf-8')
+    scraper = TgjuScraper(_PageBrowser(_SlowPage(html)), mode='browser', extract='html', parser='html.parser')
+    instruments = list(scraper.instruments.values())
+
+    data = await scraper._fetch_browser(scraper.URL, instruments)
+    assert data == scraper._parse_html(html, instruments)
+    assert data['dollar'].price == 622300
+
+
+@pytest.mark.asyncio
+async def test_ready_timeout_still_evaluates_the_loaded_prices():
+    page = _SlowPage('')
+    scraper = TgjuScraper(_PageBrowser(page), mode='browser', extract='evaluate')
+    instruments = list(scraper.instruments.values())
+
+    data = await scraper._fetch_browser(scraper.URL, instruments)
+    assert page.evaluated == [instrument.element_id for instrument in instruments]
+    assert data == {'dollar': Quote('dollar', 'دلار', 622300, Decimal('8520'), Decimal('1.37'), 'high')}
+
+
+def test_build_data_from_evaluate_result():
+    data = TgjuScraper()._build_data({
+        'ons': {'price': '2,652.41', 'change': None, 'classes': ['low']},
+        'unknown': {'price': '1', 'change': '1', 'classes': []}
+    })
+    assert data == {'ons': Quote('ons', 'انس', Decimal('2652.41'), trend='low', unit='usd')}
+
+
+def test_quote_parses_persian_digits():
+    quote = Quote.from_text('dollar', 'دلار', '۶۲۲,۳۰۰', '(۱٫۳۷%) ۸,۵۲۰', trend='high')
+    assert quote.price == 622300
+    assert quote.percent == Decimal('1.37')
+    assert quote.change == Decimal('8520')
@@ -0,0 +1,41 @@
+from decimal import Decimal
+from services.cache import SnapshotCache
+from services.quote import Quote
+from services.snapshot_store import SnapshotStore
+
+
+def test_snapshot_round_trips_through_disk(tmp_path):
+    snapshot = {
+        'dollar': Quote('dollar', 'دلار', 622300, Decimal('8520'), Decimal('1.37'), 'high', source='tgju'),
+        'ons': Quote('ons', 'انس', Decimal('2652.41'), Decimal('-3.5'), Decimal('0.13'), 'low', 'usd'),
+    }
+    store = SnapshotStore(tmp_path / 'snapshot.json')
+    store.save(snapshot, timestamp=1700000000.0)
+
+    loaded, saved_at = SnapshotStore(tmp_path / 'snapshot.json').load()
+    assert saved_at == 1700000000.0
+    assert loaded == snapshot
+    assert loaded['dollar'].source == 'tgju'
+    assert isinstance(loaded['dollar'].price, int)
+
+
+def test_missing_or_corrupt_file_loads_nothing(tmp_path):
+    path = tmp_path / 'snapshot.json'
+    assert SnapshotStore(path).load() is None
+    path.write_text('{not json', encoding='utf-8')
+    assert SnapshotStore(path).load() is None
+
+
+def test_non_numeric_change_loads_nothing(tmp_path):
+    store = SnapshotStore(tmp_path / 'snapshot.json')
+    store.save({'dollar': Quote('dollar', 'دلار', 622300, Decimal('8520'), Decimal('1.37'), 'high')})
+    store.path.write_text(store.path.read_text(encoding='utf-8').replace('"8520"', '"n/a"'), encoding='utf-8')
+    assert store.load() is None
+
+
+def test_seeded_cache_reports_the_stored_age():
+    cache = SnapshotCache(fetch=None, ttl=60, clock=lambda: 1000.0)
+    cache.seed({'dollar': 1}, age=300)
+    assert cache.age == 300
+    assert not cache.is_fresh()
+    assert cache.peek() == {'dollar': 1}
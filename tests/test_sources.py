@@ -0,0 +1,120 @@
+import asyncio
+import time
+import httpx
+import pytest
+from decimal import Decimal
+from services.instruments import load_catalog
+from services.quote import Quote
+from services.sources import NobitexSource, PriceAggregator, PriceSource
+
+
+class StubSource(PriceSource):
+    def __init__(self, name, prices=None, delay=0.0, error=None):
+        self.name = name
+        self.prices = prices or {}
+        self.delay = delay
+        self.error = error
+        self.cancelled = False
+
+    async def fetch(self):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return {key: Quote(key, key, price) for key, price in self.prices.items()}
+
+
+@pytest.mark.asyncio
+async def test_first_good_returns_with_the_fastest_complete_source():
+    slow = StubSource('slow', {'dollar': 600_000, 'tether': 650_000}, delay=5)
+    fast = StubSource('fast', {'dollar': 610_000, 'tether': 640_000}, delay=0.01)
+    aggregator = PriceAggregator([slow, fast], expected=['dollar', 'tether'])
+
+    started = time.perf_counter()
+    data = await aggregator.fetch()
+    assert time.perf_counter() - started < 1
+    assert data['dollar'].price == 610_000
+    assert data['dollar'].source == 'fast'
+    assert data['dollar'].age is not None and data['dollar'].age < 1
+    assert slow.cancelled
+    assert aggregator.stats['slow']['cancelled'] == 1
+
+
+@pytest.mark.asyncio
+async def test_first_good_fills_gaps_from_other_sources():
+    aggregator = PriceAggregator([
+        StubSource('tgju', {'dollar': 600_000}, delay=0.02),
+        StubSource('exchange', {'tether': 650_000}),
+        StubSource('broken', error=RuntimeError('blocked')),
+    ], expected=['dollar', 'tether'])
+    data = await aggregator.fetch()
+    assert {key: quote.source for key, quote in data.items()} == {'tether': 'exchange', 'dollar': 'tgju'}
+    assert aggregator.stats['broken']['failed'] == 1
+
+
+@pytest.mark.asyncio
+async def test_per_source_deadline():
+    aggregator = PriceAggregator(
+        [StubSource('hung', {'dollar': 1}, delay=5), StubSource('ok', {'gold': 2}, delay=0.01)],
+        deadline=10, deadlines={'hung': 0.05}, expected=['dollar', 'gold']
+    )
+    data = await aggregator.fetch()
+    assert list(data) == ['gold']
+    assert aggregator.stats['hung']['timeouts'] == 1
+
+
+@pytest.mark.asyncio
+async def test_median_merge():
+    aggregator = PriceAggregator([
+        StubSource('a', {'dollar': 600_000}),
+        StubSource('b', {'dollar': 700_000, 'tether': 1}),
+        StubSource('c', {'dollar': 610_000}),
+    ], strategy='median')
+    data = await aggregator.fetch()
+    assert (data['dollar'].price, data['dollar'].source) == (610_000, 'c')
+    assert data['tether'].source == 'b'
+
+
+@pytest.mark.asyncio
+async def test_all_sources_failing_returns_none():
+    aggregator = PriceAggregator([StubSource('empty'), StubSource('broken', error=OSError())])
+    assert await aggregator.fetch() is None
+
+
+@pytest.mark.asyncio
+async def test_nobitex_source_parses_market_stats():
+    payload = {'status': 'ok', 'stats': {
+        'usdt-rls': {'isClosed': False, 'latest': '650000', 'dayOpen': '640000', 'dayChange': '1.56'},
+        'btc-usdt': {'isClosed': False, 'latest': '97412.55', 'dayOpen': '98000', 'dayChange': '-0.6'},
+    }}
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json=payload)))
+    source = NobitexSource(load_catalog(['tether', 'btc']), http_client=client)
+    data = await source.fetch()
+    assert data['tether'] == Quote('tether', 'تتر', 650000, Decimal(10000), Decimal('1.56'), 'high')
+    assert data['btc'].trend == 'low'
+    assert data['btc'].unit == 'usd'
+    await source.close()
+
+
+class WarmingSource(StubSource):
+    def __init__(self, name, error=None):
+        super().__init__(name)
+        self.warm_error = error
+        self.warmed = False
+
+    async def warm_up(self):
+        if self.warm_error is not None:
+            raise self.warm_error
+        self.warmed = True
+
+
+@pytest.mark.asyncio
+async def test_warm_up_reaches_every_source_and_tolerates_failures():
+    healthy = WarmingSource('healthy')
+    aggregator = PriceAggregator([WarmingSource('broken', error=RuntimeError('no chromium')), healthy])
+
+    await aggregator.warm_up()
+    assert healthy.warmed
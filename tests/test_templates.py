@@ -0,0 +1,141 @@
+from decimal import Decimal
+import pytest
+from services.formatter import PriceFormatter
+from services.instruments import Instrument, load_catalog
+from services.quote import Quote
+from services.templates import MessageTemplate, MessageTemplates, PriceMessage, normalize_style
+
+DATE = '13:31 - 26 مهر 1405'
+
+
+def _snapshot(**overrides):
+    data = {
+        'dollar': Quote('dollar', 'دلار', 622_300, change=Decimal(8_520), percent=Decimal('1.37'), trend='high'),
+        'ons': Quote('ons', 'انس', Decimal('2652.41'), change=Decimal('-4.77'), percent=Decimal('-0.18'),
+                     trend='low', unit='usd'),
+    }
+    data.update(overrides)
+    return data
+
+
+def _render(spec, snapshot=None, instruments=None, **kwargs):
+    instruments = instruments or load_catalog(['dollar', 'ons'])
+    return MessageTemplate(spec).render(instruments, snapshot or _snapshot(), PriceFormatter(), DATE, **kwargs)
+
+
+def test_default_style_keeps_the_channel_layout():
+    assert _render('fa:markdown') == (
+        "📊 *قیمت‌های لحظه‌ای بازار*\n"
+        f"🕒 {DATE}\n"
+        "\n━━━━━━━━✨*وضعیت بازار*✨━━━━━━━━\n\n"
+        "🟢 *دلار*: 62,230 تومان\nتغییر: 1.37% (852 تومان)\n\n"
+        "🔴 *انس*: 2,652.41 دلار\nتغییر: -0.18% (-4.77 دلار)\n"
+    )
+
+
+def test_markdown_v2_escapes_literals_names_and_numbers():
+    instruments = {'odd': Instrument('odd', 'odd', 'a*b_c', unit='usd', name_en='Fund (A.B)')}
+    snapshot = {'odd': Quote('odd', 'odd', Decimal('1.5'), percent=Decimal('-2.5'), unit='usd')}
+
+    text = _render('en:markdown_v2', snapshot, instruments)
+    assert "⚪️ *Fund \\(A\\.B\\)*: 1\\.5 USD" in text
+    assert "Change: \\-2\\.5% \\(0 USD\\)" in text
+    assert "🕒 13:31 \\- 26" in text
+    assert "a\\*b\\_c" in _render('fa:markdown_v2', snapshot, instruments)
+
+
+def test_html_escapes_markup_characters():
+    instruments = {'odd': Instrument('odd', 'odd', '<S&P>', unit='usd')}
+    snapshot = {'odd': Quote('odd', 'odd', 5, unit='usd')}
+
+    text = _render('fa:html', snapshot, instruments)
+    assert "<b>&lt;S&amp;P&gt;</b>: 5 دلار" in text
+    assert text.startswith("📊 <b>قیمت‌های لحظه‌ای بازار</b>")
+
+
+def test_legacy_markdown_cannot_be_broken_by_a_name():
+    instruments = {'odd': Instrument('odd', 'odd', 'a*b_c', unit='usd')}
+    snapshot = {'odd': Quote('odd', 'odd', 5, unit='usd')}
+
+    assert "*a∗b_c*: 5" in _render('fa:markdown', snapshot, instruments)
+
+
+def test_persian_digits_and_stale_line():
+    text = _render('fa:markdown:persian', as_of=0)
+    assert "🟢 *دلار*: ۶۲٬۲۳۰ تومان\nتغییر: ۱٫۳۷٪ (۸۵۲ تومان)" in text
+    assert "🕒 ۱۳:۳۱ - ۲۶ مهر ۱۴۰۵" in text
+    assert "⏳ داده تازه در دسترس نیست" in text
+
+
+def test_keys_limit_the_rows():
+    text = _render('en:html', keys=('ons',))
+    assert 'Gold ounce' in text and 'US dollar' not in text
+
+
+@pytest.mark.parametrize('spec, expected', [
+    ('fa', 'fa:markdown'),
+    (' EN : html ', 'en:html'),
+    ('fa:persian:markdown_v2', 'fa:markdown_v2:persian'),
+])
+def test_normalize_style(spec, expected):
+    assert normalize_style(spec) == expected
+
+
+@pytest.mark.parametrize('spec', ['', 'de:html', 'fa:rtf'])
+def test_unknown_styles_are_rejected(spec):
+    with pytest.raises(ValueError):
+        normalize_style(spec)
+
+
+def test_channels_get_their_own_style_and_bad_config_fails_early():
+    templates = MessageTemplates(load_catalog(), channels={'@en': 'en:html', -100: 'fa:markdown_v2'})
+    assert templates.group(['@fa', '@en', '-100', 42]) == {
+        'fa:markdown': ['@fa', 42], 'en:html': ['@en'], 'fa:markdown_v2': ['-100']
+    }
+    assert templates.template_for(-100).parse_mode == 'MarkdownV2'
+    with pytest.raises(ValueError):
+        MessageTemplates(load_catalog(), channels={'@x': 'xx'})
+
+
+@pytest.fixture
+def fixed_date(monkeypatch):
+    # A minute rolling over mid-test would change the date line and miss the memo
+    monkeypatch.setattr(MessageTemplate, 'date', lambda self: DATE)
+
+
+def test_renders_are_memoized_until_a_quote_changes(fixed_date):
+    templates = MessageTemplates(load_catalog(['dollar', 'ons']))
+    snapshot = _snapshot()
+    first = templates.render(snapshot)
+
+    assert templates.render(snapshot) is first
+    # A new fetch with the same prices still hits; provenance does not matter
+    refetched = _snapshot()
+    refetched['dollar'].source = 'nobitex'
+    assert templates.render(refetched) is first
+    assert templates.stats == {'rendered': 1, 'memoized': 2}
+
+    changed = templates.render(_snapshot(dollar=Quote('dollar', 'دلار', 630_000, trend='high')))
+    assert changed != first and '63,000' in changed
+    assert templates.render(snapshot, 'en:markdown') != first
+    assert templates.stats['rendered'] == 3
+
+
+def test_price_message_renders_each_style_once(fixed_date):
+    templates = MessageTemplates(load_catalog(['dollar', 'ons']))
+    message = PriceMessage(templates, _snapshot())
+    assert str(message) == message.text() == templates.render(_snapshot())
+    for _ in range(3):
+        message.text('en:html')
+    assert templates.stats['rendered'] == 2
+
+
+@pytest.mark.parametrize('spec, expected', [
+    ('fa:markdown', "🔔 *a∗b_c* \\`+5\\` (1.5%)"),
+    ('fa:markdown_v2', "🔔 *a\\*b\\_c* \\`\\+5\\` \\(1\\.5%\\)"),
+    ('fa:html', "🔔 <b>a*b_c</b> `+5` (1.5%) &lt;i&gt;"),
+])
+def test_fill_escapes_one_off_messages(spec, expected):
+    source = "🔔 <b>{name}</b> {change} ({percent}%)" + (" {tag}" if spec == 'fa:html' else '')
+    text = MessageTemplate(spec).fill(source, name='a*b_c', change='`+5`', percent='1.5', tag='<i>')
+    assert text == expected
@@ -0,0 +1,34 @@
+import pytest
+from telegram import Bot
+from services.ticker import LiveTicker
+from tests.fake_bot_api import FakeBotApi
+
+
+@pytest.mark.asyncio
+async def test_ticker_posts_once_then_edits_only_on_change(tmp_path):
+    async with FakeBotApi() as api:
+        async with Bot('123:TEST', base_url=api.base_url) as bot:
+            ticker = LiveTicker(bot, tmp_path / 'ticker.json', parse_mode=None)
+            assert await ticker.update(42, 'dollar 100') == 'posted'
+            assert await ticker.update(42, 'dollar 100') == 'skipped'
+            assert await ticker.update(42, 'dollar 101') == 'edited'
+
+            # State survives a restart
+            ticker = LiveTicker(bot, tmp_path / 'ticker.json', parse_mode=None)
+            assert await ticker.update(42, 'dollar 101') == 'skipped'
+
+    assert len(api.sent) == 1
+    assert [edit['text'] for edit in api.edits] == ['dollar 101']
+    assert [r['method'] for r in api.requests].count('pinChatMessage') == 1
+
+
+@pytest.mark.asyncio
+async def test_ticker_reposts_when_message_was_deleted(tmp_path):
+    async with FakeBotApi() as api:
+        async with Bot('123:TEST', base_url=api.base_url) as bot:
+            ticker = LiveTicker(bot, tmp_path / 'ticker.json', parse_mode=None)
+            await ticker.update(42, 'dollar 100')
+            api.delete_message(1)
+            assert await ticker.update(42, 'dollar 102') == 'posted'
+
+    assert len(api.sent) == 2
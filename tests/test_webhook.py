@@ -0,0 +1,113 @@
+import asyncio
+import json
+from pathlib import Path
+import httpx
+import pytest
+from telegram.ext import ApplicationBuilder, CommandHandler
+from services.webhook import WebhookServer
+from tests.fake_bot_api import FakeBotApi
+
+UPDATE = json.loads((Path(__file__).parent / 'fixtures' / 'update_price_command.json').read_text(encoding='utf-8'))
+SECRET = 'test-secret'
+
+
+class _Webhook:
+    """An initialized Application behind a WebhookServer on a free port"""
+
+    def __init__(self, api: FakeBotApi):
+        self.app = ApplicationBuilder().token('123:TEST').base_url(api.base_url).build()
+        self.server = WebhookServer(self.app, SECRET, path='/telegram', port=0)
+        self.handled = []
+
+        async def price(update, context):
+            self.handled.append(update.update_id)
+
+        self.app.add_handler(CommandHandler('price', price))
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.port}/telegram"
+
+    async def __aenter__(self):
+        await self.app.initialize()
+        await self.app.start()
+        await self.server.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.server.stop()
+        await self.app.stop()
+        await self.app.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_recorded_update_is_dispatched():
+    async with FakeBotApi() as api, _Webhook(api) as webhook, httpx.AsyncClient() as client:
+        response = await client.post(webhook.url, json=UPDATE, headers={WebhookServer.SECRET_HEADER: SECRET})
+        assert response.status_code == 200
+        for _ in range(50):
+            if webhook.handled:
+                break
+            await asyncio.sleep(0.01)
+    assert webhook.handled == [UPDATE['update_id']]
+    assert webhook.server.stats == {'accepted': 1, 'rejected': 0}
+
+
+@pytest.mark.asyncio
+async def test_rejected_requests_are_not_dispatched():
+    async with FakeBotApi() as api, _Webhook(api) as webhook, httpx.AsyncClient() as client:
+        headers = {WebhookServer.SECRET_HEADER: SECRET}
+        assert (await client.post(webhook.url, json=UPDATE)).status_code == 403
+        assert (await client.post(webhook.url, json=UPDATE,
+                                  headers={WebhookServer.SECRET_HEADER: 'wrong'})).status_code == 403
+        assert (await client.get(webhook.url, headers=headers)).status_code == 405
+        assert (await client.post(webhook.url + '/other', json=UPDATE, headers=headers)).status_code == 404
+        assert (await client.post(webhook.url, content=b'{not json', headers=headers)).status_code == 400
+        assert (await client.post(webhook.url, json={'foo': 1}, headers=headers)).status_code == 400
+        assert (await client.post(webhook.url, content=b'[' * 2_000_000, headers=headers)).status_code == 413
+        await asyncio.sleep(0.05)
+    assert webhook.handled == []
+    assert webhook.server.stats == {'accepted': 0, 'rejected': 7}
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_dispatched_updates():
+    """Updates accepted before shutdown are still handled by Application.stop()"""
+    async with FakeBotApi() as api:
+        webhook = _Webhook(api)
+        finished = []
+
+        async def slow(update, context):
+            await asyncio.sleep(0.1)
+            finished.append(update.update_id)
+
+        webhook.app.add_handler(CommandHandler('price', slow), group=1)
+        async with webhook, httpx.AsyncClient() as client:
+            response = await client.post(webhook.url, json=UPDATE, headers={WebhookServer.SECRET_HEADER: SECRET})
+            assert response.status_code == 200
+    assert finished == [UPDATE['update_id']]
+
+
+@pytest.mark.asyncio
+async def test_chunked_and_keep_alive_requests():
+    async def chunks():
+        body = json.dumps(UPDATE).encode()
+        for start in range(0, len(body), 64):
+            yield body[start:start + 64]
+
+    async with FakeBotApi() as api, _Webhook(api) as webhook, httpx.AsyncClient() as client:
+        headers = {WebhookServer.SECRET_HEADER: SECRET}
+        # httpx sends an async iterator without a length as chunked transfer-encoding
+        assert (await client.post(webhook.url, content=chunks(), headers=headers)).status_code == 200
+        assert (await client.post(webhook.url, json=UPDATE, headers=headers)).status_code == 200
+        for _ in range(50):
+            if len(webhook.handled) == 2:
+                break
+            await asyncio.sleep(0.01)
+    assert webhook.handled == [UPDATE['update_id']] * 2
+
+
+def test_secret_token_is_required():
+    app = ApplicationBuilder().token('123:TEST').build()
+    with pytest.raises(ValueError):
+        WebhookServer(app, '')
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import pytest
+from services.instruments import load_catalog
+from services.worker_pool import ScraperPool, tree_rss_kib
+from tests.fixture_server import FixtureServer
+
+INSTRUMENTS = load_catalog()
+
+
+def _pool(server: FixtureServer, **kwargs) -> ScraperPool:
+    return ScraperPool({'mode': 'http', 'timeout': 10, 'url': server.base_url}, INSTRUMENTS, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_workers_fetch_and_recycle():
+    async with FixtureServer() as server:
+        pool = _pool(server, workers=1, max_fetches=2)
+        try:
+            first = await pool.get_tgju_data()
+            second = await pool.get_tgju_data()
+        finally:
+            await pool.close()
+
+    assert list(first) == list(INSTRUMENTS)
+    assert first['dollar'].price > 0
+    assert second == first
+    assert pool.stats['fetches'] == 2
+    assert pool.stats['recycled'] == 1
+    assert pool.stats['started'] == 2
+
+
+@pytest.mark.asyncio
+async def test_hung_worker_is_killed_and_replaced():
+    async with FixtureServer(latency=30) as server:
+        pool = _pool(server, workers=1, timeout=3)
+        try:
+            assert await pool.get_tgju_data() is None
+            assert pool.stats['timeouts'] == 1
+            assert pool.stats['started'] == 2
+            server.latency = 0
+            assert await pool.get_tgju_data() is not None
+        finally:
+            await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_crashed_worker_is_replaced():
+    async with FixtureServer(latency=30) as server:
+        pool = _pool(server, workers=1, timeout=60)
+        try:
+            fetch = asyncio.ensure_future(pool.get_tgju_data())
+            await asyncio.sleep(3)
+            (worker,) = pool._workers.values()
+            worker.process.kill()
+            assert await asyncio.wait_for(fetch, 10) is None
+            assert pool.stats['crashed'] == 1
+            assert len(pool._workers) == 1 and worker.name not in pool._workers
+        finally:
+            await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_worker_over_memory_cap_is_recycled():
+    async with FixtureServer() as server:
+        pool = _pool(server, workers=1, memory_limit_mb=1)
+        try:
+            assert await pool.get_tgju_data() is not None
+        finally:
+            await pool.close()
+    assert pool.stats['recycled'] == 1
+
+
+def test_tree_rss_counts_the_current_process():
+    rss = tree_rss_kib(os.getpid())
+    assert rss is None or rss > 0
@@ -17,3 +17,8 @@ def get_jalali_date() -> str:
     except Exception as e:
         logger.error(f"Error getting Jalali date: {e}")
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def get_time_of_day(timestamp: float) -> str:
+    """Get HH:MM of a Unix timestamp in local time"""
+    return datetime.fromtimestamp(timestamp).strftime("%H:%M")
@@ -1,8 +1,49 @@
+import contextvars
+import json
 import logging
+import uuid
 
+# Correlation id of the tick (poll, publish or delivery) the current task is working on
+TICK_ID: contextvars.ContextVar = contextvars.ContextVar('tick_id', default='-')
 
-def setup_logging():
+
+def new_tick() -> str:
+    """Start a new tick in the current context and return its id"""
+    tick_id = uuid.uuid4().hex[:12]
+    TICK_ID.set(tick_id)
+    return tick_id
+
+
+class TickFilter(logging.Filter):
+    """Attach the current tick's correlation id to every record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.tick_id = TICK_ID.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'tick_id': getattr(record, 'tick_id', '-'),
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(log_format: str = 'text'):
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(TickFilter())
+        if log_format == 'json':
+            handler.setFormatter(JsonFormatter())